@@ -0,0 +1,230 @@
+"""End-to-end benchmark: generate -> load -> report, compared against a stored baseline.
+
+The load phase runs the real ``load_database`` (pragmas, --batch-size streaming,
+--fast-load, --workers, manifest and queue bookkeeping) and reports its
+per-stage instrumentation records, so a regression in the loader shows up here.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import instrumentation
+import load_ecommerce_data as loader
+from run_report import REPORT_SQL, split_statements
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = SCRIPTS_DIR.parent / "benchmarks" / "baseline.json"
+DEFAULT_SCALES = (1, 10)
+AS_OF = "2025-11-14T00:00:00"
+
+# Regressions smaller than these absolute amounts are treated as noise.
+MIN_SECONDS_DELTA = 0.010
+MIN_RSS_DELTA_MB = 8.0
+
+
+def generate_dataset(output_dir: Path, scale: float, seed: int, engine: str) -> float:
+    started = time.perf_counter()
+    subprocess.run(
+        [
+            sys.executable, str(SCRIPTS_DIR / "generate_data.py"),
+            "--scale", str(scale), "--seed", str(seed), "--as-of", AS_OF,
+            "--output-dir", str(output_dir), "--engine", engine,
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - started
+
+
+def stage_phases(metrics: Path) -> Dict[str, Dict[str, float]]:
+    """Per-stage metrics of one load from its instrumentation log, summed over repeated stage names."""
+    phases: Dict[str, Dict[str, float]] = {}
+    for line in metrics.read_text(encoding="utf-8").splitlines():
+        record = json.loads(line)
+        if record.get("event") != "stage":
+            continue
+        phase = phases.setdefault(record["stage"], {"seconds": 0.0, "rows": None, "peak_rss_mb": None})
+        phase["seconds"] = round(phase["seconds"] + record["seconds"], 6)
+        if record.get("rows") is not None:
+            phase["rows"] = (phase["rows"] or 0) + record["rows"]
+        if record.get("peak_rss_mb") is not None:
+            phase["peak_rss_mb"] = max(phase["peak_rss_mb"] or 0.0, record["peak_rss_mb"])
+    for phase in phases.values():
+        seconds, rows = phase["seconds"], phase["rows"]
+        phase["rows_per_sec"] = round(rows / seconds, 1) if rows is not None and seconds > 0 else None
+    return phases
+
+
+def benchmark_load(data_dir: str, database: str, repeat: int, options: Dict) -> Dict[str, Dict]:
+    """Run ``load_database`` with ``options`` and time the report queries.
+
+    Runs in a fresh process per scale so peak RSS is not inherited from earlier
+    scales. The phases are the loader's own instrumentation stages (see
+    instrumentation.py), written next to the database as ``<db>.metrics.jsonl``;
+    ``peak_rss_mb`` is the process high-water mark when each stage ended.
+    """
+    data_dir, database = Path(data_dir), Path(database)
+    metrics = database.with_suffix(".metrics.jsonl")
+    metrics.unlink(missing_ok=True)
+    instrumentation.configure(metrics, data_dir=str(data_dir), **options)
+    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+        with instrumentation.stage("load"):
+            loader.load_database(database, data_dir, drop=True, vacuum=True, **options)
+    instrumentation.configure(None)
+    phases = stage_phases(metrics)
+    for name, phase in phases.items():
+        print(f"[BENCH] {name:28} {phase['seconds']:8.3f}s {phase['peak_rss_mb'] or 0:8.1f} MiB")
+
+    conn = sqlite3.connect(database)
+    queries: Dict[str, Dict[str, float]] = {}
+    statements = split_statements(REPORT_SQL.read_text(encoding="utf-8-sig"))
+    for index, (label, statement) in enumerate(statements, 1):
+        label = f"{index}: {label}"
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result_rows = len(conn.execute(statement).fetchall())
+            samples.append(time.perf_counter() - started)
+        queries[label] = {
+            "seconds": round(statistics.median(samples), 6),
+            "min_seconds": round(min(samples), 6),
+            "rows": result_rows,
+        }
+        print(f"[BENCH] query {label[:40]:40} {queries[label]['seconds']:8.4f}s")
+    conn.close()
+    return {"phases": phases, "queries": queries, "database_bytes": database.stat().st_size}
+
+
+def run_benchmarks(
+    scales: List[float], seed: int, engine: str, repeat: int, workdir: Path, options: Optional[Dict] = None
+) -> Dict:
+    """``options`` are ``load_database`` keyword arguments (batch_size, fast_load, workers)."""
+    options = options or {}
+    results = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "engine": engine,
+        "seed": seed,
+        "load_options": options,
+        "scales": {},
+    }
+    context = multiprocessing.get_context("spawn")
+    for scale in scales:
+        key = f"{scale:g}"
+        data_dir = workdir / f"sf{key}"
+        print(f"[INFO] Scale {key}: generating into {data_dir}")
+        generate_seconds = generate_dataset(data_dir, scale, seed, engine)
+        print(f"[BENCH] {'generate':16} {generate_seconds:8.3f}s")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            measured = pool.submit(
+                benchmark_load, str(data_dir), str(workdir / f"sf{key}.db"), repeat, options
+            ).result()
+        measured["generate_seconds"] = round(generate_seconds, 6)
+        results["scales"][key] = measured
+    return results
+
+
+def compare(current: Dict, baseline: Dict, max_slowdown: float, max_rss_growth: float) -> List[str]:
+    """Return one message per metric that regressed beyond its threshold."""
+    regressions = []
+
+    def check(name: str, now: Optional[float], before: Optional[float], ratio: float, floor: float) -> None:
+        if now is None or before is None:
+            return
+        if now > before * (1 + ratio) and now - before > floor:
+            change = (now / before - 1) * 100 if before else float("inf")
+            regressions.append(f"{name}: {before:.4f} -> {now:.4f} (+{change:.0f}%, limit +{ratio * 100:.0f}%)")
+
+    for scale, result in current["scales"].items():
+        base = baseline.get("scales", {}).get(scale)
+        if base is None:
+            print(f"[WARN] Baseline has no scale {scale}; skipping comparison")
+            continue
+        for phase, metrics in result["phases"].items():
+            before = base["phases"].get(phase, {})
+            check(f"sf{scale} {phase} seconds", metrics["seconds"], before.get("seconds"),
+                  max_slowdown, MIN_SECONDS_DELTA)
+            check(f"sf{scale} {phase} peak_rss_mb", metrics["peak_rss_mb"], before.get("peak_rss_mb"),
+                  max_rss_growth, MIN_RSS_DELTA_MB)
+        for label, metrics in result["queries"].items():
+            before = base["queries"].get(label, {})
+            check(f"sf{scale} query {label} seconds", metrics["seconds"], before.get("seconds"),
+                  max_slowdown, MIN_SECONDS_DELTA)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark generate -> load -> report at several scales")
+    parser.add_argument("--scales", type=float, nargs="+", default=list(DEFAULT_SCALES), help="Scale factors to run")
+    parser.add_argument("--seed", type=int, default=42, help="Generator seed")
+    parser.add_argument("--engine", choices=("python", "numpy"), default="python", help="Generator engine")
+    parser.add_argument("--batch-size", type=int, default=None, help="Load with the streaming --batch-size path")
+    parser.add_argument("--fast-load", action="store_true", help="Load with the --fast-load profile")
+    parser.add_argument("--workers", type=int, default=1, help="Loader parse/transform processes")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per report query (median is recorded)")
+    parser.add_argument("--output", type=Path, default=None, help="Write results JSON here")
+    parser.add_argument("--workdir", type=Path, default=None, help="Keep generated data/DBs here (default: temp)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--max-slowdown", type=float, default=0.20, help="Allowed fractional increase in seconds")
+    parser.add_argument("--max-rss-growth", type=float, default=0.25, help="Allowed fractional increase in peak RSS")
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    options = {"batch_size": args.batch_size, "fast_load": args.fast_load, "workers": args.workers}
+    if args.workdir:
+        args.workdir.mkdir(parents=True, exist_ok=True)
+        results = run_benchmarks(args.scales, args.seed, args.engine, args.repeat, args.workdir, options)
+    else:
+        with tempfile.TemporaryDirectory(prefix="ecommerce-bench-") as tmp:
+            results = run_benchmarks(args.scales, args.seed, args.engine, args.repeat, Path(tmp), options)
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(payload + "\n", encoding="utf-8")
+        print(f"[INFO] Results written to {args.output}")
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(payload + "\n", encoding="utf-8")
+        print(f"[DONE] Baseline updated at {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"[WARN] No baseline at {args.baseline}; rerun with --update-baseline to store one (see README)")
+        return
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("load_options", {}) != options:
+        print(
+            f"[WARN] Load options {options} differ from the baseline's {baseline.get('load_options', {})}; "
+            "not comparing (pass the baseline's options or use another --baseline)"
+        )
+        return
+    regressions = compare(results, baseline, args.max_slowdown, args.max_rss_growth)
+    for message in regressions:
+        print(f"[REGRESSION] {message}")
+    if regressions:
+        sys.exit(1)
+    print(f"[DONE] No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""Memory-mapped columnar cache of the loaded tables for vectorized analytics.
+
+``export`` writes every column of the five base tables to ``<table>/<column>.bin``
+as a raw little-endian array and describes them in ``manifest.json``. UUID, enum
+and free-text columns are dictionary-encoded to ``int32`` codes (``-1`` for NULL);
+the dictionaries live in ``dictionaries/<domain>.json``. UUID domains are shared
+across tables and tables are exported in FK order, so a primary-key column's
+codes are exactly its row numbers and a foreign key can index the parent's
+columns directly (``products.category[order_items.product_id]``). Timestamps
+become ``datetime64[us]``.
+
+Exporting needs only the standard library, so the loader can write the cache
+without NumPy; reading maps the files with ``np.memmap`` (zero-copy) and the
+report functions below run as ``np.bincount`` group-bys over those arrays.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import sqlite3
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, only needed to read the cache
+    np = None
+
+import load_ecommerce_data as loader
+from run_report import RowWriter
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+# Rows fetched per round trip; each column buffer holds at most this many values.
+EXPORT_CHUNK = 100_000
+TIMESTAMP_COLUMNS = ("created_at", "order_date", "event_timestamp")
+EPOCH = datetime(1970, 1, 1)
+ONE_US = timedelta(microseconds=1)
+NAT = -(1 << 63)
+
+# (dtype recorded in the manifest, array typecode written to disk)
+INT64 = ("<i8", "q")
+FLOAT64 = ("<f8", "d")
+CODES = ("<i4", "i")
+TIMESTAMP = ("<M8[us]", "q")
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise SystemExit("Reading the columnar cache requires NumPy (pip install numpy)")
+
+
+# ---------------------------------------------------------------------------
+# Export (standard library only).
+
+
+class Dictionary:
+    """Value -> code mapping, seeded with an enum tuple so codes match the --compact enum_* tables."""
+
+    def __init__(self, seed: Tuple[str, ...] = ()) -> None:
+        self.values: List[str] = list(seed)
+        self.codes: Dict[str, int] = {value: code for code, value in enumerate(seed)}
+
+    def encode(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def parse_timestamp(value: Optional[str]) -> int:
+    if value is None:
+        return NAT
+    return (datetime.fromisoformat(value) - EPOCH) // ONE_US
+
+
+def column_layout(table: str) -> List[Tuple[str, Tuple[str, str], Optional[str]]]:
+    """``(column, (dtype, typecode), dictionary domain or None)`` for each column of a base table."""
+    kinds = loader.COMPACT_COLUMNS[table]
+    layout = []
+    for _, name, declared, _, _, _ in loader.base_schema()[table][0]:
+        if name in kinds:
+            # UUID and enum domains are named after the column so FKs share them.
+            layout.append((name, CODES, name))
+        elif name in TIMESTAMP_COLUMNS:
+            layout.append((name, TIMESTAMP, None))
+        elif declared == "INTEGER":
+            layout.append((name, INT64, None))
+        elif declared == "REAL":
+            layout.append((name, FLOAT64, None))
+        else:
+            layout.append((name, CODES, f"{table}.{name}"))
+    return layout
+
+
+def export_cache(conn: sqlite3.Connection, cache_dir: Path) -> Dict:
+    """Write the columnar cache for ``conn`` into ``cache_dir``, replacing any previous export."""
+    cache_dir = Path(cache_dir)
+    staging = cache_dir.with_name(cache_dir.name + ".tmp")
+    if staging.exists():
+        shutil.rmtree(staging)
+    (staging / "dictionaries").mkdir(parents=True)
+
+    dictionaries: Dict[str, Dictionary] = {}
+    for specs in loader.COMPACT_COLUMNS.values():
+        for column, kind in specs.items():
+            if kind != "uuid":
+                dictionaries[column] = Dictionary(kind)
+
+    tables = {}
+    for table in loader.COMPACT_COLUMNS:
+        started = time.perf_counter()
+        layout = column_layout(table)
+        (staging / table).mkdir()
+        encoders = []
+        for name, _, domain in layout:
+            if domain is not None:
+                encoders.append(dictionaries.setdefault(domain, Dictionary()).encode)
+            elif name in TIMESTAMP_COLUMNS:
+                encoders.append(parse_timestamp)
+            else:
+                encoders.append(None)
+        handles = [(staging / table / f"{name}.bin").open("wb") for name, _, _ in layout]
+        rows = 0
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(name for name, _, _ in layout)} FROM {table}")
+            while True:
+                chunk = cursor.fetchmany(EXPORT_CHUNK)
+                if not chunk:
+                    break
+                for index, ((_, (_, typecode), _), encode, handle) in enumerate(zip(layout, encoders, handles)):
+                    values = [row[index] for row in chunk]
+                    buffer = array(typecode, map(encode, values) if encode else values)
+                    if sys.byteorder != "little":
+                        buffer.byteswap()
+                    buffer.tofile(handle)
+                rows += len(chunk)
+        finally:
+            for handle in handles:
+                handle.close()
+        columns = {}
+        for name, (dtype, _), domain in layout:
+            columns[name] = {"file": f"{table}/{name}.bin", "dtype": dtype}
+            if domain is not None:
+                columns[name]["domain"] = domain
+        tables[table] = {"rows": rows, "columns": columns}
+        print(f"[TIMING] columnar {table:16} {time.perf_counter() - started:8.3f}s rows={rows}")
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "source": conn.execute("PRAGMA database_list;").fetchone()[2],
+        "load_manifest": [
+            list(row) for row in conn.execute("SELECT table_name, file_hash FROM load_manifest ORDER BY 1, 2")
+        ],
+        "tables": tables,
+        "dictionaries": {},
+    }
+    for domain, dictionary in dictionaries.items():
+        path = f"dictionaries/{domain}.json"
+        (staging / path).write_text(json.dumps(dictionary.values), encoding="utf-8")
+        manifest["dictionaries"][domain] = {"file": path, "size": len(dictionary.values)}
+    (staging / MANIFEST).write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+
+    if cache_dir.exists():
+        shutil.rmtree(cache_dir)
+    staging.rename(cache_dir)
+    return manifest
+
+
+# ---------------------------------------------------------------------------
+# Reading and vectorized reports (NumPy).
+
+
+class ColumnarCache:
+    """Lazily memory-maps the columns and dictionaries described by an export's manifest."""
+
+    def __init__(self, cache_dir: Path) -> None:
+        require_numpy()
+        self.path = Path(cache_dir)
+        self.manifest = json.loads((self.path / MANIFEST).read_text(encoding="utf-8"))
+        if self.manifest["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"{self.path} has cache format {self.manifest['format_version']}, expected {FORMAT_VERSION}")
+        self._dictionaries: Dict[str, List[str]] = {}
+
+    def rows(self, table: str) -> int:
+        return self.manifest["tables"][table]["rows"]
+
+    def column(self, table: str, name: str) -> "np.ndarray":
+        spec = self.manifest["tables"][table]["columns"][name]
+        rows = self.rows(table)
+        if rows == 0:  # mmap cannot map an empty file
+            return np.empty(0, dtype=spec["dtype"])
+        return np.memmap(self.path / spec["file"], dtype=spec["dtype"], mode="r", shape=(rows,))
+
+    def dictionary(self, domain: str) -> List[str]:
+        if domain not in self._dictionaries:
+            path = self.path / self.manifest["dictionaries"][domain]["file"]
+            self._dictionaries[domain] = json.loads(path.read_text(encoding="utf-8"))
+        return self._dictionaries[domain]
+
+    def decode(self, table: str, name: str, code: int) -> Optional[str]:
+        domain = self.manifest["tables"][table]["columns"][name]["domain"]
+        return self.dictionary(domain)[code] if code >= 0 else None
+
+
+def timestamp_text(value: "np.datetime64") -> str:
+    """Render like the loaded TEXT column (``datetime.isoformat``), not NumPy's fixed-width form."""
+    return (EPOCH + int(value.astype("int64")) * ONE_US).isoformat()
+
+
+def group_first(keys: "np.ndarray") -> "np.ndarray":
+    """Start index of each run in a sorted key array."""
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def ltv_leaderboard(cache: ColumnarCache, limit: int = 50) -> Tuple[List[str], List[Tuple]]:
+    """The report's "Customer LTV leaderboard" statement, computed without the inventory fan-out join."""
+    n_customers, n_orders, n_products = cache.rows("customers"), cache.rows("orders"), cache.rows("products")
+    order_customer = cache.column("orders", "customer_id")
+    order_date = cache.column("orders", "order_date")
+    subtotal = cache.column("orders", "subtotal")
+    item_order = cache.column("order_items", "order_id")
+    item_product = cache.column("order_items", "product_id")
+
+    # order_fact, as arrays indexed by order code.
+    item_count = np.bincount(item_order, minlength=n_orders)
+    quantity = np.bincount(item_order, weights=cache.column("order_items", "quantity"), minlength=n_orders)
+    discount = np.bincount(item_order, weights=cache.column("order_items", "discount_amount"), minlength=n_orders)
+
+    sold = item_count > 0
+    customer = order_customer[sold]
+    total_orders = np.bincount(customer, minlength=n_customers)
+    total_items = np.bincount(customer, weights=quantity[sold], minlength=n_customers)
+    gross = np.bincount(customer, weights=subtotal[sold], minlength=n_customers)
+    discount_total = np.bincount(customer, weights=discount[sold], minlength=n_customers)
+    net = gross - discount_total
+
+    # Channel mix counts every order, including ones without line items (as the SQL does).
+    organic = cache.dictionary("acquisition_channel").index("organic")
+    all_orders = np.bincount(order_customer, minlength=n_customers)
+    organic_orders = np.bincount(
+        order_customer[cache.column("orders", "acquisition_channel") == organic], minlength=n_customers
+    )
+
+    # inventory_health averages event quantities over (line item, product event) pairs;
+    # per-product sums and counts give the same averages without materializing the pairs.
+    event_product = cache.column("inventory_events", "product_id")
+    event_type = cache.column("inventory_events", "event_type")
+    change = cache.column("inventory_events", "quantity_change")
+    event_types = cache.dictionary("event_type")
+    per_product = {}
+    for kind, sign in (("sale", -1), ("restock", 1)):
+        mask = event_type == event_types.index(kind)
+        per_product[kind] = (
+            np.bincount(event_product[mask], weights=sign * change[mask], minlength=n_products),
+            np.bincount(event_product[mask], minlength=n_products),
+        )
+    item_customer = order_customer[item_order]
+    averages = {}
+    for kind, (sums, counts) in per_product.items():
+        total = np.bincount(item_customer, weights=sums[item_product], minlength=n_customers)
+        pairs = np.bincount(item_customer, weights=counts[item_product], minlength=n_customers)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            averages[kind] = np.where(pairs > 0, total / pairs, np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pressure = np.where(averages["restock"] > 0, averages["sale"] / averages["restock"], np.nan)
+
+    # First/last sold order date, and the latest order overall (ties broken by order_id text).
+    by_date = np.flatnonzero(sold)[np.lexsort((order_date[sold], customer))]
+    starts = group_first(order_customer[by_date])
+    ends = np.r_[starts[1:], len(by_date)] - 1
+    first_date = dict(zip(order_customer[by_date[starts]].tolist(), order_date[by_date[starts]]))
+    last_date = dict(zip(order_customer[by_date[ends]].tolist(), order_date[by_date[ends]]))
+    id_rank = np.argsort(np.argsort(np.array(cache.dictionary("order_id")[:n_orders])))
+    latest = np.lexsort((id_rank, order_date, order_customer))
+    latest = latest[np.r_[group_first(order_customer[latest])[1:], len(latest)] - 1]
+    last_order = dict(zip(order_customer[latest].tolist(), latest.tolist()))
+
+    ranked = np.flatnonzero(total_orders > 0)
+    ranked = ranked[np.argsort(-net[ranked], kind="stable")][:limit]
+    first_names, last_names = cache.column("customers", "first_name"), cache.column("customers", "last_name")
+    tiers = cache.column("customers", "loyalty_tier")
+    statuses, sentiments = cache.column("orders", "order_status"), cache.column("orders", "customer_sentiment")
+    columns = [
+        "customer_id", "full_name", "first_order_date", "last_order_date", "total_orders", "total_items",
+        "gross_revenue", "discount_total", "net_revenue", "avg_order_value", "loyalty_tier", "organic_mix",
+        "paid_mix", "inventory_pressure_score", "last_order_status", "last_sentiment",
+    ]
+    rows = []
+    for code in ranked.tolist():
+        latest_order = last_order[code]
+        organic_mix = organic_orders[code] / all_orders[code]
+        rows.append((
+            cache.decode("customers", "customer_id", code),
+            f"{cache.decode('customers', 'first_name', first_names[code])} "
+            f"{cache.decode('customers', 'last_name', last_names[code])}",
+            timestamp_text(first_date[code]),
+            timestamp_text(last_date[code]),
+            int(total_orders[code]),
+            int(total_items[code]),
+            float(gross[code]),
+            float(discount_total[code]),
+            float(net[code]),
+            float(gross[code] / total_orders[code]),
+            cache.decode("customers", "loyalty_tier", tiers[code]),
+            float(organic_mix),
+            float(1 - organic_mix),
+            None if np.isnan(pressure[code]) else float(pressure[code]),
+            cache.decode("orders", "order_status", statuses[latest_order]),
+            cache.decode("orders", "customer_sentiment", sentiments[latest_order]),
+        ))
+    return columns, rows
+
+
+def category_contribution(cache: ColumnarCache) -> Tuple[List[str], List[Tuple]]:
+    """The report's "Product category contribution summary" statement."""
+    n_orders = cache.rows("orders")
+    item_order = cache.column("order_items", "order_id")
+    category = cache.column("products", "category")[cache.column("order_items", "product_id")]
+    n_categories = len(cache.dictionary("category"))
+    items = np.bincount(category, minlength=n_categories)
+    revenue = np.bincount(category, weights=cache.column("order_items", "line_total"), minlength=n_categories)
+    discount = np.bincount(category, weights=cache.column("order_items", "discount_amount"), minlength=n_categories)
+    # COUNT(DISTINCT order_id) per category: distinct (category, order) pairs.
+    pairs = np.unique(category.astype(np.int64) * n_orders + item_order)
+    orders = np.bincount(pairs // n_orders, minlength=n_categories)
+    rows = [
+        (cache.decode("products", "category", code), int(orders[code]), float(revenue[code]),
+         float(discount[code] / items[code]))
+        for code in np.argsort(-revenue, kind="stable").tolist()
+        if items[code]
+    ]
+    return ["category", "orders", "revenue", "avg_discount"], rows
+
+
+REPORTS = {"ltv_leaderboard": ltv_leaderboard, "category_contribution": category_contribution}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export/query a memory-mapped columnar cache of ecommerce.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="Write the cache from a loaded database")
+    export.add_argument("--database", type=Path, default=Path("../ecommerce.db"), help="SQLite DB path")
+    export.add_argument("--cache-dir", type=Path, required=True, help="Directory to (re)write")
+    report = commands.add_parser("report", help="Run vectorized reports over an exported cache (needs NumPy)")
+    report.add_argument("--cache-dir", type=Path, required=True, help="Directory written by export")
+    report.add_argument("--report", choices=sorted(REPORTS), nargs="+", default=sorted(REPORTS), help="Reports to run")
+    report.add_argument("--output-dir", type=Path, default=None, help="Write each report's rows here")
+    report.add_argument("--format", choices=("csv", "json"), default="csv", help="Result file format")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        if not args.database.exists():
+            parser.error(f"{args.database} does not exist; run load_ecommerce_data.py first")
+        conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+        try:
+            manifest = export_cache(conn, args.cache_dir)
+        finally:
+            conn.close()
+        total = sum(table["rows"] for table in manifest["tables"].values())
+        print(f"[DONE] Exported {total} rows to {args.cache_dir}")
+        return
+
+    if not (args.cache_dir / MANIFEST).exists():
+        parser.error(f"{args.cache_dir} has no {MANIFEST}; run the export command first")
+    cache = ColumnarCache(args.cache_dir)
+    if args.output_dir:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+    for name in args.report:
+        started = time.perf_counter()
+        columns, rows = REPORTS[name](cache)
+        print(f"[TIMING] {name:22} {time.perf_counter() - started:8.3f}s rows={len(rows)}")
+        if args.output_dir:
+            writer = RowWriter(args.output_dir / f"{name}.{args.format}", columns, args.format)
+            for row in rows:
+                writer.write(row)
+            writer.close()
+        else:
+            for row in rows[:10]:
+                print(f"[INFO]   {row}")
+    print("[DONE] Columnar reports complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,23 @@
-﻿import csv
+﻿import argparse
+import csv
+import os
 import random
+import shutil
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from datetime import datetime, timedelta
 from pathlib import Path
-from statistics import mean
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
-DATA_DIR.mkdir(exist_ok=True)
 
-random.seed(42)
-NOW = datetime.utcnow()
+DEFAULT_SEED = 42
+# Reference "now" for timestamps unless --as-of overrides it, so output depends only on seed and scale.
+DEFAULT_AS_OF = datetime(2025, 11, 14)
 THREE_YEARS = 365 * 3
 
+# Row counts at --scale 1; customers, products and orders scale linearly.
 NUM_CUSTOMERS = 750
 NUM_PRODUCTS = 180
 NUM_ORDERS = 1150
@@ -37,8 +42,20 @@ CITIES = {
 }
 COUNTRIES = ["US", "CA", "GB", "AU"]
 CHANNELS = ["email", "sms", "social", "paid_search", "affiliate", "organic"]
+CHANNEL_WEIGHTS = [0.2, 0.1, 0.25, 0.25, 0.1, 0.1]
+ORDER_STATUSES = ["pending", "shipped", "delivered", "cancelled", "returned"]
+STATUS_WEIGHTS = [0.1, 0.25, 0.45, 0.15, 0.05]
+NEGATIVE_STATUSES = {"cancelled", "returned"}
+COUPON_CODES = ["WELCOME10", "FREESHIP", "LOYAL20", None, None]
+TAX_RATES = [0.05, 0.07, 0.08]
+STREET_NAMES = ["Oak", "Maple", "Cedar", "Pine", "Elm"]
+STREET_SUFFIXES = ["Ave", "St", "Rd", "Blvd"]
 SENTIMENTS = ["positive", "neutral", "negative"]
 LOYALTY_TIERS = ["bronze", "silver", "gold", "platinum"]
+TIER_WEIGHTS = [0.55, 0.25, 0.15, 0.05]
+EMAIL_DOMAINS = ["onelane.com", "novaio.net", "mailarrow.io", "quibly.co"]
+PRODUCT_PREFIXES = ["Nova", "Echo", "Pulse", "Axis", "Terra"]
+PRODUCT_SUFFIXES = ["One", "Pro", "Max", "Mini", "Air"]
 LIFETIME_BUCKETS = ["low", "medium", "high"]
 EVENT_TYPES = ["restock", "sale", "return", "adjustment"]
 ACTORS = ["system", "warehouse_bot", "associate", "vendor"]
@@ -60,286 +77,486 @@ LAST_NAMES = [
     "Wilson", "Martinez", "Clark", "Lewis", "Young", "Hall", "Allen", "Torres",
 ]
 
-def random_date(start_days: int = THREE_YEARS) -> datetime:
-    return NOW - timedelta(days=random.randint(0, start_days), hours=random.randint(0, 23), minutes=random.randint(0, 59))
+FIELDNAMES = {
+    "customers.csv": [
+        "customer_id", "first_name", "last_name", "email", "phone",
+        "created_at", "marketing_opt_in", "loyalty_tier", "lifetime_value_bucket",
+    ],
+    "products.csv": [
+        "product_id", "name", "category", "brand", "price",
+        "created_at", "inventory_count", "active_flag",
+    ],
+    "orders.csv": [
+        "order_id", "customer_id", "order_date", "order_status",
+        "shipping_address", "shipping_city", "shipping_state", "shipping_postal_code", "shipping_country",
+        "subtotal", "shipping_cost", "tax_amount", "total_amount",
+        "coupon_code", "acquisition_channel", "customer_sentiment",
+    ],
+    "order_items.csv": [
+        "order_item_id", "order_id", "product_id", "quantity", "unit_price",
+        "discount_amount", "line_total", "tax_rate",
+    ],
+    "inventory_events.csv": [
+        "event_id", "product_id", "event_type", "quantity_change",
+        "event_timestamp", "note", "actor",
+    ],
+}
+
+
+def scaled(base: int, scale: float) -> int:
+    return max(1, round(base * scale))
+
+
+def new_uuid(rng: random.Random) -> str:
+    # uuid4 layout drawn from the seeded stream so output is reproducible.
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def random_date(rng: random.Random, now: datetime, start_days: int = THREE_YEARS) -> datetime:
+    return now - timedelta(days=rng.randint(0, start_days), hours=rng.randint(0, 23), minutes=rng.randint(0, 59))
 
 
-def random_phone() -> str:
-    return f"({random.randint(200, 989)})-{random.randint(200, 989):03}-{random.randint(1000, 9999):04}"
+def random_phone(rng: random.Random) -> str:
+    return f"({rng.randint(200, 989)})-{rng.randint(200, 989):03}-{rng.randint(1000, 9999):04}"
 
 
-def choose_state_city():
-    state, _ = random.choice(STATES)
-    city = random.choice(CITIES[state])
+def choose_state_city(rng: random.Random):
+    state, _ = rng.choice(STATES)
+    city = rng.choice(CITIES[state])
     return state, city
 
 
-def make_email(first: str, last: str) -> str:
-    domains = ["onelane.com", "novaio.net", "mailarrow.io", "quibly.co"]
-    return f"{first.lower()}.{last.lower()}{random.randint(10, 999)}@{random.choice(domains)}"
-
-
-customers = []
-customer_spend = {}
-customer_order_counts = {}
-customer_negative_events = {}
-for _ in range(NUM_CUSTOMERS):
-    first = random.choice(FIRST_NAMES)
-    last = random.choice(LAST_NAMES)
-    created_at = random_date()
-    customer_id = str(uuid.uuid4())
-    tier = random.choices(LOYALTY_TIERS, weights=[0.55, 0.25, 0.15, 0.05])[0]
-    customers.append({
-        "customer_id": customer_id,
-        "first_name": first,
-        "last_name": last,
-        "email": make_email(first, last),
-        "phone": random_phone(),
-        "created_at": created_at.isoformat(),
-        "marketing_opt_in": random.choice(["true", "false"]),
-        "loyalty_tier": tier,
-        "lifetime_value_bucket": "medium",
-    })
-    customer_spend[customer_id] = 0.0
-    customer_order_counts[customer_id] = 0
-    customer_negative_events[customer_id] = 0
-
-
-products = []
-product_prices = {}
-product_created = {}
-product_inventory = {}
-for _ in range(NUM_PRODUCTS):
-    category = random.choice(CATEGORIES)
-    product_id = str(uuid.uuid4())
-    price = round(random.uniform(10, 600), 2)
-    created_at = random_date()
-    inventory_count = random.randint(50, 500)
-    products.append({
-        "product_id": product_id,
-        "name": f"{random.choice(['Nova', 'Echo', 'Pulse', 'Axis', 'Terra'])} {random.choice(['One', 'Pro', 'Max', 'Mini', 'Air'])}",
-        "category": category,
-        "brand": random.choice(BRANDS[category]),
-        "price": f"{price:.2f}",
-        "created_at": created_at.isoformat(),
-        "inventory_count": inventory_count,
-        "active_flag": random.choice(["true", "true", "false"]),
-    })
-    product_prices[product_id] = price
-    product_created[product_id] = created_at
-    product_inventory[product_id] = inventory_count
-
-
-def random_address():
-    state, city = choose_state_city()
+def make_email(rng: random.Random, first: str, last: str) -> str:
+    return f"{first.lower()}.{last.lower()}{rng.randint(10, 999)}@{rng.choice(EMAIL_DOMAINS)}"
+
+
+def random_address(rng: random.Random):
+    state, city = choose_state_city(rng)
     return {
-        "shipping_address": f"{random.randint(100, 9999)} {random.choice(['Oak', 'Maple', 'Cedar', 'Pine', 'Elm'])} {random.choice(['Ave', 'St', 'Rd', 'Blvd'])}",
+        "shipping_address": f"{rng.randint(100, 9999)} {rng.choice(STREET_NAMES)} {rng.choice(STREET_SUFFIXES)}",
         "shipping_city": city,
         "shipping_state": state,
-        "shipping_postal_code": f"{random.randint(10000, 99999)}",
-        "shipping_country": random.choice(COUNTRIES),
+        "shipping_postal_code": f"{rng.randint(10000, 99999)}",
+        "shipping_country": rng.choice(COUNTRIES),
     }
 
-orders = []
-order_items = []
-inventory_events = []
-product_sales = {pid: 0 for pid in product_prices}
-
-for _ in range(NUM_ORDERS):
-    customer = random.choice(customers)
-    order_date = random_date()
-    address = random_address()
-    status = random.choices(
-        ["pending", "shipped", "delivered", "cancelled", "returned"],
-        weights=[0.1, 0.25, 0.45, 0.15, 0.05],
-    )[0]
-    acquisition_channel = random.choices(CHANNELS, weights=[0.2, 0.1, 0.25, 0.25, 0.1, 0.1])[0]
-    coupon_code = random.choice(["WELCOME10", "FREESHIP", "LOYAL20", None, None])
-
-    order_id = str(uuid.uuid4())
-    line_items = []
-    subtotal = 0.0
-    for _ in range(random.randint(1, MAX_ITEMS_PER_ORDER)):
-        product = random.choice(products)
-        product_id = product["product_id"]
-        quantity = random.randint(1, 4)
-        unit_price = product_prices[product_id]
-        discount = round(random.choice([0, 0, 0, unit_price * 0.1]), 2)
-        line_total = round(quantity * (unit_price - discount), 2)
-        tax_rate = random.choice([0.05, 0.07, 0.08])
-        line_items.append({
-            "order_item_id": str(uuid.uuid4()),
-            "order_id": order_id,
-            "product_id": product_id,
-            "quantity": quantity,
-            "unit_price": f"{unit_price:.2f}",
-            "discount_amount": f"{discount:.2f}",
-            "line_total": f"{line_total:.2f}",
-            "tax_rate": f"{tax_rate:.2f}",
+
+class CsvSink:
+    """Streams dict rows to one CSV file and counts them as they are written."""
+
+    def __init__(self, stack: ExitStack, path: Path, fieldnames, header: bool = True):
+        self.path = path
+        self.rows = 0
+        fh = stack.enter_context(path.open("w", newline="", encoding="utf-8"))
+        self.writer = csv.DictWriter(fh, fieldnames=fieldnames)
+        if header:
+            self.writer.writeheader()
+
+    def write(self, row) -> None:
+        self.writer.writerow(row)
+        self.rows += 1
+
+
+def generate_customers(rng: random.Random, now: datetime, count: int):
+    customers = []
+    for _ in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        created_at = random_date(rng, now)
+        customer_id = new_uuid(rng)
+        tier = rng.choices(LOYALTY_TIERS, weights=TIER_WEIGHTS)[0]
+        customers.append({
+            "customer_id": customer_id,
+            "first_name": first,
+            "last_name": last,
+            "email": make_email(rng, first, last),
+            "phone": random_phone(rng),
+            "created_at": created_at.isoformat(),
+            "marketing_opt_in": rng.choice(["true", "false"]),
+            "loyalty_tier": tier,
+            "lifetime_value_bucket": "medium",
         })
-        subtotal += line_total
-        product_sales[product_id] += quantity
-    shipping_cost = round(random.uniform(0, 25), 2)
-    tax_amount = round(subtotal * 0.0825, 2)
-    total_amount = round(subtotal + shipping_cost + tax_amount, 2)
-
-    customer_spend[customer["customer_id"]] += total_amount
-    customer_order_counts[customer["customer_id"]] += 1
-    if status in {"cancelled", "returned"}:
-        customer_negative_events[customer["customer_id"]] += 1
-
-    sentiment_score = customer_negative_events[customer["customer_id"]] / max(1, customer_order_counts[customer["customer_id"]])
-    if sentiment_score > 0.25:
-        sentiment = "negative"
-    elif sentiment_score > 0.1:
-        sentiment = "neutral"
-    else:
-        sentiment = "positive"
-
-    orders.append({
-        "order_id": order_id,
-        "customer_id": customer["customer_id"],
-        "order_date": order_date.isoformat(),
-        "order_status": status,
-        **address,
-        "subtotal": f"{subtotal:.2f}",
-        "shipping_cost": f"{shipping_cost:.2f}",
-        "tax_amount": f"{tax_amount:.2f}",
-        "total_amount": f"{total_amount:.2f}",
-        "coupon_code": coupon_code or "",
-        "acquisition_channel": acquisition_channel,
-        "customer_sentiment": sentiment,
-    })
-    order_items.extend(line_items)
-
-for product in products:
-    product_id = product["product_id"]
-    sold_qty = product_sales[product_id]
-    # ensure at least one restock prior
-    first_event_time = product_created[product_id] - timedelta(days=random.randint(5, 30))
-    inventory_events.append({
-        "event_id": str(uuid.uuid4()),
-        "product_id": product_id,
-        "event_type": "restock",
-        "quantity_change": str(random.randint(100, 400)),
-        "event_timestamp": first_event_time.isoformat(),
-        "note": "Initial load",
-        "actor": random.choice(ACTORS),
-    })
-    # sale events derived from order items
-    for _ in range(max(3, sold_qty // 5)):
-        qty = random.randint(1, 5)
-        event_time = product_created[product_id] + timedelta(days=random.randint(1, THREE_YEARS))
-        event_time = min(event_time, NOW)
-        inventory_events.append({
-            "event_id": str(uuid.uuid4()),
+    return customers
+
+
+def generate_products(rng: random.Random, now: datetime, count: int):
+    products = []
+    for _ in range(count):
+        category = rng.choice(CATEGORIES)
+        product_id = new_uuid(rng)
+        price = round(rng.uniform(10, 600), 2)
+        created_at = random_date(rng, now)
+        inventory_count = rng.randint(50, 500)
+        products.append({
             "product_id": product_id,
-            "event_type": "sale",
-            "quantity_change": str(-qty),
-            "event_timestamp": event_time.isoformat(),
-            "note": "order fulfillment",
-            "actor": random.choice(ACTORS),
+            "name": f"{rng.choice(PRODUCT_PREFIXES)} {rng.choice(PRODUCT_SUFFIXES)}",
+            "category": category,
+            "brand": rng.choice(BRANDS[category]),
+            "price": f"{price:.2f}",
+            "created_at": created_at.isoformat(),
+            "inventory_count": inventory_count,
+            "active_flag": rng.choice(["true", "true", "false"]),
         })
-    if random.random() < 0.3:
-        inventory_events.append({
-            "event_id": str(uuid.uuid4()),
-            "product_id": product_id,
-            "event_type": "restock",
-            "quantity_change": str(random.randint(20, 80)),
-            "event_timestamp": random_date().isoformat(),
-            "note": "mid-season",
-            "actor": random.choice(ACTORS),
+    return products
+
+
+def generate_orders(rng: random.Random, now: datetime, count: int, customers, products,
+                    order_sink: CsvSink, item_sink: CsvSink):
+    """Write ``count`` orders and their line items; return (customer_spend, product_sales)."""
+    customer_spend = {c["customer_id"]: 0.0 for c in customers}
+    customer_order_counts = {c["customer_id"]: 0 for c in customers}
+    customer_negative_events = {c["customer_id"]: 0 for c in customers}
+    product_sales = {p["product_id"]: 0 for p in products}
+    product_prices = {p["product_id"]: float(p["price"]) for p in products}
+
+    for _ in range(count):
+        customer = rng.choice(customers)
+        order_date = random_date(rng, now)
+        address = random_address(rng)
+        status = rng.choices(ORDER_STATUSES, weights=STATUS_WEIGHTS)[0]
+        acquisition_channel = rng.choices(CHANNELS, weights=CHANNEL_WEIGHTS)[0]
+        coupon_code = rng.choice(COUPON_CODES)
+
+        order_id = new_uuid(rng)
+        subtotal = 0.0
+        for _ in range(rng.randint(1, MAX_ITEMS_PER_ORDER)):
+            product = rng.choice(products)
+            product_id = product["product_id"]
+            quantity = rng.randint(1, 4)
+            unit_price = product_prices[product_id]
+            discount = round(rng.choice([0, 0, 0, unit_price * 0.1]), 2)
+            line_total = round(quantity * (unit_price - discount), 2)
+            tax_rate = rng.choice(TAX_RATES)
+            item_sink.write({
+                "order_item_id": new_uuid(rng),
+                "order_id": order_id,
+                "product_id": product_id,
+                "quantity": quantity,
+                "unit_price": f"{unit_price:.2f}",
+                "discount_amount": f"{discount:.2f}",
+                "line_total": f"{line_total:.2f}",
+                "tax_rate": f"{tax_rate:.2f}",
+            })
+            subtotal += line_total
+            product_sales[product_id] += quantity
+        shipping_cost = round(rng.uniform(0, 25), 2)
+        tax_amount = round(subtotal * 0.0825, 2)
+        total_amount = round(subtotal + shipping_cost + tax_amount, 2)
+
+        customer_spend[customer["customer_id"]] += total_amount
+        customer_order_counts[customer["customer_id"]] += 1
+        if status in NEGATIVE_STATUSES:
+            customer_negative_events[customer["customer_id"]] += 1
+
+        sentiment_score = customer_negative_events[customer["customer_id"]] / max(1, customer_order_counts[customer["customer_id"]])
+        if sentiment_score > 0.25:
+            sentiment = "negative"
+        elif sentiment_score > 0.1:
+            sentiment = "neutral"
+        else:
+            sentiment = "positive"
+
+        order_sink.write({
+            "order_id": order_id,
+            "customer_id": customer["customer_id"],
+            "order_date": order_date.isoformat(),
+            "order_status": status,
+            **address,
+            "subtotal": f"{subtotal:.2f}",
+            "shipping_cost": f"{shipping_cost:.2f}",
+            "tax_amount": f"{tax_amount:.2f}",
+            "total_amount": f"{total_amount:.2f}",
+            "coupon_code": coupon_code or "",
+            "acquisition_channel": acquisition_channel,
+            "customer_sentiment": sentiment,
         })
-
-for c in customers:
-    spend = customer_spend[c["customer_id"]]
-    if spend < 500:
-        bucket = "low"
-    elif spend < 2000:
-        bucket = "medium"
-    else:
-        bucket = "high"
-    if spend > 4000:
-        tier = "platinum"
-    elif spend > 2000:
-        tier = "gold"
-    elif spend > 1000:
-        tier = "silver"
-    else:
-        tier = c["loyalty_tier"]
-    c["lifetime_value_bucket"] = bucket
-    c["loyalty_tier"] = tier
+    return customer_spend, product_sales
 
 
-def write_csv(filename: str, rows, fieldnames):
-    path = DATA_DIR / filename
-    with path.open("w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(rows)
+def write_inventory_events(rng: random.Random, now: datetime, products, product_sales, sink: CsvSink) -> None:
+    for product in products:
+        product_id = product["product_id"]
+        product_created = datetime.fromisoformat(product["created_at"])
+        sold_qty = product_sales[product_id]
+        # ensure at least one restock prior
+        first_event_time = product_created - timedelta(days=rng.randint(5, 30))
+        sink.write({
+            "event_id": new_uuid(rng),
+            "product_id": product_id,
+            "event_type": "restock",
+            "quantity_change": str(rng.randint(100, 400)),
+            "event_timestamp": first_event_time.isoformat(),
+            "note": "Initial load",
+            "actor": rng.choice(ACTORS),
+        })
+        # sale events derived from order items
+        for _ in range(max(3, sold_qty // 5)):
+            qty = rng.randint(1, 5)
+            event_time = product_created + timedelta(days=rng.randint(1, THREE_YEARS))
+            event_time = min(event_time, now)
+            sink.write({
+                "event_id": new_uuid(rng),
+                "product_id": product_id,
+                "event_type": "sale",
+                "quantity_change": str(-qty),
+                "event_timestamp": event_time.isoformat(),
+                "note": "order fulfillment",
+                "actor": rng.choice(ACTORS),
+            })
+        if rng.random() < 0.3:
+            sink.write({
+                "event_id": new_uuid(rng),
+                "product_id": product_id,
+                "event_type": "restock",
+                "quantity_change": str(rng.randint(20, 80)),
+                "event_timestamp": random_date(rng, now).isoformat(),
+                "note": "mid-season",
+                "actor": rng.choice(ACTORS),
+            })
+
+
+def apply_spend_tiers(customers, customer_spend) -> None:
+    for c in customers:
+        spend = customer_spend[c["customer_id"]]
+        if spend < 500:
+            bucket = "low"
+        elif spend < 2000:
+            bucket = "medium"
+        else:
+            bucket = "high"
+        if spend > 4000:
+            tier = "platinum"
+        elif spend > 2000:
+            tier = "gold"
+        elif spend > 1000:
+            tier = "silver"
+        else:
+            tier = c["loyalty_tier"]
+        c["lifetime_value_bucket"] = bucket
+        c["loyalty_tier"] = tier
+
+
+def write_readme(output_dir: Path, summary, scale: float, seed: int) -> None:
+    readme_path = output_dir / "README.md"
+    with readme_path.open("w", encoding="utf-8") as f:
+        f.write("# Synthetic E-Commerce Dataset\n\n")
+        f.write("Generated via scripts/generate_data.py. All timestamps fall within the last three years.\n\n")
+        if scale != 1 or seed != DEFAULT_SEED:
+            f.write(f"Scale factor: {scale:g}x, seed: {seed}.\n\n")
+        f.write("## Files & Row Counts\n")
+        for name, count in summary.items():
+            f.write(f"- {name}: ~{count} rows\n")
+        f.write("\n## Validation Highlights\n")
+        f.write("- Referentials: orders -> customers, order_items -> (orders, products).\n")
+        f.write("- Financials: total_amount = subtotal + shipping + tax (rounded).\n")
+        f.write("- Inventory: sale events reflect item quantities sold; periodic restocks added.\n")
+        f.write("- Loyalty: tiers and lifetime value buckets derive from cumulative spend.\n")
+
+
+def generate(output_dir: Path, scale: float = 1.0, seed: int = DEFAULT_SEED, now: datetime = None):
+    """Generate the dataset into ``output_dir``; return ``{filename: (path, rows)}``.
+
+    Orders, order items and inventory events are written as they are produced,
+    so memory is bounded by the customer and product dimensions.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    now = now or DEFAULT_AS_OF
+    rng = random.Random(seed)
+    customers = generate_customers(rng, now, scaled(NUM_CUSTOMERS, scale))
+    products = generate_products(rng, now, scaled(NUM_PRODUCTS, scale))
+
+    with ExitStack() as stack:
+        sinks = {name: CsvSink(stack, output_dir / name, fields) for name, fields in FIELDNAMES.items()}
+        for product in products:
+            sinks["products.csv"].write(product)
+        customer_spend, product_sales = generate_orders(
+            rng, now, scaled(NUM_ORDERS, scale), customers, products,
+            sinks["orders.csv"], sinks["order_items.csv"],
+        )
+        write_inventory_events(rng, now, products, product_sales, sinks["inventory_events.csv"])
+        # Tiers depend on total spend, so customers are written last.
+        apply_spend_tiers(customers, customer_spend)
+        for customer in customers:
+            sinks["customers.csv"].write(customer)
+
+    ordered = ["customers.csv", "products.csv", "orders.csv", "order_items.csv", "inventory_events.csv"]
+    result = {name: (sinks[name].path, sinks[name].rows) for name in ordered}
+    write_readme(output_dir, {name: rows for name, (_, rows) in result.items()}, scale, seed)
+    return result
+
+
+# Dimension tables shared with shard workers, set once per process by _init_shard_worker.
+_SHARD_CONTEXT = {}
+
+
+def shard_seed(seed: int, stream: str, index: int) -> str:
+    # str seeds are hashed with SHA-512 by random.Random, so streams are stable and independent.
+    return f"{seed}/{stream}-{index}"
+
+
+def split_evenly(total: int, parts: int):
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def part_path(output_dir: Path, name: str, index: int) -> Path:
+    return output_dir / f"{Path(name).stem}.part-{index:04d}.csv"
+
+
+def _init_shard_worker(customers, products, now: datetime, output_dir: Path, seed: int) -> None:
+    _SHARD_CONTEXT.update(customers=customers, products=products, now=now, output_dir=output_dir, seed=seed)
+
+
+def _order_shard(task):
+    """Write one shard of orders/order items as headerless part files."""
+    index, count = task
+    ctx = _SHARD_CONTEXT
+    rng = random.Random(shard_seed(ctx["seed"], "orders", index))
+    with ExitStack() as stack:
+        orders = CsvSink(stack, part_path(ctx["output_dir"], "orders.csv", index), FIELDNAMES["orders.csv"], header=False)
+        items = CsvSink(stack, part_path(ctx["output_dir"], "order_items.csv", index), FIELDNAMES["order_items.csv"], header=False)
+        spend, sales = generate_orders(rng, ctx["now"], count, ctx["customers"], ctx["products"], orders, items)
+    return spend, sales, orders.rows, items.rows
+
+
+def _inventory_shard(task):
+    """Write inventory events for one contiguous slice of products."""
+    index, start, end, product_sales = task
+    ctx = _SHARD_CONTEXT
+    rng = random.Random(shard_seed(ctx["seed"], "inventory", index))
+    with ExitStack() as stack:
+        sink = CsvSink(stack, part_path(ctx["output_dir"], "inventory_events.csv", index),
+                       FIELDNAMES["inventory_events.csv"], header=False)
+        write_inventory_events(rng, ctx["now"], ctx["products"][start:end], product_sales, sink)
+    return sink.rows
+
+
+def merge_parts(output_dir: Path, name: str, shards: int) -> Path:
+    path = output_dir / name
+    with path.open("w", newline="", encoding="utf-8") as out:
+        csv.DictWriter(out, fieldnames=FIELDNAMES[name]).writeheader()
+        for index in range(shards):
+            part = part_path(output_dir, name, index)
+            with part.open("r", newline="", encoding="utf-8") as fh:
+                shutil.copyfileobj(fh, out, 1 << 20)
+            part.unlink()
     return path
 
-paths = {}
-paths['customers.csv'] = write_csv(
-    "customers.csv",
-    customers,
-    [
-        "customer_id", "first_name", "last_name", "email", "phone",
-        "created_at", "marketing_opt_in", "loyalty_tier", "lifetime_value_bucket",
-    ],
-)
-paths['products.csv'] = write_csv(
-    "products.csv",
-    products,
-    [
-        "product_id", "name", "category", "brand", "price",
-        "created_at", "inventory_count", "active_flag",
-    ],
-)
-paths['orders.csv'] = write_csv(
-    "orders.csv",
-    orders,
-    [
-        "order_id", "customer_id", "order_date", "order_status",
-        "shipping_address", "shipping_city", "shipping_state", "shipping_postal_code", "shipping_country",
-        "subtotal", "shipping_cost", "tax_amount", "total_amount",
-        "coupon_code", "acquisition_channel", "customer_sentiment",
-    ],
-)
-paths['order_items.csv'] = write_csv(
-    "order_items.csv",
-    order_items,
-    [
-        "order_item_id", "order_id", "product_id", "quantity", "unit_price",
-        "discount_amount", "line_total", "tax_rate",
-    ],
-)
-paths['inventory_events.csv'] = write_csv(
-    "inventory_events.csv",
-    inventory_events,
-    [
-        "event_id", "product_id", "event_type", "quantity_change",
-        "event_timestamp", "note", "actor",
-    ],
-)
 
-summary = {
-    name: sum(1 for _ in path.open()) - 1 for name, path in paths.items()
-}
+def generate_sharded(output_dir: Path, scale: float = 1.0, seed: int = DEFAULT_SEED, now: datetime = None,
+                     shards: int = 2, workers: int = None):
+    """Sharded variant of :func:`generate` that runs fact-table shards in a process pool.
+
+    Each shard draws from its own stream seeded by (seed, shard index), and part
+    files are merged in shard order, so output is byte-identical for a given
+    (seed, scale, shards, as-of) regardless of ``workers``; ``now`` defaults to
+    DEFAULT_AS_OF. Spend and product sales are summed across shards before
+    tiers and sale events are derived; order sentiment only sees the
+    customer's history within its shard.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    now = now or DEFAULT_AS_OF
+    rng = random.Random(seed)
+    customers = generate_customers(rng, now, scaled(NUM_CUSTOMERS, scale))
+    products = generate_products(rng, now, scaled(NUM_PRODUCTS, scale))
+
+    with ExitStack() as stack:
+        sink = CsvSink(stack, output_dir / "products.csv", FIELDNAMES["products.csv"])
+        for product in products:
+            sink.write(product)
+    rows = {"products.csv": sink.rows}
+
+    customer_spend = {c["customer_id"]: 0.0 for c in customers}
+    product_sales = {p["product_id"]: 0 for p in products}
+    rows["orders.csv"] = rows["order_items.csv"] = 0
+    with ProcessPoolExecutor(
+        max_workers=workers or min(shards, os.cpu_count() or 1),
+        initializer=_init_shard_worker,
+        initargs=(customers, products, now, output_dir, seed),
+    ) as pool:
+        order_tasks = list(enumerate(split_evenly(scaled(NUM_ORDERS, scale), shards)))
+        # map() yields in submission order, keeping the float sums deterministic.
+        for spend, sales, order_rows, item_rows in pool.map(_order_shard, order_tasks):
+            for customer_id, amount in spend.items():
+                customer_spend[customer_id] += amount
+            for product_id, qty in sales.items():
+                product_sales[product_id] += qty
+            rows["orders.csv"] += order_rows
+            rows["order_items.csv"] += item_rows
+
+        bounds = [0]
+        for size in split_evenly(len(products), shards):
+            bounds.append(bounds[-1] + size)
+        inventory_tasks = [
+            (index, start, end, {p["product_id"]: product_sales[p["product_id"]] for p in products[start:end]})
+            for index, (start, end) in enumerate(zip(bounds, bounds[1:]))
+        ]
+        rows["inventory_events.csv"] = sum(pool.map(_inventory_shard, inventory_tasks))
+
+    for name in ("orders.csv", "order_items.csv", "inventory_events.csv"):
+        merge_parts(output_dir, name, shards)
+
+    apply_spend_tiers(customers, customer_spend)
+    with ExitStack() as stack:
+        sink = CsvSink(stack, output_dir / "customers.csv", FIELDNAMES["customers.csv"])
+        for customer in customers:
+            sink.write(customer)
+    rows["customers.csv"] = sink.rows
+
+    ordered = ["customers.csv", "products.csv", "orders.csv", "order_items.csv", "inventory_events.csv"]
+    result = {name: (output_dir / name, rows[name]) for name in ordered}
+    write_readme(output_dir, {name: rows[name] for name in ordered}, scale, seed)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate the synthetic e-commerce dataset")
+    parser.add_argument("--scale", type=float, default=1.0, help="Scale factor (1, 10, 100, 1000, ...)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Random seed")
+    parser.add_argument("--output-dir", type=Path, default=DATA_DIR, help="Directory for the CSV files")
+    parser.add_argument(
+        "--as-of",
+        type=datetime.fromisoformat,
+        default=DEFAULT_AS_OF,
+        help=f"Reference 'now' for timestamps (ISO format, default {DEFAULT_AS_OF.isoformat()}); "
+        "output is deterministic for a given seed, scale and as-of",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split fact-table generation into N independently seeded shards (output depends on N)",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Processes for sharded generation")
+    parser.add_argument(
+        "--engine",
+        choices=("python", "numpy"),
+        default="python",
+        help="Fact-table generator: pure Python (default) or vectorized NumPy columns",
+    )
+    args = parser.parse_args()
+    if args.scale <= 0:
+        parser.error("--scale must be positive")
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.engine == "numpy" and args.shards > 1:
+        parser.error("--engine numpy is single-process; drop --shards")
+
+    if args.engine == "numpy":
+        from generate_vectorized import generate_vectorized
+
+        result = generate_vectorized(args.output_dir, scale=args.scale, seed=args.seed, now=args.as_of)
+    elif args.shards > 1:
+        result = generate_sharded(
+            args.output_dir, scale=args.scale, seed=args.seed, now=args.as_of,
+            shards=args.shards, workers=args.workers,
+        )
+    else:
+        result = generate(args.output_dir, scale=args.scale, seed=args.seed, now=args.as_of)
+    print("Generated dataset:")
+    for name, (path, rows) in result.items():
+        print(f"- {name}: {rows} rows -> {path}")
+
 
-readme_path = DATA_DIR / "README.md"
-with readme_path.open("w", encoding="utf-8") as f:
-    f.write("# Synthetic E-Commerce Dataset\n\n")
-    f.write("Generated via scripts/generate_data.py. All timestamps fall within the last three years.\n\n")
-    f.write("## Files & Row Counts\n")
-    for name, count in summary.items():
-        f.write(f"- {name}: ~{count} rows\n")
-    f.write("\n## Validation Highlights\n")
-    f.write("- Referentials: orders -> customers, order_items -> (orders, products).\n")
-    f.write("- Financials: total_amount = subtotal + shipping + tax (rounded).\n")
-    f.write("- Inventory: sale events reflect item quantities sold; periodic restocks added.\n")
-    f.write("- Loyalty: tiers and lifetime value buckets derive from cumulative spend.\n")
-
-print("Generated dataset:")
-for name, path in paths.items():
-    print(f"- {name}: {summary[name]} rows -> {path}")
+if __name__ == "__main__":
+    main()
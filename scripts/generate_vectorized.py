@@ -0,0 +1,436 @@
+"""NumPy engine for generate_data.py (``--engine numpy``).
+
+Every column is drawn as an array from the same weighted distributions as the
+pure-Python path (fact tables a chunk at a time), spend and sales are reduced
+with ``np.bincount`` instead of per-row dict updates, and CSV text is assembled
+as byte matrices rather than formatted cell by cell. The random stream differs
+from the Python engine, so output matches it in schema and distribution, not
+bytes; it is still deterministic for a given seed, scale and as-of.
+
+A column is encoded as a list of ``(bytes, valid)`` segments: a padded
+``(rows, width)`` ``uint8`` matrix and a mask of the bytes that belong to each
+cell (``None`` when every byte does). A chunk of rows is rendered by copying the
+segments side by side into one matrix and taking a single boolean selection, so
+no per-row offsets are ever computed.
+"""
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency, only needed for --engine numpy
+    np = None
+
+import generate_data as gd
+
+# Orders drawn per chunk; bounds memory independently of scale.
+ORDER_CHUNK = 250_000
+PRODUCT_CHUNK = 50_000
+# Matches csv.DictWriter's default line terminator used by the Python engine.
+LINE_END = "\r\n"
+DAY_US = 86_400 * 1_000_000
+MINUTE_US = 60 * 1_000_000
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise SystemExit("--engine numpy requires NumPy (pip install numpy)")
+
+
+# ---------------------------------------------------------------------------
+# Column encoders. No generated value contains a delimiter or quote, so fields
+# are joined without CSV quoting.
+
+
+def const(text: str, n: int):
+    raw = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+    return [(np.broadcast_to(raw, (n, len(raw))), None)]
+
+
+def fixed(values):
+    """Encode an array of equal-width ASCII strings (timestamps)."""
+    raw = np.asarray(values).astype("S")
+    used = len(raw[0]) if len(raw) else 0
+    return [(raw.view(np.uint8).reshape(len(raw), raw.dtype.itemsize)[:, :used], None)]
+
+
+def vocab(options, codes):
+    """Encode ``options[codes]`` via a per-option lookup table."""
+    encoded = [option.encode("utf-8") for option in options]
+    width = max(1, max(len(value) for value in encoded))
+    table = np.zeros((len(encoded), width), dtype=np.uint8)
+    for row, value in enumerate(encoded):
+        table[row, :len(value)] = np.frombuffer(value, dtype=np.uint8)
+    lengths = np.asarray([len(value) for value in encoded])
+    return [(table[codes], (np.arange(width)[None, :] < lengths[:, None])[codes])]
+
+
+def digits(values, min_width: int = 1):
+    """Decimal digits of non-negative integers, zero-padded to ``min_width``."""
+    values = np.asarray(values, dtype=np.int64)
+    top = int(values.max()) if len(values) else 0
+    width = max(min_width, len(str(top)))
+    matrix = np.empty((len(values), width), dtype=np.uint8)
+    rest = values.copy()
+    for col in range(width - 1, -1, -1):
+        matrix[:, col] = 48 + rest % 10
+        rest //= 10
+    if width == min_width:
+        return [(matrix, None)]
+    lengths = np.full(len(values), min_width, dtype=np.int64)
+    for power in range(min_width, width):
+        lengths += values >= 10 ** power
+    # Right-aligned: the leading (width - length) bytes are padding.
+    return [(matrix, np.arange(width)[None, :] >= (width - lengths)[:, None])]
+
+
+def signed(values):
+    values = np.asarray(values, dtype=np.int64)
+    (minus, _), = const("-", len(values))
+    return [(minus, (values < 0)[:, None])] + digits(np.abs(values))
+
+
+def money(values):
+    """``%.2f`` for non-negative amounts already rounded to cents."""
+    cents = np.rint(np.asarray(values) * 100).astype(np.int64)
+    return digits(cents // 100) + const(".", len(cents)) + digits(cents % 100, min_width=2)
+
+
+def timestamps(values, with_micros: bool):
+    # datetime.isoformat() omits the fraction when microsecond == 0.
+    return fixed(np.datetime_as_string(values, unit="us" if with_micros else "s"))
+
+
+def concat(parts):
+    """Concatenate encoded columns row by row."""
+    return [segment for part in parts for segment in part]
+
+
+def take(column, idx):
+    return [(matrix[idx], None if valid is None else valid[idx]) for matrix, valid in column]
+
+
+def encode_rows(columns) -> bytes:
+    n = len(columns[0][0][0])
+    parts = []
+    for position, column in enumerate(columns):
+        if position:
+            parts.append(const(",", n))
+        parts.append(column)
+    parts.append(const(LINE_END, n))
+    segments = concat(parts)
+    width = sum(matrix.shape[1] for matrix, _ in segments)
+    out = np.empty((n, width), dtype=np.uint8)
+    keep = np.ones((n, width), dtype=bool)
+    col = 0
+    for matrix, valid in segments:
+        end = col + matrix.shape[1]
+        out[:, col:end] = matrix
+        if valid is not None:
+            keep[:, col:end] = valid
+        col = end
+    # Row-major boolean selection yields the rows back to back.
+    return out[keep].tobytes()
+
+
+def write_rows(fh, columns) -> int:
+    rows = len(columns[0][0][0])
+    if rows:
+        fh.write(encode_rows(columns))
+    return rows
+
+
+def open_csv(stack: ExitStack, path: Path, name: str):
+    fh = stack.enter_context(path.open("wb"))
+    fh.write((",".join(gd.FIELDNAMES[name]) + LINE_END).encode("utf-8"))
+    return fh
+
+
+# ---------------------------------------------------------------------------
+# Generators
+
+
+def uuid_column(rng, n: int):
+    """Random version-4 UUIDs as an encoded column."""
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hex_digits = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+    hexed = np.empty((n, 32), dtype=np.uint8)
+    hexed[:, 0::2] = hex_digits[raw >> 4]
+    hexed[:, 1::2] = hex_digits[raw & 0x0F]
+    out = np.full((n, 36), ord("-"), dtype=np.uint8)
+    for start, end, src in ((0, 8, 0), (9, 13, 8), (14, 18, 12), (19, 23, 16), (24, 36, 20)):
+        out[:, start:end] = hexed[:, src:src + end - start]
+    return [(out, None)]
+
+
+def random_offsets(rng, n: int, max_days: int = gd.THREE_YEARS):
+    """Microsecond offsets with the same day/hour/minute spread as gd.random_date."""
+    days = rng.integers(0, max_days + 1, n)
+    hours = rng.integers(0, 24, n)
+    minutes = rng.integers(0, 60, n)
+    return ((days * 24 + hours) * 60 + minutes) * MINUTE_US
+
+
+def choose(rng, options, n: int):
+    return rng.integers(0, len(options), n)
+
+
+def generate_customers(rng, now: datetime, count: int):
+    """Encoded customer columns plus tier codes, finalised by apply_spend_tiers."""
+    first = choose(rng, gd.FIRST_NAMES, count)
+    last = choose(rng, gd.LAST_NAMES, count)
+    created = np.datetime64(now, "us") - random_offsets(rng, count).astype("timedelta64[us]")
+    email = concat([
+        vocab([name.lower() for name in gd.FIRST_NAMES], first),
+        const(".", count),
+        vocab([name.lower() for name in gd.LAST_NAMES], last),
+        digits(rng.integers(10, 1000, count)),
+        const("@", count),
+        vocab(gd.EMAIL_DOMAINS, choose(rng, gd.EMAIL_DOMAINS, count)),
+    ])
+    phone = concat([
+        const("(", count),
+        digits(rng.integers(200, 990, count)),
+        const(")-", count),
+        digits(rng.integers(200, 990, count), min_width=3),
+        const("-", count),
+        digits(rng.integers(1000, 10000, count), min_width=4),
+    ])
+    return {
+        "customer_id": uuid_column(rng, count),
+        "first_name": vocab(gd.FIRST_NAMES, first),
+        "last_name": vocab(gd.LAST_NAMES, last),
+        "email": email,
+        "phone": phone,
+        "created_at": timestamps(created, bool(now.microsecond)),
+        "marketing_opt_in": vocab(["true", "false"], rng.integers(0, 2, count)),
+        "tier_code": rng.choice(len(gd.LOYALTY_TIERS), size=count, p=gd.TIER_WEIGHTS),
+    }
+
+
+def generate_products(rng, now: datetime, count: int):
+    category = choose(rng, gd.CATEGORIES, count)
+    brands = [brand for name in gd.CATEGORIES for brand in gd.BRANDS[name]]
+    return {
+        "product_id": uuid_column(rng, count),
+        "name": concat([
+            vocab(gd.PRODUCT_PREFIXES, choose(rng, gd.PRODUCT_PREFIXES, count)),
+            const(" ", count),
+            vocab(gd.PRODUCT_SUFFIXES, choose(rng, gd.PRODUCT_SUFFIXES, count)),
+        ]),
+        "category": vocab(gd.CATEGORIES, category),
+        "brand": vocab(brands, category * 3 + rng.integers(0, 3, count)),
+        "price": np.round(rng.uniform(10, 600, count), 2),
+        "created_at": np.datetime64(now, "us") - random_offsets(rng, count).astype("timedelta64[us]"),
+        "inventory_count": rng.integers(50, 501, count),
+        "active_flag": vocab(["true", "true", "false"], rng.integers(0, 3, count)),
+    }
+
+
+def apply_spend_tiers(customers, spend) -> None:
+    """Vectorized gd.apply_spend_tiers: bucket and tier upgrades from total spend."""
+    bucket = np.where(spend < 500, 0, np.where(spend < 2000, 1, 2))
+    customers["lifetime_value_bucket"] = vocab(gd.LIFETIME_BUCKETS, bucket)
+    tier = np.select([spend > 4000, spend > 2000, spend > 1000], [3, 2, 1], customers["tier_code"])
+    customers["loyalty_tier"] = vocab(gd.LOYALTY_TIERS, tier)
+
+
+def running_share(keys, flags):
+    """Per row: (rows seen so far for its key, flagged rows so far), in row order."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    sorted_flags = flags[order].astype(np.int64)
+    is_start = np.r_[True, sorted_keys[1:] != sorted_keys[:-1]]
+    starts = np.flatnonzero(is_start)
+    group = np.cumsum(is_start) - 1
+    seen = np.arange(len(keys)) - starts[group] + 1
+    flagged = np.cumsum(sorted_flags)
+    flagged -= (flagged[starts] - sorted_flags[starts])[group]
+    out_seen = np.empty_like(seen)
+    out_flagged = np.empty_like(flagged)
+    out_seen[order] = seen
+    out_flagged[order] = flagged
+    return out_seen, out_flagged
+
+
+def write_orders(rng, now: datetime, count: int, customers, products, orders_fh, items_fh):
+    """Write ``count`` orders and line items; return (customer spend, product sales, row counts)."""
+    customer_ids = customers["customer_id"]
+    product_ids = products["product_id"]
+    n_customers = len(customer_ids[0][0])
+    n_products = len(product_ids[0][0])
+    prices = products["price"]
+    now_us = np.datetime64(now, "us")
+    with_micros = bool(now.microsecond)
+    states = [state for state, _ in gd.STATES]
+    cities = [city for state in states for city in gd.CITIES[state]]
+    negative = np.asarray([status in gd.NEGATIVE_STATUSES for status in gd.ORDER_STATUSES])
+    sentiments = ["positive", "neutral", "negative"]
+
+    spend = np.zeros(n_customers)
+    sales = np.zeros(n_products, dtype=np.int64)
+    prior_orders = np.zeros(n_customers, dtype=np.int64)
+    prior_negative = np.zeros(n_customers, dtype=np.int64)
+    counts = [0, 0]
+
+    for start in range(0, count, ORDER_CHUNK):
+        n = min(ORDER_CHUNK, count - start)
+        cust = rng.integers(0, n_customers, n)
+        order_date = now_us - random_offsets(rng, n).astype("timedelta64[us]")
+        state = choose(rng, states, n)
+        status = rng.choice(len(gd.ORDER_STATUSES), size=n, p=gd.STATUS_WEIGHTS)
+        channel = rng.choice(len(gd.CHANNELS), size=n, p=gd.CHANNEL_WEIGHTS)
+
+        # Line items: 1..MAX_ITEMS_PER_ORDER per order, owner index via repeat.
+        owner = np.repeat(np.arange(n), rng.integers(1, gd.MAX_ITEMS_PER_ORDER + 1, n))
+        m = len(owner)
+        product = rng.integers(0, n_products, m)
+        quantity = rng.integers(1, 5, m)
+        unit_price = prices[product]
+        discount = np.where(rng.integers(0, 4, m) == 3, np.round(unit_price * 0.1, 2), 0.0)
+        line_total = np.round(quantity * (unit_price - discount), 2)
+
+        subtotal = np.bincount(owner, weights=line_total, minlength=n)
+        shipping = np.round(rng.uniform(0, 25, n), 2)
+        tax = np.round(subtotal * 0.0825, 2)
+        total = np.round(subtotal + shipping + tax, 2)
+
+        spend += np.bincount(cust, weights=total, minlength=n_customers)
+        sales += np.bincount(product, weights=quantity, minlength=n_products).astype(np.int64)
+
+        # Sentiment follows each customer's running cancelled/returned share,
+        # carried across chunks like the Python engine's per-customer counters.
+        is_negative = negative[status]
+        seen, flagged = running_share(cust, is_negative)
+        score = (prior_negative[cust] + flagged) / np.maximum(1, prior_orders[cust] + seen)
+        sentiment = np.where(score > 0.25, 2, np.where(score > 0.1, 1, 0))
+        prior_orders += np.bincount(cust, minlength=n_customers)
+        prior_negative += np.bincount(cust, weights=is_negative, minlength=n_customers).astype(np.int64)
+
+        order_ids = uuid_column(rng, n)
+        counts[0] += write_rows(orders_fh, [
+            order_ids,
+            take(customer_ids, cust),
+            timestamps(order_date, with_micros),
+            vocab(gd.ORDER_STATUSES, status),
+            concat([
+                digits(rng.integers(100, 10000, n)),
+                const(" ", n),
+                vocab(gd.STREET_NAMES, choose(rng, gd.STREET_NAMES, n)),
+                const(" ", n),
+                vocab(gd.STREET_SUFFIXES, choose(rng, gd.STREET_SUFFIXES, n)),
+            ]),
+            vocab(cities, state * 3 + rng.integers(0, 3, n)),
+            vocab(states, state),
+            digits(rng.integers(10000, 100000, n)),
+            vocab(gd.COUNTRIES, choose(rng, gd.COUNTRIES, n)),
+            money(subtotal),
+            money(shipping),
+            money(tax),
+            money(total),
+            vocab([code or "" for code in gd.COUPON_CODES], choose(rng, gd.COUPON_CODES, n)),
+            vocab(gd.CHANNELS, channel),
+            vocab(sentiments, sentiment),
+        ])
+        counts[1] += write_rows(items_fh, [
+            uuid_column(rng, m),
+            take(order_ids, owner),
+            take(product_ids, product),
+            digits(quantity),
+            money(unit_price),
+            money(discount),
+            money(line_total),
+            vocab([f"{rate:.2f}" for rate in gd.TAX_RATES], choose(rng, gd.TAX_RATES, m)),
+        ])
+    return spend, sales, counts
+
+
+def write_inventory(rng, now: datetime, products, sales, fh) -> int:
+    """Initial restock, max(3, sold // 5) sale events and an optional mid-season restock per product."""
+    now_us = np.datetime64(now, "us")
+    with_micros = bool(now.microsecond)
+    written = 0
+    total_products = len(products["product_id"][0][0])
+    for start in range(0, total_products, PRODUCT_CHUNK):
+        n = min(PRODUCT_CHUNK, total_products - start)
+        created = products["created_at"][start:start + n]
+        sale_owner = np.repeat(np.arange(n), np.maximum(3, sales[start:start + n] // 5))
+        mid_owner = np.flatnonzero(rng.random(n) < 0.3)
+
+        owner = np.concatenate([np.arange(n), sale_owner, mid_owner])
+        kind = np.concatenate([
+            np.zeros(n, dtype=np.int64), np.ones(len(sale_owner), dtype=np.int64), np.full(len(mid_owner), 2),
+        ])
+        quantity = np.concatenate([
+            rng.integers(100, 401, n),
+            -rng.integers(1, 6, len(sale_owner)),
+            rng.integers(20, 81, len(mid_owner)),
+        ])
+        timestamp = np.concatenate([
+            created - (rng.integers(5, 31, n) * DAY_US).astype("timedelta64[us]"),
+            np.minimum(
+                created[sale_owner]
+                + (rng.integers(1, gd.THREE_YEARS + 1, len(sale_owner)) * DAY_US).astype("timedelta64[us]"),
+                now_us,
+            ),
+            now_us - random_offsets(rng, len(mid_owner)).astype("timedelta64[us]"),
+        ])
+        # Same per-product grouping as the Python engine: restock, sales, mid-season.
+        order = np.argsort(owner * 3 + kind, kind="stable")
+        owner, kind, quantity, timestamp = owner[order], kind[order], quantity[order], timestamp[order]
+        rows = len(owner)
+        written += write_rows(fh, [
+            uuid_column(rng, rows),
+            take(products["product_id"], start + owner),
+            vocab(["restock", "sale", "restock"], kind),
+            signed(quantity),
+            timestamps(timestamp, with_micros),
+            vocab(["Initial load", "order fulfillment", "mid-season"], kind),
+            vocab(gd.ACTORS, choose(rng, gd.ACTORS, rows)),
+        ])
+    return written
+
+
+def generate_vectorized(output_dir: Path, scale: float = 1.0, seed: int = gd.DEFAULT_SEED, now: datetime = None):
+    """Vectorized counterpart of :func:`generate_data.generate`; same return shape."""
+    require_numpy()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    now = now or gd.DEFAULT_AS_OF
+    with_micros = bool(now.microsecond)
+    rng = np.random.default_rng(seed)
+    customers = generate_customers(rng, now, gd.scaled(gd.NUM_CUSTOMERS, scale))
+    products = generate_products(rng, now, gd.scaled(gd.NUM_PRODUCTS, scale))
+
+    rows = {}
+    with ExitStack() as stack:
+        rows["products.csv"] = write_rows(open_csv(stack, output_dir / "products.csv", "products.csv"), [
+            products["product_id"],
+            products["name"],
+            products["category"],
+            products["brand"],
+            money(products["price"]),
+            timestamps(products["created_at"], with_micros),
+            digits(products["inventory_count"]),
+            products["active_flag"],
+        ])
+        spend, sales, (rows["orders.csv"], rows["order_items.csv"]) = write_orders(
+            rng, now, gd.scaled(gd.NUM_ORDERS, scale), customers, products,
+            open_csv(stack, output_dir / "orders.csv", "orders.csv"),
+            open_csv(stack, output_dir / "order_items.csv", "order_items.csv"),
+        )
+        rows["inventory_events.csv"] = write_inventory(
+            rng, now, products, sales, open_csv(stack, output_dir / "inventory_events.csv", "inventory_events.csv"),
+        )
+        # Tiers depend on total spend, so customers are written last.
+        apply_spend_tiers(customers, spend)
+        rows["customers.csv"] = write_rows(
+            open_csv(stack, output_dir / "customers.csv", "customers.csv"),
+            [customers[name] for name in gd.FIELDNAMES["customers.csv"]],
+        )
+
+    ordered = ["customers.csv", "products.csv", "orders.csv", "order_items.csv", "inventory_events.csv"]
+    gd.write_readme(output_dir, {name: rows[name] for name in ordered}, scale, seed)
+    return {name: (output_dir / name, rows[name]) for name in ordered}
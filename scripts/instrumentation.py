@@ -0,0 +1,220 @@
+"""Per-stage load metrics as JSON lines, plus opt-in cProfile and tracemalloc hooks.
+
+``stage(name)`` times a block. Once ``configure(path)`` has been called, each
+stage also appends one JSON record to ``path``:
+
+    {"event": "stage", "stage": "insert:orders", "run_id": ..., "pid": ...,
+     "started_at": "...Z", "seconds": 0.42, "rows": 1150, "rows_per_sec": 2738.1,
+     "peak_rss_mb": 61.2, "traced_peak_mb": 12.9, ...}
+
+``peak_rss_mb`` is the process high-water mark when the stage ended (``getrusage``,
+Unix only), so the stage that raises it is where memory went. ``traced_peak_mb``
+is the stage's own Python-allocation peak and is only present under
+``trace_memory``. Records are appended per line, so forked shard or worker
+processes can share one file; ``run_id`` and ``pid`` tell the runs apart.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_log: Optional["MetricsLog"] = None
+# Under trace_memory: (traced bytes, stage, snapshot) of the fullest stage end seen so far.
+_fullest: Optional[Tuple[int, str, tracemalloc.Snapshot]] = None
+# Traced peak of each open stage before its innermost child reset the counter.
+_peaks: List[int] = []
+
+
+class MetricsLog:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.run_id = uuid.uuid4().hex[:12]
+        self.fields: Dict = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def emit(self, record: Dict) -> None:
+        record = {**record, **self.fields, "run_id": self.run_id, "pid": os.getpid()}
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record, default=str) + "\n")
+
+
+def configure(path: Optional[Path], **context) -> Optional[MetricsLog]:
+    """Start appending records to ``path`` (None turns the log off); ``context`` goes into the run record."""
+    global _log
+    _log = MetricsLog(path) if path is not None else None
+    if _log is not None:
+        event("run", **context)
+    return _log
+
+
+def set_context(**fields) -> None:
+    """Fields added to every later record of this process (e.g. which shard database it loads)."""
+    if _log is not None:
+        _log.fields.update(fields)
+
+
+def event(name: str, **fields) -> None:
+    if _log is not None:
+        _log.emit({"event": name, "at": utc_now(), **fields})
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def record(name: str, seconds: float, started_at: Optional[str] = None, **fields) -> None:
+    """Emit a stage whose time was accumulated elsewhere (e.g. across streamed chunks)."""
+    if _log is None:
+        return
+    rows = fields.get("rows")
+    if rows is not None and seconds > 0:
+        fields["rows_per_sec"] = round(rows / seconds, 1)
+    _log.emit({
+        "event": "stage",
+        "stage": name,
+        "started_at": started_at,
+        "seconds": round(seconds, 6),
+        **fields,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+
+
+@contextmanager
+def stage(name: str, **fields) -> Iterator[Dict]:
+    """Time the block; the yielded dict collects extra fields such as ``rows``."""
+    info: Dict = dict(fields)
+    started_at = utc_now()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        if _peaks:
+            _peaks[-1] = max(_peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        _peaks.append(0)
+    started = time.perf_counter()
+    try:
+        yield info
+    except BaseException as exc:
+        info["error"] = repr(exc)
+        raise
+    finally:
+        info["seconds"] = seconds = time.perf_counter() - started
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, _peaks.pop())
+            if _peaks:
+                _peaks[-1] = max(_peaks[-1], peak)
+            info["traced_peak_mb"] = round(peak / (1 << 20), 1)
+            keep_if_fullest(name, current)
+        record(name, seconds, started_at, **{key: value for key, value in info.items() if key != "seconds"})
+
+
+def keep_if_fullest(name: str, current: int) -> None:
+    global _fullest
+    if _fullest is None or current > _fullest[0]:
+        _fullest = (current, name, tracemalloc.take_snapshot())
+
+
+@contextmanager
+def profile(path: Optional[Path], top: int = 25) -> Iterator[None]:
+    """cProfile the block, dump stats to ``path`` (for snakeviz/pstats) and print the top functions."""
+    if path is None:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out).sort_stats("cumulative")
+        stats.print_stats(top)
+        print(f"[PROFILE] Top {top} functions by cumulative time (full stats in {path}):")
+        print(out.getvalue().rstrip())
+        event(
+            "profile",
+            path=str(path),
+            top=[
+                {
+                    "function": f"{filename}:{line}({function})",
+                    "calls": calls,
+                    "total_seconds": round(total, 6),
+                    "cumulative_seconds": round(cumulative, 6),
+                }
+                for (filename, line, function), (_, calls, total, cumulative, _) in sorted(
+                    stats.stats.items(), key=lambda item: item[1][3], reverse=True
+                )[:top]
+            ],
+        )
+
+
+@contextmanager
+def trace_memory(top: Optional[int], frames: int = 1) -> Iterator[None]:
+    """tracemalloc the block and print the ``top`` allocating source lines.
+
+    Memory is freed as stages finish, so the lines are taken from the stage end
+    that held the most traced memory, not from the end of the run.
+    """
+    global _fullest
+    if not top:
+        yield
+        return
+    _fullest = None
+    tracemalloc.start(frames)
+    _peaks.append(0)  # stages fold their peaks into this one
+    try:
+        yield
+    finally:
+        keep_if_fullest("end", tracemalloc.get_traced_memory()[0])
+        peak = max(_peaks.pop(), tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        held, name, snapshot = _fullest
+        _fullest = None
+        statistics = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),)).statistics("lineno")
+        statistics = statistics[:top]
+        print(
+            f"[MEMORY] traced peak={peak / (1 << 20):.1f}MB; top {top} allocators held at the end of "
+            f"{name!r} ({held / (1 << 20):.1f}MB):"
+        )
+        for stat in statistics:
+            frame = stat.traceback[0]
+            print(f"[MEMORY] {stat.size / (1 << 20):8.2f}MB {stat.count:>9} blocks  {frame.filename}:{frame.lineno}")
+        event(
+            "memory_top",
+            stage=name,
+            held_mb=round(held / (1 << 20), 1),
+            peak_mb=round(peak / (1 << 20), 1),
+            top=[
+                {
+                    "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_mb": round(stat.size / (1 << 20), 3),
+                    "blocks": stat.count,
+                }
+                for stat in statistics
+            ],
+        )
@@ -3,9 +3,25 @@ from __future__ import annotations
 
 import argparse
 import csv
+import gc
+import hashlib
+import io
 import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import instrumentation
+from result_cache import ResultCache
 
 LOYALTY_TIERS = ("bronze", "silver", "gold", "platinum")
 LIFETIME_BUCKETS = ("low", "medium", "high")
@@ -14,6 +30,84 @@ CHANNELS = ("email", "sms", "social", "paid_search", "affiliate", "organic")
 SENTIMENTS = ("positive", "neutral", "negative")
 EVENT_TYPES = ("restock", "sale", "return", "adjustment")
 ACTORS = ("system", "warehouse_bot", "associate", "vendor")
+CATEGORIES = ("electronics", "apparel", "home", "beauty", "sports")
+
+# --compact storage: UUID columns become 16-byte BLOBs and enum columns become
+# codes into enum_<column> lookup tables (code = position in the tuple). The
+# base tables move to <table>_store and views with the original names decode
+# them, so existing SQL keeps working.
+COMPACT_COLUMNS = {
+    "customers": {
+        "customer_id": "uuid", "loyalty_tier": LOYALTY_TIERS, "lifetime_value_bucket": LIFETIME_BUCKETS,
+    },
+    "products": {"product_id": "uuid", "category": CATEGORIES},
+    "orders": {
+        "order_id": "uuid",
+        "customer_id": "uuid",
+        "order_status": ORDER_STATUSES,
+        "acquisition_channel": CHANNELS,
+        "customer_sentiment": SENTIMENTS,
+    },
+    "order_items": {"order_item_id": "uuid", "order_id": "uuid", "product_id": "uuid"},
+    "inventory_events": {"event_id": "uuid", "product_id": "uuid", "event_type": EVENT_TYPES, "actor": ACTORS},
+}
+# Looked up by primary key, so the key itself is the clustered access path.
+# order_items/inventory_events are read through their FK indexes instead and
+# keep a rowid, which is smaller than a 16-byte key in those indexes.
+COMPACT_WITHOUT_ROWID = ("customers", "products", "orders")
+# Stores whose text primary key is also indexed, because report/derived joins
+# reach them from another view (order_items -> products) rather than driving the join.
+COMPACT_TEXT_KEY_INDEXES = ("products",)
+
+# Connection settings for --fast-load; durability is traded for bulk insert speed.
+FAST_LOAD_PRAGMAS = (
+    ("journal_mode", "MEMORY"),
+    ("synchronous", "OFF"),
+    ("cache_size", "-262144"),  # negative = KiB, i.e. ~256 MiB
+    ("temp_store", "MEMORY"),
+)
+
+# (index, table, columns) built once the data is in. Trailing columns make the
+# customer_kpis and report joins index-only.
+SECONDARY_INDEXES = (
+    ("idx_orders_customer", "orders",
+     "customer_id, order_date, acquisition_channel, customer_sentiment, subtotal"),
+    ("idx_order_items_order", "order_items", "order_id, quantity, discount_amount, line_total"),
+    ("idx_order_items_product", "order_items", "product_id, order_id"),
+    ("idx_inventory_events_product", "inventory_events",
+     "product_id, event_type, quantity_change, event_timestamp"),
+    ("idx_order_fact_customer", "order_fact", "customer_id, order_date"),
+    ("idx_order_fact_date", "order_fact", "order_date"),
+)
+
+# Target size of the byte ranges handed to --workers processes.
+PARALLEL_CHUNK_BYTES = 8 << 20
+
+# Rows per committed chunk when --resume is given without --checkpoint-rows.
+CHECKPOINT_ROWS = 50_000
+
+# Sales rollups as (table, period length, dimensions, source day table), ordered
+# coarsest first; the query router prefers the smallest table that can answer
+# according to ANALYZE stats and falls back to this order.
+# Periods are 'YYYY-MM' (7) or 'YYYY-MM-DD' (10); measures are additive over
+# every dimension except that orders double-counts across categories.
+ROLLUP_MEASURES = ("orders", "units", "gross", "discount", "net")
+SALES_ROLLUPS = (
+    ("sales_rollup_month", 7, ("acquisition_channel", "shipping_state"), "sales_rollup_day"),
+    ("sales_rollup_month_category", 7, ("category", "acquisition_channel", "shipping_state"),
+     "sales_rollup_day_category"),
+    ("sales_rollup_day", 10, ("acquisition_channel", "shipping_state"), None),
+    ("sales_rollup_day_category", 10, ("category", "acquisition_channel", "shipping_state"), None),
+)
+
+# Column recorded as max_timestamp in load_manifest (None: table has no timestamp).
+WATERMARK_COLUMNS = {
+    "customers": "created_at",
+    "products": "created_at",
+    "orders": "order_date",
+    "order_items": None,
+    "inventory_events": "event_timestamp",
+}
 
 
 def parse_bool(value: str) -> int:
@@ -28,30 +122,150 @@ def parse_int(value: str) -> int:
     return int(float(value)) if value not in (None, "") else 0
 
 
-def load_csv(path: Path) -> List[Dict[str, str]]:
-    with path.open("r", encoding="utf-8") as fh:
-        reader = csv.DictReader(fh)
-        return list(reader)
+def read_header(path: Path) -> Tuple[str, ...]:
+    with path.open("r", encoding="utf-8", newline="") as fh:
+        return tuple(next(csv.reader(fh), ()))
+
+
+def iter_rows(path: Path) -> Iterator[List[str]]:
+    """Data rows of ``path`` as ``csv.reader`` lists (header skipped); see row_converter."""
+    with path.open("r", encoding="utf-8", newline="") as fh:
+        reader = csv.reader(fh)
+        next(reader, None)
+        yield from reader
+
+
+def read_rows(path: Path) -> List[List[str]]:
+    with paused_gc():
+        return list(iter_rows(path))
+
+
+def iter_batches(rows: Iterable, size: int) -> Iterator[List]:
+    it = iter(rows)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
 
 
 def ensure_foreign_keys(conn: sqlite3.Connection) -> None:
     conn.execute("PRAGMA foreign_keys = ON;")
 
 
+def apply_fast_load_pragmas(conn: sqlite3.Connection, keep_journal: bool = False) -> None:
+    """``keep_journal`` leaves the rollback journal on disk, so committed checkpoints survive a crash."""
+    pragmas = [(name, value) for name, value in FAST_LOAD_PRAGMAS if not (keep_journal and name == "journal_mode")]
+    for name, value in pragmas:
+        conn.execute(f"PRAGMA {name} = {value};")
+    print("[INFO] Fast-load pragmas: " + ", ".join(f"{name}={value}" for name, value in pragmas))
+
+
+def verify_foreign_keys(conn: sqlite3.Connection) -> None:
+    violations = conn.execute("PRAGMA foreign_key_check;").fetchall()
+    if not violations:
+        print("[INFO] Foreign key check passed")
+        return
+    per_table: Dict[str, int] = {}
+    for table, _rowid, _parent, _fkid in violations:
+        per_table[table] = per_table.get(table, 0) + 1
+    detail = ", ".join(f"{table}={count}" for table, count in per_table.items())
+    table, rowid, parent, _ = violations[0]
+    raise sqlite3.IntegrityError(
+        f"{len(violations)} foreign key violations ({detail}); "
+        f"first: {table} rowid={rowid} -> {parent}"
+    )
+
+
+def create_indexes(conn: sqlite3.Connection, compact: bool = False) -> None:
+    built = 0
+    for name, table, columns in SECONDARY_INDEXES:
+        if compact and table in COMPACT_COLUMNS:
+            # Index the decoded UUID text so joins between the compact views can seek.
+            kinds = COMPACT_COLUMNS[table]
+            columns = ", ".join(
+                uuid_text_sql(column) if kinds.get(column) == "uuid" else column for column in columns.split(", ")
+            )
+            table = f"{table}_store"
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns});")
+        built += 1
+    if compact:
+        for table in COMPACT_TEXT_KEY_INDEXES:
+            keys = [name for _, name, _, _, _, pk in base_schema()[table][0] if pk]
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_store_key ON {table}_store "
+                f"({', '.join(uuid_text_sql(key) for key in keys)});"
+            )
+            built += 1
+    conn.execute("ANALYZE;")
+    print(f"[INFO] Built {built} secondary indexes")
+
+
+@contextmanager
+def timed_phase(
+    label: str, timings: Dict[str, float], conn: Optional[sqlite3.Connection] = None
+) -> Iterator[Dict]:
+    """Accumulate the block's time under ``label``; also an instrumentation stage (yields its fields).
+
+    With ``conn``, the stage's ``rows`` are the rows it inserted, updated or deleted.
+    """
+    started = time.perf_counter()
+    changes = conn.total_changes if conn is not None else 0
+    with instrumentation.stage(label) as info:
+        try:
+            yield info
+        finally:
+            timings[label] = timings.get(label, 0.0) + time.perf_counter() - started
+            if conn is not None:
+                info.setdefault("rows", conn.total_changes - changes)
+
+
 def drop_tables(conn: sqlite3.Connection) -> None:
     tables = [
+        "customer_search",
+        "product_search",
+        "dataset_version",
+        "load_checkpoints",
+        "load_manifest",
+        *(table for table, _, _, _ in SALES_ROLLUPS),
+        "rollup_refresh_queue",
+        "ledger_refresh_queue",
+        "inventory_daily",
+        "inventory_ledger",
+        "kpi_refresh_queue",
         "customer_kpis",
+        "order_fact",
         "inventory_events",
         "order_items",
         "orders",
         "products",
         "customers",
+        *(f"{table}_store" for table in reversed(list(COMPACT_COLUMNS))),
+        *sorted({f"enum_{column}" for specs in COMPACT_COLUMNS.values() for column, kind in specs.items() if kind != "uuid"}),
     ]
+    kinds = dict(conn.execute("SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view');").fetchall())
     for tbl in tables:
-        conn.execute(f"DROP TABLE IF EXISTS {tbl};")
+        if kinds.get(tbl) == "view":
+            conn.execute(f"DROP VIEW {tbl};")
+        else:
+            conn.execute(f"DROP TABLE IF EXISTS {tbl};")
+
 
+def is_compact(conn: sqlite3.Connection) -> Optional[bool]:
+    """True/False for an existing compact/standard schema, None for an empty database."""
+    kinds = dict(conn.execute("SELECT name, type FROM sqlite_master WHERE name = 'customers';").fetchall())
+    if not kinds:
+        return None
+    return kinds["customers"] == "view"
 
-def create_tables(conn: sqlite3.Connection) -> None:
+
+def create_tables(conn: sqlite3.Connection, compact: bool = False) -> None:
+    if compact:
+        create_compact_tables(conn)
+    # Derived tables cannot declare foreign keys to the compact views.
+    customer_ref = "" if compact else "REFERENCES customers(customer_id)"
+    order_ref = "" if compact else "REFERENCES orders(order_id) ON DELETE CASCADE"
+    # With --compact the base tables below are no-ops: views already hold their names.
     conn.executescript(
         f"""
         CREATE TABLE IF NOT EXISTS customers (
@@ -117,8 +331,25 @@ def create_tables(conn: sqlite3.Connection) -> None:
             actor TEXT NOT NULL CHECK (actor IN {ACTORS})
         );
 
+        -- One row per order with its line items pre-aggregated, so reports and
+        -- KPIs never fan out over order_items.
+        CREATE TABLE IF NOT EXISTS order_fact (
+            order_id TEXT PRIMARY KEY {order_ref},
+            customer_id TEXT NOT NULL,
+            order_date TEXT NOT NULL,
+            order_status TEXT NOT NULL,
+            shipping_state TEXT NOT NULL,
+            acquisition_channel TEXT NOT NULL,
+            customer_sentiment TEXT NOT NULL,
+            subtotal REAL NOT NULL,
+            item_count INTEGER NOT NULL,
+            total_quantity INTEGER NOT NULL,
+            discount_total REAL NOT NULL,
+            line_total REAL NOT NULL
+        );
+
         CREATE TABLE IF NOT EXISTS customer_kpis (
-            customer_id TEXT PRIMARY KEY REFERENCES customers(customer_id),
+            customer_id TEXT PRIMARY KEY {customer_ref},
             total_orders INTEGER NOT NULL,
             first_order_date TEXT,
             last_order_date TEXT,
@@ -129,164 +360,1108 @@ def create_tables(conn: sqlite3.Connection) -> None:
             dominant_channel TEXT,
             sentiment_score REAL
         );
+
+        CREATE TABLE IF NOT EXISTS kpi_refresh_queue (
+            customer_id TEXT PRIMARY KEY
+        );
+
+        -- Running stock per product in (event_timestamp, event_id) order. The
+        -- primary key makes "stock of product X at time T" a single seek.
+        CREATE TABLE IF NOT EXISTS inventory_ledger (
+            product_id TEXT NOT NULL,
+            event_timestamp TEXT NOT NULL,
+            event_id TEXT NOT NULL,
+            event_type TEXT NOT NULL,
+            quantity_change INTEGER NOT NULL,
+            balance INTEGER NOT NULL,
+            restocked_total INTEGER NOT NULL,
+            sold_total INTEGER NOT NULL,
+            last_restock_at TEXT,
+            PRIMARY KEY (product_id, event_timestamp, event_id)
+        ) WITHOUT ROWID;
+
+        -- Closing position per product for every day that had events.
+        CREATE TABLE IF NOT EXISTS inventory_daily (
+            product_id TEXT NOT NULL,
+            snapshot_date TEXT NOT NULL,
+            event_count INTEGER NOT NULL,
+            net_change INTEGER NOT NULL,
+            closing_balance INTEGER NOT NULL,
+            restocked_total INTEGER NOT NULL,
+            sold_total INTEGER NOT NULL,
+            last_restock_at TEXT,
+            PRIMARY KEY (product_id, snapshot_date)
+        ) WITHOUT ROWID;
+
+        -- Products whose ledger must be rebuilt from from_timestamp onwards.
+        CREATE TABLE IF NOT EXISTS ledger_refresh_queue (
+            product_id TEXT PRIMARY KEY,
+            from_timestamp TEXT NOT NULL
+        );
+
+        -- Order days whose sales rollups must be recomputed.
+        CREATE TABLE IF NOT EXISTS rollup_refresh_queue (
+            day TEXT PRIMARY KEY
+        );
+
+        CREATE TABLE IF NOT EXISTS load_manifest (
+            table_name TEXT NOT NULL,
+            source_file TEXT NOT NULL,
+            file_hash TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            max_timestamp TEXT,
+            loaded_at TEXT NOT NULL,
+            PRIMARY KEY (table_name, file_hash)
+        );
+
+        -- Single row naming the data as of the last completed load; written in the
+        -- load's transaction so result caches keyed on it never see a half-load.
+        CREATE TABLE IF NOT EXISTS dataset_version (
+            version TEXT NOT NULL,
+            loaded_at TEXT NOT NULL
+        );
+
+        -- One row per chunk committed by a --checkpoint-rows load, written in the
+        -- chunk's own transaction; --resume continues after the last one per file.
+        -- Cleared when the load completes (load_manifest then covers the files).
+        CREATE TABLE IF NOT EXISTS load_checkpoints (
+            table_name TEXT NOT NULL,
+            source_file TEXT NOT NULL,
+            file_hash TEXT NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            start_offset INTEGER NOT NULL,
+            end_offset INTEGER NOT NULL,
+            row_number INTEGER NOT NULL,
+            chunk_hash TEXT NOT NULL,
+            max_timestamp TEXT,
+            committed_at TEXT NOT NULL,
+            PRIMARY KEY (table_name, file_hash, chunk_index)
+        );
         """
     )
+    for table, _, dims, _ in SALES_ROLLUPS:
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                period TEXT NOT NULL,
+                {" ".join(f"{dim} TEXT NOT NULL," for dim in dims)}
+                orders INTEGER NOT NULL,
+                units INTEGER NOT NULL,
+                gross REAL NOT NULL,
+                discount REAL NOT NULL,
+                net REAL NOT NULL,
+                PRIMARY KEY (period, {", ".join(dims)})
+            ) WITHOUT ROWID;
+            """
+        )
 
 
-def transform_customers(rows: Iterable[Dict[str, str]]) -> List[Tuple]:
-    return [
-        (
-            row["customer_id"],
-            row["first_name"],
-            row["last_name"],
-            row["email"],
-            row.get("phone"),
-            row["created_at"],
-            parse_bool(row.get("marketing_opt_in", "false")),
-            row["loyalty_tier"],
-            row["lifetime_value_bucket"],
+@lru_cache(maxsize=None)
+def base_schema() -> Dict[str, Tuple[List[Tuple], List[Tuple]]]:
+    """``(table_info, foreign_key_list)`` of each standard base table, read from an in-memory build."""
+    mem = sqlite3.connect(":memory:")
+    create_tables(mem)
+    schema = {
+        table: (
+            mem.execute(f"PRAGMA table_info({table});").fetchall(),
+            mem.execute(f"PRAGMA foreign_key_list({table});").fetchall(),
         )
-        for row in rows
-    ]
+        for table in COMPACT_COLUMNS
+    }
+    mem.close()
+    return schema
 
 
-def transform_products(rows: Iterable[Dict[str, str]]) -> List[Tuple]:
-    return [
-        (
-            row["product_id"],
-            row["name"],
-            row["category"],
-            row["brand"],
-            parse_float(row["price"]),
-            row["created_at"],
-            parse_int(row["inventory_count"]),
-            parse_bool(row.get("active_flag", "true")),
-        )
-        for row in rows
-    ]
+def uuid_text_sql(expr: str) -> str:
+    """SQL rendering a 16-byte BLOB as the canonical lowercase UUID string."""
+    parts = ((1, 8), (9, 4), (13, 4), (17, 4), (21, 12))
+    return "lower(" + " || '-' || ".join(f"substr(hex({expr}), {start}, {length})" for start, length in parts) + ")"
 
 
-def transform_orders(rows: Iterable[Dict[str, str]]) -> List[Tuple]:
-    transformed = []
-    for row in rows:
-        subtotal = parse_float(row["subtotal"])
-        shipping = parse_float(row["shipping_cost"])
-        tax = parse_float(row["tax_amount"])
-        total = parse_float(row["total_amount"])
-        if abs((subtotal + shipping + tax) - total) > 1.0:
-            raise ValueError(f"Order {row['order_id']} totals do not reconcile")
-        transformed.append(
-            (
-                row["order_id"],
-                row["customer_id"],
-                row["order_date"],
-                row["order_status"],
-                row["shipping_address"],
-                row["shipping_city"],
-                row["shipping_state"],
-                row["shipping_postal_code"],
-                row["shipping_country"],
-                subtotal,
-                shipping,
-                tax,
-                total,
-                row.get("coupon_code", ""),
-                row["acquisition_channel"],
-                row["customer_sentiment"],
+def create_compact_tables(conn: sqlite3.Connection) -> None:
+    enums = {column: kind for specs in COMPACT_COLUMNS.values() for column, kind in specs.items() if kind != "uuid"}
+    for column, values in enums.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS enum_{column} (code INTEGER PRIMARY KEY, label TEXT NOT NULL UNIQUE);")
+        conn.executemany(f"INSERT OR IGNORE INTO enum_{column} VALUES (?, ?);", enumerate(values))
+    for table, (columns, foreign_keys) in base_schema().items():
+        specs = COMPACT_COLUMNS[table]
+        references = {fk[3]: f"REFERENCES {fk[2]}_store({fk[4]}) ON DELETE {fk[6]}" for fk in foreign_keys}
+        definitions = []
+        for _, name, col_type, notnull, _, _ in columns:
+            kind = specs.get(name)
+            if kind == "uuid":
+                col_type = "BLOB"
+            elif kind is not None:
+                col_type = f"INTEGER REFERENCES enum_{name}(code)"
+            definitions.append(
+                " ".join(part for part in (name, col_type, "NOT NULL" if notnull else "", references.get(name, "")) if part)
             )
+        keys = [name for _, name, _, _, _, pk in sorted(columns, key=lambda c: c[5]) if pk]
+        definitions.append(f"PRIMARY KEY ({', '.join(keys)})")
+        suffix = " WITHOUT ROWID" if table in COMPACT_WITHOUT_ROWID else ""
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table}_store ({', '.join(definitions)}){suffix};")
+
+        selected, joins = [], []
+        for _, name, _, _, _, _ in columns:
+            kind = specs.get(name)
+            if kind == "uuid":
+                selected.append(f"{uuid_text_sql(f's.{name}')} AS {name}")
+            elif kind is not None:
+                selected.append(f"e_{name}.label AS {name}")
+                joins.append(f"JOIN enum_{name} e_{name} ON e_{name}.code = s.{name}")
+            else:
+                selected.append(f"s.{name}")
+        conn.execute(
+            f"CREATE VIEW IF NOT EXISTS {table} AS SELECT {', '.join(selected)} FROM {table}_store s {' '.join(joins)};"
         )
-    return transformed
 
 
-def transform_order_items(rows: Iterable[Dict[str, str]]) -> List[Tuple]:
-    return [
-        (
-            row["order_item_id"],
-            row["order_id"],
-            row["product_id"],
-            parse_int(row["quantity"]),
-            parse_float(row["unit_price"]),
-            parse_float(row["discount_amount"]),
-            parse_float(row["line_total"]),
-            parse_float(row["tax_rate"]),
-        )
-        for row in rows
-    ]
+@lru_cache(maxsize=None)
+def compact_converters(table: str) -> List[Tuple[int, Callable[[str], object]]]:
+    converters = []
+    for position, (_, name, _, _, _, _) in enumerate(base_schema()[table][0]):
+        kind = COMPACT_COLUMNS[table].get(name)
+        if kind == "uuid":
+            converters.append((position, lambda value: uuid.UUID(value).bytes))
+        elif kind is not None:
+            codes = {label: code for code, label in enumerate(kind)}
+
+            def encode(value: str, codes=codes, name=name) -> int:
+                try:
+                    return codes[value]
+                except KeyError:
+                    raise ValueError(f"{table}.{name}: {value!r} is not one of {tuple(codes)}") from None
+
+            converters.append((position, encode))
+    return converters
+
+
+def compact_rows(table: str, rows: List[Tuple]) -> List[Tuple]:
+    """Encode transformed rows for <table>_store."""
+    converters = compact_converters(table)
+    encoded = []
+    for row in rows:
+        values = list(row)
+        for position, convert in converters:
+            values[position] = convert(values[position])
+        encoded.append(tuple(values))
+    return encoded
+
+
+def compact_transform(
+    table: str, transform: Callable[[Iterable], List[Tuple]], rows: Iterable
+) -> List[Tuple]:
+    return compact_rows(table, transform(rows))
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[Tuple[str, int]]:
+    """Return ``(column, pk_position)`` pairs in declaration order."""
+    return [(row[1], row[5]) for row in conn.execute(f"PRAGMA table_info({table});")]
+
+
+def upsert_sql(conn: sqlite3.Connection, table: str) -> str:
+    columns = table_columns(conn, table)
+    names = [name for name, _ in columns]
+    keys = [name for name, pk in sorted(columns, key=lambda c: c[1]) if pk]
+    updates = ", ".join(f"{name} = excluded.{name}" for name, pk in columns if not pk)
+    return (
+        f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}"
+    )
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 
-def transform_inventory(rows: Iterable[Dict[str, str]]) -> List[Tuple]:
-    return [
+def already_ingested(conn: sqlite3.Connection, table: str, file_hash: str) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM load_manifest WHERE table_name = ? AND file_hash = ?;", (table, file_hash)
+    ).fetchone()
+    return row is not None
+
+
+def record_manifest(
+    conn: sqlite3.Connection,
+    table: str,
+    path: Path,
+    file_hash: str,
+    row_count: int,
+    max_timestamp: Optional[str],
+) -> None:
+    conn.execute(
+        "INSERT OR REPLACE INTO load_manifest VALUES (?,?,?,?,?,?);",
         (
-            row["event_id"],
-            row["product_id"],
-            row["event_type"],
-            parse_int(row["quantity_change"]),
-            row["event_timestamp"],
-            row.get("note"),
-            row["actor"],
-        )
-        for row in rows
-    ]
+            table,
+            path.resolve().name,  # the original file when a validated/watch batch links to it
+            file_hash,
+            row_count,
+            max_timestamp,
+            datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        ),
+    )
+
+
+def record_dataset_version(conn: sqlite3.Connection) -> str:
+    """Store a content hash of load_manifest; the same files loaded give the same version."""
+    digest = hashlib.sha256()
+    for row in conn.execute(
+        "SELECT table_name, file_hash, row_count FROM load_manifest ORDER BY table_name, file_hash;"
+    ):
+        digest.update(repr(row).encode("utf-8"))
+    version = digest.hexdigest()
+    conn.execute("DELETE FROM dataset_version;")
+    conn.execute(
+        "INSERT INTO dataset_version VALUES (?, ?);",
+        (version, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+    )
+    return version
+
+
+class WatermarkTracker:
+    """Keeps the running max of one tuple position across insert batches."""
+
+    def __init__(self, index: Optional[int]) -> None:
+        self.index = index
+        self.value: Optional[str] = None
+
+    def __call__(self, rows: List[Tuple]) -> None:
+        if self.index is None or not rows:
+            return
+        batch_max = max(row[self.index] for row in rows)
+        if self.value is None or batch_max > self.value:
+            self.value = batch_max
+
+
+# Declarative CSV schema of each base table, in table column order:
+# (column, kind, nullable, default, domain). ``default`` is used when the CSV has
+# no such column; a column that is neither nullable nor defaulted must be present.
+# ``domain`` is the allowed values of an enum column (CHECK constraints enforce
+# them on insert and validate_data.py before it).
+ColumnSpec = Tuple[str, str, bool, Optional[str], Optional[Tuple[str, ...]]]
+TABLE_SCHEMAS: Dict[str, Tuple[ColumnSpec, ...]] = {
+    "customers": (
+        ("customer_id", "text", False, None, None),
+        ("first_name", "text", False, None, None),
+        ("last_name", "text", False, None, None),
+        ("email", "text", False, None, None),
+        ("phone", "text", True, None, None),
+        ("created_at", "text", False, None, None),
+        ("marketing_opt_in", "bool", False, "false", None),
+        ("loyalty_tier", "text", False, None, LOYALTY_TIERS),
+        ("lifetime_value_bucket", "text", False, None, LIFETIME_BUCKETS),
+    ),
+    "products": (
+        ("product_id", "text", False, None, None),
+        ("name", "text", False, None, None),
+        ("category", "text", False, None, CATEGORIES),
+        ("brand", "text", False, None, None),
+        ("price", "float", False, None, None),
+        ("created_at", "text", False, None, None),
+        ("inventory_count", "int", False, None, None),
+        ("active_flag", "bool", False, "true", None),
+    ),
+    "orders": (
+        ("order_id", "text", False, None, None),
+        ("customer_id", "text", False, None, None),
+        ("order_date", "text", False, None, None),
+        ("order_status", "text", False, None, ORDER_STATUSES),
+        ("shipping_address", "text", False, None, None),
+        ("shipping_city", "text", False, None, None),
+        ("shipping_state", "text", False, None, None),
+        ("shipping_postal_code", "text", False, None, None),
+        ("shipping_country", "text", False, None, None),
+        ("subtotal", "float", False, None, None),
+        ("shipping_cost", "float", False, None, None),
+        ("tax_amount", "float", False, None, None),
+        ("total_amount", "float", False, None, None),
+        ("coupon_code", "text", True, "", None),
+        ("acquisition_channel", "text", False, None, CHANNELS),
+        ("customer_sentiment", "text", False, None, SENTIMENTS),
+    ),
+    "order_items": (
+        ("order_item_id", "text", False, None, None),
+        ("order_id", "text", False, None, None),
+        ("product_id", "text", False, None, None),
+        ("quantity", "int", False, None, None),
+        ("unit_price", "float", False, None, None),
+        ("discount_amount", "float", False, None, None),
+        ("line_total", "float", False, None, None),
+        ("tax_rate", "float", False, None, None),
+    ),
+    "inventory_events": (
+        ("event_id", "text", False, None, None),
+        ("product_id", "text", False, None, None),
+        ("event_type", "text", False, None, EVENT_TYPES),
+        ("quantity_change", "int", False, None, None),
+        ("event_timestamp", "text", False, None, None),
+        ("note", "text", True, None, None),
+        ("actor", "text", False, None, ACTORS),
+    ),
+}
+BOOL_FAST = {"true": 1, "false": 0, "True": 1, "False": 0, "1": 1, "0": 0}
+
+
+# Slow paths of the compiled converters; same results as the parse_* helpers.
+def to_float(value: Optional[str]) -> float:
+    return parse_float(value)
+
+
+def to_int(value: Optional[str]) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return parse_int(value)
+
+
+def to_bool(value: Optional[str]) -> int:
+    try:
+        return BOOL_FAST[value]
+    except KeyError:
+        return parse_bool(value)
+
+
+CONVERTERS = {"text": lambda value: value, "int": to_int, "float": to_float, "bool": to_bool}
+# Fast-path expressions for well-formed cells; they raise on anything else (blank,
+# "3.0" integers, odd booleans) and the whole row is redone through CONVERTERS.
+FAST_CELLS = {"int": "int({})", "float": "float({})", "bool": "BOOL_FAST[{}]"}
+
+
+def check_order_totals(row: Tuple) -> None:
+    subtotal, shipping, tax, total = row[9:13]
+    if abs((subtotal + shipping + tax) - total) > 1.0:
+        raise ValueError(f"Order {row[0]} totals do not reconcile")
+
+
+# Whole-row checks run on each converted tuple.
+ROW_CHECKS = {"orders": check_order_totals}
+
+
+def fit_row(fields: List[Optional[str]], width: int) -> List[Optional[str]]:
+    """Pad a short row with None (missing cells, as csv.DictReader does) or drop extra cells."""
+    return (list(fields) + [None] * width)[:width]
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """Suspend the cyclic GC while building many acyclic rows.
+
+    Every new row list/tuple counts towards a collection, and each collection
+    walks all the rows still held, so bulk conversion otherwise spends much of
+    its time in the collector. Rows of strings and numbers never form cycles.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+@lru_cache(maxsize=None)
+def row_converter(table: str, header: Tuple[str, ...]) -> Callable[[Iterable[List[str]]], List[Tuple]]:
+    """Compile a converter from ``csv.reader`` rows under ``header`` to typed ``table`` tuples.
+
+    The header is mapped to positions once and each row becomes one generated
+    tuple expression with the builtins inlined (``(f[0], float(f[4]), ...)``),
+    instead of a dict per row and a name lookup plus helper call per cell. A row
+    the fast expression rejects is redone through CONVERTERS. Blank lines are
+    skipped like csv.DictReader skips them.
+    """
+    positions = {name: index for index, name in enumerate(header)}
+    namespace: Dict[str, object] = {"fit_row": fit_row, "check": ROW_CHECKS.get(table), "BOOL_FAST": BOOL_FAST}
+    namespace.update((f"to_{kind}", convert) for kind, convert in CONVERTERS.items())
+    fast, slow = [], []
+    for number, (name, kind, nullable, default, _) in enumerate(TABLE_SCHEMAS[table]):
+        if name in positions:
+            cell = f"f[{positions[name]}]"
+            fast.append(cell if kind == "text" else FAST_CELLS[kind].format(cell))
+            slow.append(cell if kind == "text" else f"to_{kind}({cell})")
+        elif nullable or default is not None:
+            namespace[f"default{number}"] = None if default is None else CONVERTERS[kind](default)
+            fast.append(f"default{number}")
+            slow.append(f"default{number}")
+        else:
+            raise KeyError(name)
+    if fast == slow:
+        body = ["row = (" + ", ".join(fast) + ",)"]
+    else:
+        body = [
+            "try:",
+            "    row = (" + ", ".join(fast) + ",)",
+            "except (TypeError, ValueError, KeyError):",
+            "    row = (" + ", ".join(slow) + ",)",
+        ]
+    if table in ROW_CHECKS:
+        body.append("check(row)")
+    source = "\n".join([
+        "def convert(rows):",
+        "    out = []",
+        "    append = out.append",
+        "    for f in rows:",
+        f"        if len(f) != {len(header)}:",
+        "            if not f:",
+        "                continue",
+        f"            f = fit_row(f, {len(header)})",
+        *("        " + line for line in body),
+        "        append(row)",
+        "    return out",
+    ])
+    exec(compile(source, f"<row_converter {table}>", "exec"), namespace)
+    compiled = namespace["convert"]
+
+    def convert(rows: Iterable[List[str]]) -> List[Tuple]:
+        with paused_gc():
+            return compiled(rows)
+
+    return convert
 
 
-def insert_many(conn: sqlite3.Connection, sql: str, rows: List[Tuple], label: str) -> None:
+def convert_dicts(table: str, rows: Iterable[Dict[str, Optional[str]]]) -> List[Tuple]:
+    """The ``transform`` of LOAD_PLAN: csv.DictReader rows through the compiled converter."""
+    converted: List[Tuple] = []
+    header: Optional[Tuple] = None
+    for row in rows:
+        if header is None or len(row) != len(header) or tuple(row) != header:
+            header = tuple(row)
+            convert = row_converter(table, tuple(key for key in header if key is not None))
+        converted.extend(convert([list(row.values())]))
+    return converted
+
+
+def insert_many(conn: sqlite3.Connection, sql: str, rows: List[Tuple], label: str) -> int:
     if not rows:
         print(f"[WARN] No rows for {label}")
-        return
-    conn.executemany(sql, rows)
+        return 0
+    with instrumentation.stage(f"insert:{label}", rows=len(rows)):
+        conn.executemany(sql, rows)
     print(f"[INFO] Loaded {len(rows):>6} rows into {label}")
+    return len(rows)
+
+
+def stream_insert(
+    conn: sqlite3.Connection,
+    path: Path,
+    transform: Callable[[Iterable[List[str]]], List[Tuple]],
+    sql: str,
+    label: str,
+    batch_size: int,
+    on_batch: Optional[Callable[[List[Tuple]], None]] = None,
+) -> int:
+    """Read, transform and insert ``path`` in chunks of ``batch_size`` rows."""
+    total = 0
+    started_at = instrumentation.utc_now()
+    started = time.perf_counter()
+    # Parse, coerce and insert interleave per chunk; their times are summed per file.
+    seconds = {"parse": 0.0, "coerce": 0.0, "insert": 0.0}
+    chunks = iter_batches(iter_rows(path), batch_size)
+    idx = 0
+    while True:
+        mark = time.perf_counter()
+        chunk = next(chunks, None)
+        seconds["parse"] += time.perf_counter() - mark
+        if chunk is None:
+            break
+        idx += 1
+        mark = time.perf_counter()
+        rows = transform(chunk)
+        seconds["coerce"] += time.perf_counter() - mark
+        if on_batch is not None:
+            on_batch(rows)
+        mark = time.perf_counter()
+        conn.executemany(sql, rows)
+        seconds["insert"] += time.perf_counter() - mark
+        total += len(rows)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"[INFO] {label}: chunk {idx} +{len(rows)} rows (total={total}, {total / elapsed:,.0f} rows/s)")
+    for step, spent in seconds.items():
+        instrumentation.record(f"{step}:{label}", spent, started_at, rows=total, chunks=idx)
+    if not total:
+        print(f"[WARN] No rows for {label}")
+    else:
+        print(f"[INFO] Loaded {total:>6} rows into {label}")
+    return total
+
+
+def iter_csv_chunks(
+    path: Path, start: int, chunk_rows: int
+) -> Iterator[Tuple[int, int, str, List[List[str]]]]:
+    """``(start, end, sha256, rows)`` per chunk of ``chunk_rows`` csv.reader rows from byte ``start``.
+
+    ``start`` 0 skips the header. Lines are read as bytes and handed to the csv
+    parser one at a time, so each chunk ends on a record boundary (quoted
+    newlines included) and ``end`` is an exact offset to resume from.
+    """
+    with path.open("rb") as fh:
+        fh.seek(start)
+        position = start
+        digest = hashlib.sha256()
+
+        def lines() -> Iterator[str]:
+            nonlocal position
+            for line in iter(fh.readline, b""):
+                position += len(line)
+                digest.update(line)
+                yield line.decode("utf-8")
+
+        reader = csv.reader(lines())
+        if start == 0:
+            next(reader, None)
+            start, digest = position, hashlib.sha256()
+        for chunk in iter_batches(reader, chunk_rows):
+            yield start, position, digest.hexdigest(), chunk
+            start, digest = position, hashlib.sha256()
+
+
+def chunk_sha256(path: Path, start: int, end: int) -> str:
+    with path.open("rb") as fh:
+        fh.seek(start)
+        return hashlib.sha256(fh.read(end - start)).hexdigest()
+
+
+def pending_checkpoints(conn: sqlite3.Connection) -> int:
+    """Chunks committed by a checkpointed load that has not completed."""
+    try:
+        return conn.execute("SELECT COUNT(*) FROM load_checkpoints;").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
+
+
+def check_checkpoints(conn: sqlite3.Connection, planned: List[Tuple]) -> None:
+    """Refuse to resume over input whose committed chunks changed since the interrupted load.
+
+    A file that only changed after its last committed chunk (a row fixed after a
+    failed chunk, rows appended) resumes too: its checkpoints move to the new hash.
+    """
+    files = {table: (path, file_hash) for path, table, _, _, file_hash in planned}
+    for table, source_file, file_hash in conn.execute(
+        "SELECT DISTINCT table_name, source_file, file_hash FROM load_checkpoints;"
+    ).fetchall():
+        path, current = files.get(table, (None, None))
+        if current == file_hash:
+            continue
+        chunks = conn.execute(
+            "SELECT start_offset, end_offset, chunk_hash FROM load_checkpoints WHERE table_name = ? AND file_hash = ?;",
+            (table, file_hash),
+        ).fetchall()
+        if path is None or any(chunk_sha256(path, start, end) != chunk_hash for start, end, chunk_hash in chunks):
+            raise ValueError(
+                f"{source_file} ({table}) changed or went missing since the interrupted load "
+                f"committed chunks of it ({file_hash[:12]}); restore it or start over with --drop-tables"
+            )
+        with conn:
+            conn.execute(
+                "UPDATE load_checkpoints SET file_hash = ? WHERE table_name = ? AND file_hash = ?;",
+                (current, table, file_hash),
+            )
+        print(f"[INFO] {path.name} changed after its {len(chunks)} committed chunks; resuming with the new content")
+
+
+def checkpointed_insert(
+    conn: sqlite3.Connection,
+    path: Path,
+    table: str,
+    transform: Callable[[Iterable[List[str]]], List[Tuple]],
+    sql: str,
+    file_hash: str,
+    chunk_rows: int,
+    tracker: WatermarkTracker,
+    on_batch: Callable[[List[Tuple]], None],
+) -> int:
+    """Insert ``path`` in chunks, each committed together with its ``load_checkpoints`` row.
+
+    Continues after the last chunk already committed for this file (same hash),
+    so an interrupted load resumes without re-inserting anything. Returns the
+    file's total row count, committed chunks included.
+    """
+    start, total, chunk_index = 0, 0, 0
+    last = conn.execute(
+        """
+        SELECT chunk_index, start_offset, end_offset, row_number, chunk_hash, max_timestamp
+        FROM load_checkpoints WHERE table_name = ? AND file_hash = ?
+        ORDER BY chunk_index DESC LIMIT 1;
+        """,
+        (table, file_hash),
+    ).fetchone()
+    if last is not None:
+        index, chunk_start, start, total, chunk_hash, tracker.value = last
+        if chunk_sha256(path, chunk_start, start) != chunk_hash:
+            raise ValueError(f"{path}: bytes {chunk_start}-{start} no longer match checkpoint chunk {index}")
+        chunk_index = index + 1
+        print(f"[INFO] Resuming {table} after chunk {index}: row {total}, byte {start}")
+    started = time.perf_counter()
+    resumed_at = total
+    for chunk_start, chunk_end, chunk_hash, chunk in iter_csv_chunks(path, start, chunk_rows):
+        rows = transform(chunk)
+        with conn:
+            on_batch(rows)
+            conn.executemany(sql, rows)
+            conn.execute(
+                "INSERT INTO load_checkpoints VALUES (?,?,?,?,?,?,?,?,?,?);",
+                (
+                    table,
+                    path.resolve().name,
+                    file_hash,
+                    chunk_index,
+                    chunk_start,
+                    chunk_end,
+                    total + len(rows),
+                    chunk_hash,
+                    tracker.value,
+                    datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                ),
+            )
+        total += len(rows)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(
+            f"[INFO] {table}: chunk {chunk_index} committed +{len(rows)} rows "
+            f"(total={total}, {(total - resumed_at) / elapsed:,.0f} rows/s)"
+        )
+        chunk_index += 1
+    if not total:
+        print(f"[WARN] No rows for {table}")
+    else:
+        print(f"[INFO] Loaded {total:>6} rows into {table}")
+    return total
+
+
+# {orders} is the plain table for a full rebuild; a refresh drives it from
+# kpi_refresh_queue so only the queued customers' orders are re-aggregated.
+# Line items are summed in correlated subqueries rather than a LEFT JOIN so
+# the --compact views can still seek their order_id index.
+ORDER_FACT_SQL = """
+    INSERT INTO order_fact (
+        order_id, customer_id, order_date, order_status, shipping_state, acquisition_channel,
+        customer_sentiment, subtotal, item_count, total_quantity, discount_total, line_total
+    )
+    SELECT
+        o.order_id,
+        o.customer_id,
+        o.order_date,
+        o.order_status,
+        o.shipping_state,
+        o.acquisition_channel,
+        o.customer_sentiment,
+        o.subtotal,
+        (SELECT COUNT(*) FROM order_items oi WHERE oi.order_id = o.order_id),
+        (SELECT COALESCE(SUM(oi.quantity), 0) FROM order_items oi WHERE oi.order_id = o.order_id),
+        (SELECT COALESCE(SUM(oi.discount_amount), 0) FROM order_items oi WHERE oi.order_id = o.order_id),
+        (SELECT COALESCE(SUM(oi.line_total), 0) FROM order_items oi WHERE oi.order_id = o.order_id)
+    FROM {orders};
+"""
+
+# Shared by the full rebuild and the delta refresh so both produce identical rows.
+# {customers} is the plain table for a full rebuild; a refresh drives it from
+# kpi_refresh_queue so only queued customers are read. Everything comes from
+# order_fact; revenue only counts orders that have line items.
+CUSTOMER_KPI_SQL = """
+    INSERT INTO customer_kpis (
+        customer_id, total_orders, first_order_date, last_order_date,
+        gross_revenue, discount_total, net_revenue, avg_order_value,
+        dominant_channel, sentiment_score
+    )
+    SELECT
+        c.customer_id,
+        COUNT(of.order_id) FILTER (WHERE of.item_count > 0) AS total_orders,
+        MIN(of.order_date) FILTER (WHERE of.item_count > 0),
+        MAX(of.order_date) FILTER (WHERE of.item_count > 0),
+        COALESCE(SUM(of.subtotal) FILTER (WHERE of.item_count > 0), 0),
+        COALESCE(SUM(of.discount_total) FILTER (WHERE of.item_count > 0), 0),
+        COALESCE(
+            SUM(of.subtotal) FILTER (WHERE of.item_count > 0)
+            - SUM(of.discount_total) FILTER (WHERE of.item_count > 0),
+            0
+        ),
+        AVG(of.subtotal) FILTER (WHERE of.item_count > 0),
+        (
+            SELECT f.acquisition_channel FROM order_fact f
+            WHERE f.customer_id = c.customer_id
+            GROUP BY f.acquisition_channel
+            ORDER BY COUNT(*) DESC, f.acquisition_channel
+            LIMIT 1
+        ),
+        AVG(CASE of.customer_sentiment WHEN 'positive' THEN 1 WHEN 'neutral' THEN 0 WHEN 'negative' THEN -1 END)
+    FROM {customers}
+    LEFT JOIN order_fact of ON of.customer_id = c.customer_id
+    GROUP BY c.customer_id;
+"""
+
+
+def populate_order_fact(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM order_fact;")
+    conn.execute(ORDER_FACT_SQL.format(orders="orders o"))
+    conn.execute("ANALYZE order_fact;")
+    print("[INFO] order_fact materialized")
+
+
+def refresh_order_fact(conn: sqlite3.Connection) -> None:
+    """Re-aggregate order_fact for every order owned by a queued customer.
+
+    Queued customers include the previous owner of a re-pointed order, so
+    deleting by the stored customer_id also drops rows that moved away.
+    """
+    conn.execute("DELETE FROM order_fact WHERE customer_id IN (SELECT customer_id FROM kpi_refresh_queue);")
+    conn.execute(
+        ORDER_FACT_SQL.format(orders="kpi_refresh_queue q CROSS JOIN orders o ON o.customer_id = q.customer_id")
+    )
 
 
 def populate_customer_kpis(conn: sqlite3.Connection) -> None:
     conn.execute("DELETE FROM customer_kpis;")
-    conn.execute(
-        """
-        INSERT INTO customer_kpis (
-            customer_id, total_orders, first_order_date, last_order_date,
-            gross_revenue, discount_total, net_revenue, avg_order_value,
-            dominant_channel, sentiment_score
+    conn.execute(CUSTOMER_KPI_SQL.format(customers="customers c"))
+    conn.execute("DELETE FROM kpi_refresh_queue;")
+    print("[INFO] customer_kpis materialized")
+
+
+def mark_touched_customers(conn: sqlite3.Connection, table: str, rows: List[Tuple]) -> None:
+    """Queue customers whose KPIs change when ``rows`` are upserted into ``table``.
+
+    Must run before the batch is written so that the previous owner of a
+    re-pointed order or order item is still visible.
+    """
+    queue = "INSERT OR IGNORE INTO kpi_refresh_queue (customer_id)"
+    if table == "customers":
+        conn.executemany(f"{queue} VALUES (?);", ((row[0],) for row in rows))
+    elif table == "orders":
+        conn.executemany(
+            f"{queue} SELECT customer_id FROM orders WHERE order_id = ?;", ((row[0],) for row in rows)
         )
-        WITH order_fact AS (
-            SELECT
-                o.customer_id,
-                o.order_id,
-                o.order_date,
-                o.acquisition_channel,
-                o.customer_sentiment,
-                o.subtotal,
-                SUM(oi.discount_amount) AS discount_total
-            FROM orders o
-            JOIN order_items oi ON oi.order_id = o.order_id
-            GROUP BY o.order_id
-        ), sentiment AS (
-            SELECT
-                customer_id,
-                AVG(CASE customer_sentiment WHEN 'positive' THEN 1 WHEN 'neutral' THEN 0 ELSE -1 END) AS score
-            FROM orders
-            GROUP BY customer_id
-        ), channel_counts AS (
-            SELECT customer_id, acquisition_channel, COUNT(*) AS cnt,
-                   ROW_NUMBER() OVER (PARTITION BY customer_id ORDER BY COUNT(*) DESC) AS rn
-            FROM orders
-            GROUP BY customer_id, acquisition_channel
+        conn.executemany(f"{queue} VALUES (?);", ((row[1],) for row in rows))
+    elif table == "order_items":
+        conn.executemany(
+            f"""{queue} SELECT o.customer_id FROM order_items oi
+                JOIN orders o ON o.order_id = oi.order_id
+                WHERE oi.order_item_id = ?;""",
+            ((row[0],) for row in rows),
         )
+        conn.executemany(
+            f"{queue} SELECT customer_id FROM orders WHERE order_id = ?;", ((row[1],) for row in rows)
+        )
+
+
+def refresh_customer_kpis(conn: sqlite3.Connection) -> int:
+    """Recompute customer_kpis only for customers in kpi_refresh_queue."""
+    pending = conn.execute("SELECT COUNT(*) FROM kpi_refresh_queue;").fetchone()[0]
+    if pending:
+        conn.execute(
+            "DELETE FROM customer_kpis WHERE customer_id IN (SELECT customer_id FROM kpi_refresh_queue);"
+        )
+        conn.execute(
+            CUSTOMER_KPI_SQL.format(
+                customers="kpi_refresh_queue q CROSS JOIN customers c ON c.customer_id = q.customer_id"
+            )
+        )
+        conn.execute("DELETE FROM kpi_refresh_queue;")
+    print(f"[INFO] customer_kpis refreshed for {pending} customers")
+    return pending
+
+
+# Every statement below is driven by ledger_refresh_queue; a full rebuild simply
+# queues every product from the beginning of time ('').
+LEDGER_SQL = (
+    """
+    DELETE FROM inventory_ledger
+    WHERE (product_id, event_timestamp, event_id) IN (
+        SELECT l.product_id, l.event_timestamp, l.event_id
+        FROM ledger_refresh_queue q
+        JOIN inventory_ledger l ON l.product_id = q.product_id AND l.event_timestamp >= q.from_timestamp
+    );
+    """,
+    """
+    INSERT INTO inventory_ledger
+    WITH base AS (
+        SELECT q.product_id, q.from_timestamp, l.balance, l.restocked_total, l.sold_total, l.last_restock_at
+        FROM ledger_refresh_queue q
+        LEFT JOIN inventory_ledger l ON (l.product_id, l.event_timestamp, l.event_id) = (
+            SELECT product_id, event_timestamp, event_id FROM inventory_ledger
+            WHERE product_id = q.product_id
+            ORDER BY event_timestamp DESC, event_id DESC
+            LIMIT 1
+        )
+    )
+    SELECT
+        e.product_id,
+        e.event_timestamp,
+        e.event_id,
+        e.event_type,
+        e.quantity_change,
+        COALESCE(b.balance, 0) + SUM(e.quantity_change) OVER w,
+        COALESCE(b.restocked_total, 0)
+            + SUM(CASE WHEN e.event_type = 'restock' THEN e.quantity_change ELSE 0 END) OVER w,
+        COALESCE(b.sold_total, 0)
+            + SUM(CASE WHEN e.event_type = 'sale' THEN e.quantity_change ELSE 0 END) OVER w,
+        COALESCE(MAX(CASE WHEN e.event_type = 'restock' THEN e.event_timestamp END) OVER w, b.last_restock_at)
+    FROM base b
+    JOIN inventory_events e ON e.product_id = b.product_id AND e.event_timestamp >= b.from_timestamp
+    WINDOW w AS (PARTITION BY e.product_id ORDER BY e.event_timestamp, e.event_id ROWS UNBOUNDED PRECEDING);
+    """,
+    """
+    DELETE FROM inventory_daily
+    WHERE (product_id, snapshot_date) IN (
+        SELECT d.product_id, d.snapshot_date
+        FROM ledger_refresh_queue q
+        JOIN inventory_daily d ON d.product_id = q.product_id AND d.snapshot_date >= substr(q.from_timestamp, 1, 10)
+    );
+    """,
+    """
+    INSERT INTO inventory_daily
+    SELECT product_id, day, event_count, net_change, balance, restocked_total, sold_total, last_restock_at
+    FROM (
         SELECT
-            c.customer_id,
-            COUNT(of.order_id) AS total_orders,
-            MIN(of.order_date),
-            MAX(of.order_date),
-            COALESCE(SUM(of.subtotal), 0),
-            COALESCE(SUM(of.discount_total), 0),
-            COALESCE(SUM(of.subtotal) - SUM(of.discount_total), 0),
-            CASE WHEN COUNT(of.order_id) = 0 THEN NULL ELSE AVG(of.subtotal) END,
-            (SELECT acquisition_channel FROM channel_counts WHERE customer_id = c.customer_id AND rn = 1),
-            (SELECT score FROM sentiment WHERE customer_id = c.customer_id)
-        FROM customers c
-        LEFT JOIN order_fact of ON of.customer_id = c.customer_id
-        GROUP BY c.customer_id;
+            l.*,
+            substr(l.event_timestamp, 1, 10) AS day,
+            COUNT(*) OVER d AS event_count,
+            SUM(l.quantity_change) OVER d AS net_change,
+            ROW_NUMBER() OVER (
+                PARTITION BY l.product_id, substr(l.event_timestamp, 1, 10)
+                ORDER BY l.event_timestamp DESC, l.event_id DESC
+            ) AS rn
+        FROM ledger_refresh_queue q
+        JOIN inventory_ledger l
+          ON l.product_id = q.product_id AND l.event_timestamp >= substr(q.from_timestamp, 1, 10)
+        WINDOW d AS (PARTITION BY l.product_id, substr(l.event_timestamp, 1, 10))
+    )
+    WHERE rn = 1;
+    """,
+    "DELETE FROM ledger_refresh_queue;",
+)
+
+QUEUE_LEDGER_SQL = """
+    INSERT INTO ledger_refresh_queue (product_id, from_timestamp) VALUES (?, ?)
+    ON CONFLICT (product_id) DO UPDATE SET from_timestamp = MIN(from_timestamp, excluded.from_timestamp);
+"""
+
+
+def mark_touched_products(conn: sqlite3.Connection, table: str, rows: List[Tuple]) -> None:
+    """Queue ledger rebuilds for inventory_events rows about to be upserted.
+
+    Like mark_touched_customers this runs before the batch is written, so an
+    updated event also invalidates its old product/timestamp position.
+    """
+    if table != "inventory_events":
+        return
+    conn.executemany(
+        """INSERT INTO ledger_refresh_queue (product_id, from_timestamp)
+            SELECT product_id, event_timestamp FROM inventory_events WHERE event_id = ?
+            ON CONFLICT (product_id) DO UPDATE SET from_timestamp = MIN(from_timestamp, excluded.from_timestamp);""",
+        ((row[0],) for row in rows),
+    )
+    conn.executemany(QUEUE_LEDGER_SQL, ((row[1], row[4]) for row in rows))
+
+
+def refresh_inventory_ledger(conn: sqlite3.Connection) -> int:
+    """Rebuild ledger rows and daily snapshots from each queued product's first changed event."""
+    pending = conn.execute("SELECT COUNT(*) FROM ledger_refresh_queue;").fetchone()[0]
+    if pending:
+        for statement in LEDGER_SQL:
+            conn.execute(statement)
+    print(f"[INFO] inventory_ledger refreshed for {pending} products")
+    return pending
+
+
+def populate_inventory_ledger(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM inventory_ledger;")
+    conn.execute("DELETE FROM inventory_daily;")
+    conn.execute("DELETE FROM ledger_refresh_queue;")
+    conn.execute(
+        "INSERT INTO ledger_refresh_queue (product_id, from_timestamp) SELECT DISTINCT product_id, '' FROM inventory_events;"
+    )
+    refresh_inventory_ledger(conn)
+    conn.execute("ANALYZE inventory_ledger;")
+    conn.execute("ANALYZE inventory_daily;")
+
+
+def stock_at(conn: sqlite3.Connection, product_id: str, at: str) -> Optional[Tuple[int, Optional[str]]]:
+    """Return ``(balance, last_restock_at)`` for ``product_id`` as of timestamp ``at``.
+
+    ``at`` compares as an ISO string, so a bare date means the start of that day.
+    Returns None when the product had no events by then.
+    """
+    return conn.execute(
         """
+        SELECT balance, last_restock_at FROM inventory_ledger
+        WHERE product_id = ? AND event_timestamp <= ?
+        ORDER BY event_timestamp DESC, event_id DESC
+        LIMIT 1;
+        """,
+        (product_id, at),
+    ).fetchone()
+
+
+def days_since_restock(conn: sqlite3.Connection, product_id: str, at: str) -> Optional[float]:
+    position = stock_at(conn, product_id, at)
+    if position is None or position[1] is None:
+        return None
+    return conn.execute("SELECT julianday(?) - julianday(?);", (at, position[1])).fetchone()[0]
+
+
+# Day rollups are aggregated from order_fact (plus line items for category) for
+# every day in rollup_refresh_queue; gross is the line total, net = gross - discount.
+# The join states the day twice: the range lets a queue-driven plan seek
+# order_fact by date, the equality lets an item-driven plan seek the queue.
+ROLLUP_DAY_SQL = {
+    "sales_rollup_day": """
+        INSERT INTO sales_rollup_day
+        SELECT
+            substr(f.order_date, 1, 10), f.acquisition_channel, f.shipping_state,
+            COUNT(*), SUM(f.total_quantity), SUM(f.line_total), SUM(f.discount_total),
+            SUM(f.line_total) - SUM(f.discount_total)
+        FROM rollup_refresh_queue q
+        JOIN order_fact f
+          ON f.order_date >= q.day AND f.order_date < date(q.day, '+1 day')
+         AND q.day = substr(f.order_date, 1, 10)
+        WHERE f.item_count > 0
+        GROUP BY 1, 2, 3;
+    """,
+    "sales_rollup_day_category": """
+        INSERT INTO sales_rollup_day_category
+        SELECT
+            substr(f.order_date, 1, 10), p.category, f.acquisition_channel, f.shipping_state,
+            COUNT(DISTINCT f.order_id), SUM(oi.quantity), SUM(oi.line_total), SUM(oi.discount_amount),
+            SUM(oi.line_total) - SUM(oi.discount_amount)
+        FROM rollup_refresh_queue q
+        JOIN order_fact f
+          ON f.order_date >= q.day AND f.order_date < date(q.day, '+1 day')
+         AND q.day = substr(f.order_date, 1, 10)
+        JOIN order_items oi ON oi.order_id = f.order_id
+        JOIN products p ON p.product_id = oi.product_id
+        GROUP BY 1, 2, 3, 4;
+    """,
+}
+
+
+def mark_touched_days(conn: sqlite3.Connection, table: str, rows: List[Tuple]) -> None:
+    """Queue order days whose rollups change when ``rows`` are upserted (old and new day)."""
+    queue = "INSERT OR IGNORE INTO rollup_refresh_queue (day)"
+    if table == "orders":
+        conn.executemany(
+            f"{queue} SELECT substr(order_date, 1, 10) FROM orders WHERE order_id = ?;", ((row[0],) for row in rows)
+        )
+        conn.executemany(f"{queue} VALUES (substr(?, 1, 10));", ((row[2],) for row in rows))
+    elif table == "order_items":
+        conn.executemany(
+            f"""{queue} SELECT substr(o.order_date, 1, 10) FROM order_items oi
+                JOIN orders o ON o.order_id = oi.order_id
+                WHERE oi.order_item_id = ?;""",
+            ((row[0],) for row in rows),
+        )
+        conn.executemany(
+            f"{queue} SELECT substr(order_date, 1, 10) FROM orders WHERE order_id = ?;", ((row[1],) for row in rows)
+        )
+    elif table == "products":
+        # A category change moves every historical sale of the product.
+        conn.executemany(
+            f"""{queue} SELECT DISTINCT substr(o.order_date, 1, 10) FROM order_items oi
+                JOIN orders o ON o.order_id = oi.order_id
+                WHERE oi.product_id = ?;""",
+            ((row[0],) for row in rows),
+        )
+
+
+def refresh_sales_rollups(conn: sqlite3.Connection) -> int:
+    """Recompute day rollups for queued days, then the months containing them."""
+    pending = conn.execute("SELECT COUNT(*) FROM rollup_refresh_queue;").fetchone()[0]
+    if pending:
+        months = "(SELECT DISTINCT substr(day, 1, 7) AS month FROM rollup_refresh_queue)"
+        for table, _, dims, source in SALES_ROLLUPS[::-1]:
+            if source is None:
+                conn.execute(f"DELETE FROM {table} WHERE period IN (SELECT day FROM rollup_refresh_queue);")
+                conn.execute(ROLLUP_DAY_SQL[table])
+                continue
+            conn.execute(f"DELETE FROM {table} WHERE period IN (SELECT month FROM {months});")
+            conn.execute(
+                f"""
+                INSERT INTO {table}
+                SELECT substr(d.period, 1, 7), {", ".join(f"d.{dim}" for dim in dims)},
+                       {", ".join(f"SUM(d.{measure})" for measure in ROLLUP_MEASURES)}
+                FROM {months} m
+                JOIN {source} d ON d.period BETWEEN m.month || '-01' AND m.month || '-31'
+                GROUP BY {", ".join(str(i) for i in range(1, len(dims) + 2))};
+                """
+            )
+        conn.execute("DELETE FROM rollup_refresh_queue;")
+    print(f"[INFO] sales rollups refreshed for {pending} days")
+    return pending
+
+
+def populate_sales_rollups(conn: sqlite3.Connection) -> None:
+    for table, _, _, _ in SALES_ROLLUPS:
+        conn.execute(f"DELETE FROM {table};")
+    conn.execute("DELETE FROM rollup_refresh_queue;")
+    conn.execute("INSERT INTO rollup_refresh_queue (day) SELECT DISTINCT substr(order_date, 1, 10) FROM order_fact;")
+    refresh_sales_rollups(conn)
+    for table, _, _, _ in SALES_ROLLUPS:
+        conn.execute(f"ANALYZE {table};")
+
+
+def rollup_sizes(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Row counts recorded by ANALYZE for the rollup tables (empty before the first build)."""
+    try:
+        rows = conn.execute("SELECT tbl, stat FROM sqlite_stat1;").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    names = {table for table, _, _, _ in SALES_ROLLUPS}
+    return {table: int(stat.split()[0]) for table, stat in rows if table in names}
+
+
+def query_sales_rollup(
+    conn: sqlite3.Connection,
+    dimensions: Iterable[str] = (),
+    grain: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    cache: Optional[ResultCache] = None,
+) -> Tuple[str, List[str], List[Tuple]]:
+    """Answer a grouping request from the coarsest rollup that can serve it.
+
+    ``grain`` is ``"day"``, ``"month"`` or None (no period column). ``start``/``end``
+    are inclusive 'YYYY-MM' or 'YYYY-MM-DD' bounds; a day bound rules out the
+    month tables. Returns ``(table, columns, rows)``. With ``cache`` the rows come
+    from the result cache while the dataset version is unchanged.
+    """
+    dimensions = list(dimensions)
+    known = set(SALES_ROLLUPS[-1][2])
+    if not set(dimensions) <= known:
+        raise ValueError(f"Unknown rollup dimensions: {sorted(set(dimensions) - known)}")
+    grain_lengths = {None: 0, "month": 7, "day": 10}
+    if grain not in grain_lengths:
+        raise ValueError(f"grain must be 'day', 'month' or None, got {grain!r}")
+    bounds = [bound for bound in (start, end) if bound]
+    candidates = [
+        table
+        for table, period_len, dims, _ in SALES_ROLLUPS
+        if set(dimensions) <= set(dims)
+        and period_len >= grain_lengths[grain]
+        and all(len(bound) <= period_len for bound in bounds)
+    ]
+    if not candidates:
+        raise ValueError(f"No rollup answers dimensions={dimensions} grain={grain} bounds={bounds}")
+    sizes = rollup_sizes(conn)
+    table = min(candidates, key=lambda name: (sizes.get(name, float("inf")), candidates.index(name)))
+
+    keys = ([f"substr(period, 1, {grain_lengths[grain]})"] if grain else []) + dimensions
+    columns = (["period"] if grain else []) + dimensions + list(ROLLUP_MEASURES)
+    where, params = [], []
+    if start:
+        where.append("period >= ?")
+        params.append(start)
+    if end:
+        # 'YYYY-MM~' sorts after every day of that month.
+        where.append("period <= ?")
+        params.append(end + "~")
+    sql = (
+        f"SELECT {', '.join(keys + [f'SUM({measure})' for measure in ROLLUP_MEASURES])} FROM {table}"
+        + (f" WHERE {' AND '.join(where)}" if where else "")
+        + (f" GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}" if keys else "")
     )
-    print("[INFO] customer_kpis materialized")
+    if cache is not None:
+        return table, columns, cache.execute(conn, sql, params)[1]
+    return table, columns, conn.execute(sql, params).fetchall()
 
 
 def summarize_inventory(conn: sqlite3.Connection) -> None:
@@ -295,11 +1470,15 @@ def summarize_inventory(conn: sqlite3.Connection) -> None:
         SELECT
             p.product_id,
             p.name,
-            SUM(CASE WHEN ie.event_type = 'restock' THEN ie.quantity_change ELSE 0 END) AS restocked,
-            SUM(CASE WHEN ie.event_type = 'sale' THEN ie.quantity_change ELSE 0 END) AS sold
+            d.restocked_total AS restocked,
+            d.sold_total AS sold
         FROM products p
-        LEFT JOIN inventory_events ie ON ie.product_id = p.product_id
-        GROUP BY p.product_id
+        LEFT JOIN inventory_daily d ON (d.product_id, d.snapshot_date) = (
+            SELECT product_id, snapshot_date FROM inventory_daily
+            WHERE product_id = p.product_id
+            ORDER BY snapshot_date DESC
+            LIMIT 1
+        )
         LIMIT 5;
         """
     ).fetchall()
@@ -311,47 +1490,391 @@ def summarize_inventory(conn: sqlite3.Connection) -> None:
 def collect_stats(conn: sqlite3.Connection, tables: Iterable[str]) -> Dict[str, Dict[str, float]]:
     stats: Dict[str, Dict[str, float]] = {}
     for tbl in tables:
-        cur = conn.execute(
-            f"SELECT COUNT(*) AS cnt, MIN(rowid) AS min_id, MAX(rowid) AS max_id FROM {tbl};"
-        )
+        try:
+            cur = conn.execute(
+                f"SELECT COUNT(*) AS cnt, MIN(rowid) AS min_id, MAX(rowid) AS max_id FROM {tbl};"
+            )
+        except sqlite3.OperationalError:
+            # WITHOUT ROWID tables (the inventory ledger) have no rowid range.
+            cur = conn.execute(f"SELECT COUNT(*), NULL, NULL FROM {tbl};")
         cnt, min_id, max_id = cur.fetchone()
         stats[tbl] = {"rows": cnt, "min_rowid": min_id, "max_rowid": max_id}
     return stats
 
 
-def dry_run_validate(data_dir: Path) -> None:
-    expected_files = [
-        "customers.csv",
-        "products.csv",
-        "orders.csv",
-        "order_items.csv",
-        "inventory_events.csv",
-    ]
-    for name in expected_files:
-        path = data_dir / name
-        if not path.exists():
-            raise FileNotFoundError(f"Missing required file: {path}")
-        rows = load_csv(path)
-        print(f"[DRY-RUN] {name}: {len(rows)} rows, columns={list(rows[0].keys())}")
-    print("[DRY-RUN] Validation complete")
+def dry_run_validate(data_dir: Path, reject_dir: Optional[Path] = None, incremental: bool = False) -> None:
+    """Run the full validation pass (see validate_data.py) without touching a database."""
+    from validate_data import validate_dataset
+
+    reports = validate_dataset(data_dir, reject_dir=reject_dir, incremental=incremental)
+    rejected = sum(report["rejected"] for report in reports.values())
+    print(f"[DRY-RUN] Validation complete: {rejected} rows would be rejected")
+
+
+# (csv file, table, transform, insert statement) in FK dependency order.
+LOAD_PLAN: Tuple[Tuple[str, str, Callable[[Iterable[Dict[str, str]]], List[Tuple]], str], ...] = (
+    ("customers.csv", "customers", partial(convert_dicts, "customers"), "INSERT INTO customers VALUES (?,?,?,?,?,?,?,?,?)"),
+    ("products.csv", "products", partial(convert_dicts, "products"), "INSERT INTO products VALUES (?,?,?,?,?,?,?,?)"),
+    ("orders.csv", "orders", partial(convert_dicts, "orders"), "INSERT INTO orders VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)"),
+    ("order_items.csv", "order_items", partial(convert_dicts, "order_items"), "INSERT INTO order_items VALUES (?,?,?,?,?,?,?,?)"),
+    ("inventory_events.csv", "inventory_events", partial(convert_dicts, "inventory_events"), "INSERT INTO inventory_events VALUES (?,?,?,?,?,?,?)"),
+)
+
+
+TRANSFORMS = {table: transform for _, table, transform, _ in LOAD_PLAN}
+
+
+def split_byte_ranges(path: Path, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Split the body of ``path`` into ``(start, end)`` byte ranges ending on line boundaries.
+
+    Assumes no quoted field spans lines, which holds for every generated file.
+    """
+    size = path.stat().st_size
+    ranges = []
+    with path.open("rb") as fh:
+        fh.readline()
+        start = fh.tell()
+        while start < size:
+            fh.seek(min(start + chunk_bytes, size))
+            fh.readline()
+            end = fh.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def transform_range(task: Tuple[str, str, int, int, bool]) -> List[Tuple]:
+    """Process-pool worker: parse and transform one byte range of a CSV file."""
+    table, path, start, end, compact = task
+    with open(path, "rb") as fh:
+        header = next(csv.reader([fh.readline().decode("utf-8")]))
+        fh.seek(start)
+        text = fh.read(end - start).decode("utf-8")
+    rows = row_converter(table, tuple(header))(csv.reader(io.StringIO(text, newline="")))
+    return compact_rows(table, rows) if compact else rows
+
 
+def parallel_insert(
+    conn: sqlite3.Connection,
+    planned: List[Tuple[Path, str, Callable, str, str]],
+    workers: int,
+    on_batch: Callable[[str, List[Tuple]], None],
+    compact: bool = False,
+) -> Dict[str, int]:
+    """Parse/transform in ``workers`` processes while this connection is the only writer.
 
-def load_data(conn: sqlite3.Connection, data_dir: Path) -> None:
+    Results are consumed strictly in plan order, so parents are always inserted
+    before children, and at most ``2 * workers`` ranges are in flight.
+    """
+    tasks = iter([
+        (table, sql, (table, str(path), start, end, compact))
+        for path, table, _, sql, _ in planned
+        for start, end in split_byte_ranges(path, PARALLEL_CHUNK_BYTES)
+    ])
+    counts = {table: 0 for _, table, _, _, _ in planned}
+    # Parsing and coercion happen in the workers; only the writer's insert time is recorded per table.
+    insert_seconds = {table: 0.0 for table in counts}
+    started_at = instrumentation.utc_now()
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque(
+            (table, sql, pool.submit(transform_range, task)) for table, sql, task in islice(tasks, workers * 2)
+        )
+        while pending:
+            table, sql, future = pending.popleft()
+            rows = future.result()
+            for next_table, next_sql, task in islice(tasks, 1):
+                pending.append((next_table, next_sql, pool.submit(transform_range, task)))
+            on_batch(table, rows)
+            mark = time.perf_counter()
+            conn.executemany(sql, rows)
+            insert_seconds[table] += time.perf_counter() - mark
+            counts[table] += len(rows)
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            print(f"[INFO] {table}: +{len(rows)} rows (total={counts[table]}, {sum(counts.values()) / elapsed:,.0f} rows/s)")
+    for table, count in counts.items():
+        instrumentation.record(f"insert:{table}", insert_seconds[table], started_at, rows=count)
+        if not count:
+            print(f"[WARN] No rows for {table}")
+        else:
+            print(f"[INFO] Loaded {count:>6} rows into {table}")
+    return counts
+
+
+def plan_tables(
+    conn: sqlite3.Connection, data_dir: Path, incremental: bool, compact: bool = False
+) -> List[Tuple[Path, str, Callable[[Iterable[List[str]]], List[Tuple]], str, str]]:
+    """Resolve LOAD_PLAN into ``(path, table, transform, sql, file_hash)`` entries to ingest.
+
+    ``transform`` takes the file's csv.reader rows (see ``iter_rows``).
+    Incremental runs upsert on the primary key, tolerate missing files (no delta
+    for that table) and skip files whose hash is already in ``load_manifest``.
+    Compact runs insert encoded rows into ``<table>_store``.
+    """
+    planned = []
+    for filename, table, _, sql in LOAD_PLAN:
+        path = data_dir / filename
+        if incremental and not path.exists():
+            print(f"[INFO] No delta for {table} ({filename} missing)")
+            continue
+        file_hash = file_sha256(path)
+        if incremental:
+            if already_ingested(conn, table, file_hash):
+                print(f"[INFO] Skipping {filename}: already ingested ({file_hash[:12]})")
+                continue
+            sql = upsert_sql(conn, table)
+        # The hot paths read csv.reader lists, converted positionally for this header.
+        transform = row_converter(table, read_header(path))
+        if compact:
+            sql = sql.replace(f"INSERT INTO {table} ", f"INSERT INTO {table}_store ", 1)
+            transform = partial(compact_transform, table, transform)
+        planned.append((path, table, transform, sql, file_hash))
+    return planned
+
+
+def load_data(
+    conn: sqlite3.Connection,
+    data_dir: Path,
+    batch_size: Optional[int] = None,
+    fast_load: bool = False,
+    incremental: bool = False,
+    workers: int = 1,
+    compact: bool = False,
+    validated: bool = False,
+    checkpoint_rows: Optional[int] = None,
+    search_index: Optional[str] = None,
+) -> None:
+    """Load ``data_dir`` and rebuild (or, incrementally, refresh) the derived tables in one transaction.
+
+    With ``checkpoint_rows`` the base rows are committed in chunks of that many
+    rows instead, each together with its ``load_checkpoints`` row; a later call
+    continues after the last committed chunk, and the derived tables are only
+    built, and the checkpoints cleared, once every file is in. Foreign keys are
+    then enforced per chunk even with ``fast_load``.
+    ``search_index`` (a search.TOKENIZERS key) builds the FTS5 search tables;
+    once they exist, triggers keep them current on every later load.
+    """
     print(f"[INFO] Loading data from {data_dir}")
-    customers = transform_customers(load_csv(data_dir / "customers.csv"))
-    products = transform_products(load_csv(data_dir / "products.csv"))
-    orders = transform_orders(load_csv(data_dir / "orders.csv"))
-    order_items = transform_order_items(load_csv(data_dir / "order_items.csv"))
-    inventory = transform_inventory(load_csv(data_dir / "inventory_events.csv"))
-
-    with conn:
-        insert_many(conn, "INSERT INTO customers VALUES (?,?,?,?,?,?,?,?,?)", customers, "customers")
-        insert_many(conn, "INSERT INTO products VALUES (?,?,?,?,?,?,?,?)", products, "products")
-        insert_many(conn, "INSERT INTO orders VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", orders, "orders")
-        insert_many(conn, "INSERT INTO order_items VALUES (?,?,?,?,?,?,?,?)", order_items, "order_items")
-        insert_many(conn, "INSERT INTO inventory_events VALUES (?,?,?,?,?,?,?)", inventory, "inventory_events")
-        populate_customer_kpis(conn)
-    summarize_inventory(conn)
+    timings: Dict[str, float] = {}
+    planned = plan_tables(conn, data_dir, incremental, compact)
+    if not planned:
+        print("[INFO] All input files already ingested; nothing to load")
+        return
+    if (fast_load and not checkpoint_rows) or validated:
+        # FK enforcement is switched off for the bulk insert: verified in one pass
+        # before commit instead of per row, or already checked by validate_data.
+        # Checkpointed chunks commit on their own, so there it stays on per chunk:
+        # an orphan row fails its chunk rather than the load after it is committed.
+        conn.execute("PRAGMA foreign_keys = OFF;")
+
+    def on_batch(table: str, rows: List[Tuple]) -> None:
+        trackers[table](rows)
+        if incremental:
+            mark_touched_customers(conn, table, rows)
+            mark_touched_products(conn, table, rows)
+            mark_touched_days(conn, table, rows)
+
+    trackers = {
+        table: WatermarkTracker(
+            None
+            if WATERMARK_COLUMNS[table] is None
+            else [name for name, _ in table_columns(conn, table)].index(WATERMARK_COLUMNS[table])
+        )
+        for _, table, _, _, _ in planned
+    }
+    counts: Dict[str, int] = {}
+    transformed: List[Tuple[Path, str, str, str, List[Tuple]]] = []
+    if not batch_size and workers <= 1 and not checkpoint_rows:
+        with timed_phase("transform", timings):
+            for path, table, transform, sql, file_hash in planned:
+                with instrumentation.stage(f"parse:{table}") as info:
+                    raw = read_rows(path)
+                    info["rows"] = len(raw)
+                with instrumentation.stage(f"coerce:{table}", rows=len(raw)):
+                    transformed.append((path, table, sql, file_hash, transform(raw)))
+                del raw
+
+    try:
+        if checkpoint_rows:
+            check_checkpoints(conn, planned)
+            with timed_phase("checkpointed_insert", timings, conn):
+                for path, table, transform, sql, file_hash in planned:
+                    counts[table] = checkpointed_insert(
+                        conn, path, table, transform, sql, file_hash, checkpoint_rows, trackers[table],
+                        on_batch=lambda rows, table=table: on_batch(table, rows),
+                    )
+        with conn:
+            with timed_phase("insert", timings, conn):
+                if checkpoint_rows:
+                    for path, table, _, _, file_hash in planned:
+                        record_manifest(conn, table, path, file_hash, counts[table], trackers[table].value)
+                    conn.execute("DELETE FROM load_checkpoints;")
+                elif workers > 1:
+                    counts = parallel_insert(conn, planned, workers, on_batch, compact)
+                    for path, table, _, _, file_hash in planned:
+                        record_manifest(conn, table, path, file_hash, counts[table], trackers[table].value)
+                elif batch_size:
+                    # Streaming mode: only one chunk of raw and typed rows is alive at a time.
+                    for path, table, transform, sql, file_hash in planned:
+                        count = stream_insert(
+                            conn, path, transform, sql, table, batch_size,
+                            on_batch=lambda rows, table=table: on_batch(table, rows),
+                        )
+                        record_manifest(conn, table, path, file_hash, count, trackers[table].value)
+                else:
+                    for path, table, sql, file_hash, rows in transformed:
+                        on_batch(table, rows)
+                        count = insert_many(conn, sql, rows, table)
+                        record_manifest(conn, table, path, file_hash, count, trackers[table].value)
+                    transformed.clear()
+            if fast_load:
+                with timed_phase("foreign_key_check", timings):
+                    verify_foreign_keys(conn)
+            with timed_phase("index_build", timings):
+                create_indexes(conn, compact)
+            with timed_phase("order_fact", timings, conn):
+                if incremental:
+                    refresh_order_fact(conn)
+                else:
+                    populate_order_fact(conn)
+            with timed_phase("sales_rollups", timings, conn):
+                if incremental:
+                    refresh_sales_rollups(conn)
+                else:
+                    populate_sales_rollups(conn)
+            with timed_phase("customer_kpis", timings, conn):
+                if incremental:
+                    refresh_customer_kpis(conn)
+                else:
+                    populate_customer_kpis(conn)
+            with timed_phase("inventory_ledger", timings, conn):
+                if incremental:
+                    refresh_inventory_ledger(conn)
+                else:
+                    populate_inventory_ledger(conn)
+            if search_index:
+                from search import build_search_indexes, search_tokenizer
+
+                # An existing index with this tokenizer was kept current by its triggers.
+                if not (incremental and search_tokenizer(conn) == search_index):
+                    with timed_phase("search_index", timings, conn):
+                        build_search_indexes(conn, search_index)
+            version = record_dataset_version(conn)
+    finally:
+        if fast_load or validated:
+            ensure_foreign_keys(conn)
+
+    if fast_load:
+        for phase, seconds in timings.items():
+            print(f"[TIMING] {phase:18} {seconds:8.3f}s")
+    print(f"[INFO] Dataset version {version[:12]}")
+    with instrumentation.stage("summarize_inventory"):
+        summarize_inventory(conn)
+
+
+def default_reject_dir(database: Path) -> Path:
+    return database.with_name(f"{database.stem}.rejects")
+
+
+def load_database(
+    database: Path,
+    data_dir: Path,
+    drop: bool = False,
+    vacuum: bool = False,
+    batch_size: Optional[int] = None,
+    fast_load: bool = False,
+    incremental: bool = False,
+    workers: int = 1,
+    compact: bool = False,
+    columnar_cache: Optional[Path] = None,
+    validate: bool = False,
+    reject_dir: Optional[Path] = None,
+    validated: bool = False,
+    checkpoint_rows: Optional[int] = None,
+    resume: bool = False,
+    search_index: Optional[str] = None,
+) -> None:
+    """Create/check the schema of ``database`` and load ``data_dir`` into it (also run once per shard).
+
+    ``validate`` loads only the rows validate_data accepts and quarantines the rest
+    in ``reject_dir``; ``validated`` marks ``data_dir`` as already validated.
+    ``checkpoint_rows`` commits in chunks (see ``load_data``); an interrupted
+    checkpointed load must be continued with ``resume`` or dropped.
+    """
+    instrumentation.set_context(database=str(database))
+    conn = sqlite3.connect(database)
+    if fast_load:
+        apply_fast_load_pragmas(conn, keep_journal=bool(checkpoint_rows))
+    ensure_foreign_keys(conn)
+    if drop:
+        drop_tables(conn)
+    pending = pending_checkpoints(conn)
+    if pending and not (resume and checkpoint_rows):
+        conn.close()
+        raise SystemExit(
+            f"error: {database} holds {pending} chunks of an interrupted checkpointed load; "
+            "pass --resume to continue it or --drop-tables to start over"
+        )
+    if resume and not pending:
+        print("[INFO] No interrupted load to resume; loading from the start")
+    existing = is_compact(conn)
+    if existing is not None and existing != compact:
+        conn.close()
+        layout = "compact" if existing else "standard"
+        raise SystemExit(f"error: {database} uses the {layout} layout; pass --drop-tables to switch")
+    create_tables(conn, compact=compact)
+    with tempfile.TemporaryDirectory(prefix="validated-", dir=database.resolve().parent) as tmp:
+        if validate:
+            from validate_data import database_lookup, validate_dataset
+
+            reject_dir = reject_dir or default_reject_dir(database)
+            print(f"[INFO] Validating {data_dir}; rejects go to {reject_dir}")
+            with instrumentation.stage("validate") as info:
+                reports = validate_dataset(
+                    data_dir,
+                    clean_dir=Path(tmp),
+                    reject_dir=reject_dir,
+                    lookup=database_lookup(conn) if incremental else None,
+                    incremental=incremental,
+                )
+                info["rows"] = sum(report["rows"] for report in reports.values())
+                info["rejected"] = sum(report["rejected"] for report in reports.values())
+            data_dir, validated = Path(tmp), True
+        load_data(
+            conn,
+            data_dir,
+            batch_size=batch_size,
+            fast_load=fast_load,
+            incremental=incremental,
+            workers=workers,
+            compact=compact,
+            validated=validated,
+            checkpoint_rows=checkpoint_rows,
+            search_index=search_index,
+        )
+
+    with instrumentation.stage("collect_stats"):
+        stats = collect_stats(conn, [
+            "customers", "products", "orders", "order_items", "inventory_events", "order_fact", "customer_kpis",
+            "inventory_ledger", "inventory_daily", *(table for table, _, _, _ in SALES_ROLLUPS), "load_manifest",
+        ])
+    for table, info in stats.items():
+        print(f"[STATS] {table:15} rows={info['rows']:>5}")
+
+    if vacuum:
+        print("[INFO] Running VACUUM")
+        with instrumentation.stage("vacuum"):
+            conn.execute("VACUUM;")
+
+    if columnar_cache:
+        from columnar_cache import export_cache
+
+        print(f"[INFO] Exporting columnar cache to {columnar_cache}")
+        with instrumentation.stage("columnar_cache"):
+            export_cache(conn, columnar_cache)
+
+    conn.close()
+    print(f"[DONE] Loaded data into {database}")
 
 
 def main() -> None:
@@ -360,32 +1883,252 @@ def main() -> None:
     parser.add_argument("--database", type=Path, default=Path("../ecommerce.db"), help="SQLite DB path")
     parser.add_argument("--drop-tables", action="store_true", help="Drop existing tables before load")
     parser.add_argument("--vacuum", action="store_true", help="Run VACUUM after load")
-    parser.add_argument("--dry-run", action="store_true", help="Validate files without loading")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Run the validation pass (see --validate) without loading"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Stream each CSV in chunks of N rows instead of loading whole files into memory",
+    )
+    parser.add_argument(
+        "--fast-load",
+        action="store_true",
+        help="Bulk-load profile: relaxed PRAGMAs, deferred FK verification, timed post-load index build",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Upsert delta files on primary keys and skip files already recorded in load_manifest",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse and transform CSV byte ranges in N processes; one connection does all writes",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Store UUIDs as 16-byte BLOBs and enums as lookup codes behind text-compatible views",
+    )
+    parser.add_argument(
+        "--columnar-cache",
+        type=Path,
+        default=None,
+        help="After loading, export memory-mapped column files here (see columnar_cache.py)",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Partition customers/orders/order_items by customer_id hash into N shard databases (see sharding.py)",
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Check PKs, FKs, enums and order totals in one pass first; load only accepted rows, FKs unenforced",
+    )
+    parser.add_argument(
+        "--reject-dir",
+        type=Path,
+        default=None,
+        help="Rejected rows + validation_report.json (default: <database stem>.rejects next to the DB)",
+    )
+    parser.add_argument(
+        "--checkpoint-rows",
+        type=int,
+        default=None,
+        help="Commit every N rows with a load_checkpoints record so an interrupted load can be resumed",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=f"Continue an interrupted checkpointed load after its last committed chunk "
+        f"(chunks of --checkpoint-rows, default {CHECKPOINT_ROWS})",
+    )
+    parser.add_argument(
+        "--search",
+        nargs="?",
+        const="prefix",
+        default=None,
+        choices=("prefix", "trigram"),
+        help="Build FTS5 search over customers/products: word prefixes (default) or trigram substrings (search.py)",
+    )
+    parser.add_argument(
+        "--publish",
+        action="store_true",
+        help="Build a new generation beside --database and atomically swap it live (see publish.py)",
+    )
+    parser.add_argument(
+        "--keep-generations",
+        type=int,
+        default=3,
+        help="--publish: previous generations kept for `publish.py rollback`",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running: ingest CSVs as they arrive in --data-dir as incremental micro-batches (see watch_ingest.py)",
+    )
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="--watch: seconds between directory scans")
+    parser.add_argument(
+        "--watch-high-water",
+        type=int,
+        default=20,
+        help="--watch: backlog (files) at which <data-dir>/.loader-busy asks producers to hold off",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        help="Append per-stage JSON lines (duration, rows/s, peak RSS) to this file (see instrumentation.py)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        nargs="?",
+        const=True,
+        default=None,
+        help="Run under cProfile; print the top functions and dump stats to PATH (default <database>.prof)",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        type=int,
+        nargs="?",
+        const=15,
+        default=None,
+        metavar="TOP",
+        help="Run under tracemalloc and print the TOP (default 15) allocating source lines",
+    )
     args = parser.parse_args()
+    if args.batch_size is not None and args.batch_size <= 0:
+        parser.error("--batch-size must be a positive integer")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.batch_size:
+        parser.error("--workers streams fixed-size byte ranges; drop --batch-size")
+    if args.compact and args.search:
+        parser.error("--search indexes the standard customers/products tables; drop --compact")
+    if args.compact and args.incremental:
+        parser.error("--compact builds a fresh database; it does not support --incremental")
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.checkpoint_rows is not None and args.checkpoint_rows <= 0:
+        parser.error("--checkpoint-rows must be a positive integer")
+    if args.resume and args.drop_tables:
+        parser.error("--resume continues the load already in the database; drop --drop-tables")
+    if args.resume and args.checkpoint_rows is None:
+        args.checkpoint_rows = CHECKPOINT_ROWS
+    if args.checkpoint_rows and (args.batch_size or args.workers > 1 or args.watch):
+        parser.error("--checkpoint-rows/--resume commit their own chunks; drop --batch-size/--workers/--watch")
+    if args.shards > 1 and (args.workers > 1 or args.columnar_cache):
+        parser.error("--shards loads shards in parallel processes; drop --workers/--columnar-cache")
+
+    if args.watch and (args.drop_tables or args.compact or args.shards > 1 or args.workers > 1 or args.columnar_cache):
+        parser.error(
+            "--watch upserts into one standard-layout database; "
+            "drop --drop-tables/--compact/--shards/--workers/--columnar-cache"
+        )
+    if args.publish and (args.watch or args.shards > 1 or args.checkpoint_rows):
+        parser.error("--publish swaps in one freshly built database; drop --watch/--shards/--checkpoint-rows/--resume")
+    if args.keep_generations < 0:
+        parser.error("--keep-generations must not be negative")
+    if args.poll_interval <= 0:
+        parser.error("--poll-interval must be positive")
+
+    if args.profile is True:
+        args.profile = args.database.with_suffix(".prof")
+    if args.trace_memory is not None and args.trace_memory < 1:
+        parser.error("--trace-memory TOP must be at least 1")
+
+    instrumentation.configure(
+        args.metrics, argv=sys.argv[1:], database=args.database, sqlite_version=sqlite3.sqlite_version
+    )
+    # The profiler sits inside tracemalloc so the final snapshot analysis is not profiled.
+    with instrumentation.trace_memory(args.trace_memory), instrumentation.profile(args.profile):
+        with instrumentation.stage("run"):
+            run(args)
+
 
+def run(args: argparse.Namespace) -> None:
     if args.dry_run:
-        dry_run_validate(args.data_dir)
+        dry_run_validate(args.data_dir, args.reject_dir, args.incremental)
         return
 
-    conn = sqlite3.connect(args.database)
-    ensure_foreign_keys(conn)
-    if args.drop_tables:
-        drop_tables(conn)
-    create_tables(conn)
-    load_data(conn, args.data_dir)
+    if args.watch:
+        from watch_ingest import watch
 
-    stats = collect_stats(conn, [
-        "customers", "products", "orders", "order_items", "inventory_events", "customer_kpis"
-    ])
-    for table, info in stats.items():
-        print(f"[STATS] {table:15} rows={info['rows']:>5}")
+        watch(
+            args.database,
+            args.data_dir,
+            poll_interval=args.poll_interval,
+            high_water=args.watch_high_water,
+            validate=args.validate,
+            reject_dir=args.reject_dir,
+            batch_size=args.batch_size,
+        )
+        return
 
-    if args.vacuum:
-        print("[INFO] Running VACUUM")
-        conn.execute("VACUUM;")
+    if args.publish:
+        from publish import publish_load
 
-    conn.close()
-    print(f"[DONE] Loaded data into {args.database}")
+        publish_load(
+            args.database,
+            args.data_dir,
+            keep=args.keep_generations,
+            incremental=args.incremental,
+            reject_dir=args.reject_dir,
+            vacuum=args.vacuum,
+            batch_size=args.batch_size,
+            fast_load=args.fast_load,
+            workers=args.workers,
+            compact=args.compact,
+            columnar_cache=args.columnar_cache,
+            validate=args.validate,
+            search_index=args.search,
+        )
+        return
+
+    if args.shards > 1:
+        from sharding import load_shards
+
+        load_shards(
+            args.database,
+            args.data_dir,
+            args.shards,
+            drop=args.drop_tables,
+            vacuum=args.vacuum,
+            batch_size=args.batch_size,
+            fast_load=args.fast_load,
+            incremental=args.incremental,
+            compact=args.compact,
+            validate=args.validate,
+            reject_dir=args.reject_dir,
+            checkpoint_rows=args.checkpoint_rows,
+            resume=args.resume,
+            search_index=args.search,
+        )
+        return
+
+    load_database(
+        args.database,
+        args.data_dir,
+        drop=args.drop_tables,
+        vacuum=args.vacuum,
+        batch_size=args.batch_size,
+        fast_load=args.fast_load,
+        incremental=args.incremental,
+        workers=args.workers,
+        compact=args.compact,
+        columnar_cache=args.columnar_cache,
+        validate=args.validate,
+        reject_dir=args.reject_dir,
+        checkpoint_rows=args.checkpoint_rows,
+        resume=args.resume,
+        search_index=args.search,
+    )
 
 
 if __name__ == "__main__":
@@ -396,15 +2139,67 @@ README = """
 
 ## Usage
 python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --vacuum
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --batch-size 50000
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --fast-load
+python scripts/load_ecommerce_data.py --data-dir deltas/2024-06-01 --database ecommerce.db --incremental
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --workers 4
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --compact
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --columnar-cache cache
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --shards 4
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --validate --reject-dir rejects
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --watch --poll-interval 1
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --metrics load_metrics.jsonl --profile --trace-memory
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --checkpoint-rows 100000
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --resume --checkpoint-rows 100000
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --publish --fast-load --vacuum
+python scripts/load_ecommerce_data.py --data-dir data --database ecommerce.db --drop-tables --search
 
 ## Features
 - Strict schema with FK + CHECK constraints.
 - Derived customer_kpis materialization for reporting.
-- Dry-run validation and structured logging to catch issues early.
+- order_fact holds one pre-aggregated row per order so KPIs/reports skip the order_items fan-out.
+- inventory_ledger (running balance per event) and inventory_daily (closing snapshots) answer
+  point-in-time stock and days-since-restock with one seek; appended events rebuild only the tail.
+- sales_rollup_* tables (day/month x category x channel x state) are refreshed per touched day;
+  query_sales_rollup() routes a grouping request to the coarsest table that can answer it.
+- --compact stores UUIDs as 16-byte BLOBs and enums as enum_* codes in <table>_store tables
+  (WITHOUT ROWID where the key is the access path); views keep the original text columns.
+- --columnar-cache DIR exports typed, dictionary-encoded column files for NumPy memmap analytics.
+- --shards N writes ecommerce.shard<i>of<N>.db files split by customer_id hash (products and
+  inventory replicated); sharding.py fans report sections out to them and merges the results.
+- Every completed load writes dataset_version (hash of load_manifest) in the same transaction;
+  result_cache.py keys cached report/rollup results on it.
+- --validate checks PK uniqueness, FKs (hash sets of accepted parent keys), enums and order
+  totals in one pass, writes rejects with line numbers + validation_report.json, and bulk-inserts
+  the accepted rows with FK enforcement off. --dry-run runs the same pass without loading.
+- --watch polls --data-dir for new <table>[-suffix].csv extracts and ingests each as a small
+  incremental transaction (touched aggregates only) with per-batch latency and a backlog marker.
+- --metrics appends one JSON line per stage (parse/coerce/insert per table, derived tables, VACUUM...)
+  with duration, rows/s and peak RSS; --profile (cProfile) and --trace-memory (tracemalloc) are opt-in.
+- Transforms are compiled from TABLE_SCHEMAS (column, type, nullability, enum domain) into one
+  positional tuple expression per table over csv.reader rows, with inlined numeric fast paths.
+- --checkpoint-rows N commits every N rows with a load_checkpoints row (file hash, byte offsets,
+  row number, chunk hash); --resume skips committed chunks after a crash. Derived tables such as
+  customer_kpis are built, and the checkpoints cleared, only once every table is complete. FKs
+  stay enforced per chunk even with --fast-load, so a bad row fails its chunk, not the finished load.
+- --publish builds into ecommerce.generations/<timestamp>.db (incremental: a copy of the live one)
+  and atomically repoints the ecommerce.db symlink, so readers never see a partial load or wait
+  on VACUUM; --keep-generations N old ones stay for `publish.py rollback`.
+- --search [prefix|trigram] builds FTS5 customer_search/product_search tables (external content,
+  synced by triggers on later loads); search.py returns bm25-ranked matches with customer_kpis.
+- Structured logging to catch issues early.
 - Inventory sanity preview for confidence.
+- Streaming mode (--batch-size) keeps memory flat on multi-GB exports.
+- Secondary/covering indexes on every FK column, built after the bulk insert.
+- --fast-load relaxes PRAGMAs and verifies FKs once via PRAGMA foreign_key_check.
+- --incremental upserts daily deltas and records a per-file load_manifest (hash, watermark, rows).
+- Incremental loads queue touched customers and refresh only their customer_kpis rows.
+- --workers N parses/transforms byte ranges in a process pool; a single writer inserts in FK order.
 
 ## Troubleshooting
 - Use --dry-run if CSV validation fails.
 - Delete ecommerce.db or pass --drop-tables when schema drifts.
+- Rerunning without --drop-tables needs --incremental, otherwise primary keys conflict.
+- "interrupted checkpointed load": rerun the same command with --resume, or start over with --drop-tables.
 - Ensure Python 3.9+ with sqlite3 enabled.
 """
@@ -0,0 +1,204 @@
+"""Atomic build-and-swap publishing of the loader's database, with generations for rollback.
+
+In publish mode ``--database ecommerce.db`` is a symlink to the live generation,
+``ecommerce.generations/ecommerce.<UTC timestamp>.db``. A publish builds the
+next generation beside the others -- a full load into an empty file, or an
+incremental load into a backup copy of the live generation -- including its
+indexes, derived tables and VACUUM, and then points the link at it with a
+single ``rename``. Readers never see a half-loaded database and the load never
+locks the file they read: connections opened before the swap keep reading
+their generation, later ones open the new one. SQLite resolves the link, so
+every generation has its own -journal/-wal files and a swap never pairs a
+database with another one's WAL.
+
+The ``keep`` previous generations stay on disk, and ``rollback`` repoints the
+link at one of them the same way. A database that is still a regular file is
+copied into the first generation by the first publish. Symlinks need a POSIX
+filesystem (or Windows developer mode).
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional
+
+import instrumentation
+import load_ecommerce_data as loader
+
+GENERATIONS_SUFFIX = ".generations"
+# A generation being built; renamed to ``.db`` only once the load has committed.
+BUILDING_SUFFIX = ".building"
+KEEP_GENERATIONS = 3
+
+
+def generations_dir(database: Path) -> Path:
+    return database.with_name(f"{database.stem}{GENERATIONS_SUFFIX}")
+
+
+def list_generations(database: Path) -> List[Path]:
+    """Complete generations, oldest first (names sort by their timestamp)."""
+    return sorted(generations_dir(database).resolve().glob(f"{database.stem}.*{database.suffix or '.db'}"))
+
+
+def live_generation(database: Path) -> Optional[Path]:
+    return database.resolve() if database.is_symlink() else None
+
+
+def new_generation(database: Path) -> Path:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    return generations_dir(database) / f"{database.stem}.{stamp}{database.suffix or '.db'}"
+
+
+def copy_database(source: Path, target: Path) -> None:
+    """Consistent online copy (committed WAL frames included) in rollback-journal mode."""
+    src = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    dst = sqlite3.connect(target)
+    try:
+        src.backup(dst)
+        dst.execute("PRAGMA journal_mode = DELETE;")
+    finally:
+        dst.close()
+        src.close()
+
+
+def fsync_path(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:  # directories cannot be opened on Windows
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def point_at(database: Path, generation: Path) -> None:
+    """Atomically repoint ``database`` at ``generation`` (relative link, so the directory can move)."""
+    link = database.with_name(f".{database.name}.{os.getpid()}.link")
+    if link.is_symlink() or link.exists():
+        link.unlink()
+    os.symlink(os.path.relpath(generation, database.parent), link)
+    os.replace(link, database)
+    fsync_path(database.parent)
+
+
+def remove_generation(generation: Path) -> None:
+    """Readers still holding it open keep their file until they close it."""
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        Path(f"{generation}{suffix}").unlink(missing_ok=True)
+
+
+def prune(database: Path, keep: int) -> None:
+    live = live_generation(database)
+    previous = [generation for generation in list_generations(database) if generation != live]
+    for generation in previous[: max(len(previous) - keep, 0)]:
+        remove_generation(generation)
+        print(f"[INFO] Removed generation {generation.name}")
+
+
+def publish_load(
+    database: Path,
+    data_dir: Path,
+    keep: int = KEEP_GENERATIONS,
+    incremental: bool = False,
+    reject_dir: Optional[Path] = None,
+    **options,
+) -> Path:
+    """Load into a new generation and swap it live; returns the generation.
+
+    ``options`` go to ``load_database``. A failed load removes its partial
+    generation and leaves the live one untouched.
+    """
+    generations_dir(database).mkdir(parents=True, exist_ok=True)
+    base = live_generation(database)
+    if base is None and database.exists():
+        # First publish: the in-place database becomes the oldest generation.
+        base = new_generation(database)
+        copy_database(database, base)
+        print(f"[INFO] Copied {database} into generation {base.name}")
+    generation = new_generation(database)
+    building = generation.with_name(generation.name + BUILDING_SUFFIX)
+    try:
+        if incremental and base is not None:
+            with instrumentation.stage("publish_copy"):
+                copy_database(base, building)
+            print(f"[INFO] Building {generation.name} from {base.name}")
+        else:
+            print(f"[INFO] Building {generation.name}")
+        loader.load_database(
+            building,
+            data_dir,
+            incremental=incremental,
+            reject_dir=reject_dir or loader.default_reject_dir(database),
+            **options,
+        )
+        conn = sqlite3.connect(building)
+        try:
+            # WAL mode persists in the file; published generations are never written in place.
+            conn.execute("PRAGMA journal_mode = DELETE;")
+        finally:
+            conn.close()
+        fsync_path(building)
+        os.replace(building, generation)
+    except BaseException:
+        remove_generation(building)
+        raise
+    point_at(database, generation)
+    print(f"[INFO] Published {generation.name} as {database}")
+    prune(database, keep)
+    return generation
+
+
+def rollback(database: Path, to: Optional[str] = None) -> Path:
+    """Point ``database`` at generation ``to`` (a file name), by default the one before the live one."""
+    generations = list_generations(database)
+    live = live_generation(database)
+    if to is not None:
+        matches = [generation for generation in generations if generation.name == to]
+        if not matches:
+            raise SystemExit(f"error: no generation named {to} in {generations_dir(database)}")
+        target = matches[0]
+    else:
+        older = [generation for generation in generations if live is None or generation.name < live.name]
+        if not older:
+            raise SystemExit(f"error: no generation older than {live.name if live else database} to roll back to")
+        target = older[-1]
+    point_at(database, target)
+    print(f"[INFO] Rolled {database} back to {target.name}" + (f" (was {live.name})" if live else ""))
+    return target
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="List or roll back published generations of ecommerce.db")
+    commands = parser.add_subparsers(dest="command", required=True)
+    listing = commands.add_parser("list", help="Show the generations, marking the live one")
+    listing.add_argument("--database", type=Path, default=Path("../ecommerce.db"), help="Published DB link")
+    back = commands.add_parser("rollback", help="Repoint the database at a previous generation")
+    back.add_argument("--database", type=Path, default=Path("../ecommerce.db"), help="Published DB link")
+    back.add_argument("--to", default=None, help="Generation file name (default: the one before the live one)")
+    args = parser.parse_args()
+
+    if args.command == "rollback":
+        rollback(args.database, args.to)
+        return
+    live = live_generation(args.database)
+    for generation in list_generations(args.database):
+        conn = sqlite3.connect(f"file:{generation}?mode=ro", uri=True)
+        try:
+            version = conn.execute("SELECT version FROM dataset_version;").fetchone()
+        except sqlite3.Error:
+            version = None
+        finally:
+            conn.close()
+        marker = "*" if generation == live else " "
+        print(
+            f"{marker} {generation.name}  {generation.stat().st_size / (1 << 20):8.1f}MB  "
+            f"dataset_version={version[0][:12] if version else '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""Local HTTP/JSON query service: named read-only queries over a bounded SQLite pool.
+
+Endpoints (GET, one request per connection):
+  /queries                          named queries and their parameters
+  /query/<name>?param=...&timeout=S run a named query; NDJSON stream of a
+                                    {"columns": [...]} line, one JSON array per
+                                    row, and a {"rows": N, "complete": bool} trailer
+  /metrics                          latency histograms, pool saturation, counters
+  /healthz                          liveness
+
+The pool holds ``--pool-size`` ``mode=ro`` connections (``query_only``; the
+database is switched to WAL once at startup so readers never block the
+loader); requests beyond it wait up to their timeout. SQL runs on a thread per
+pooled connection. A request that exceeds its timeout, or whose client
+disconnects, interrupts its statement with ``Connection.interrupt()`` and
+returns the connection to the pool. Named queries are fixed SQL text, so
+each connection's statement cache keeps them prepared. When ``--database`` is a
+link published by publish.py, each connection stays on the generation it
+opened and is reopened on the new one at its next checkout after a swap.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import bisect
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from run_report import REPORT_SQL, split_statements
+from search import check_terms, search_sql
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+FETCH_ROWS = 500
+MAX_REQUEST_BYTES = 16 << 10
+SEARCH_LIMIT = 20
+
+
+def report_section(label: str) -> str:
+    return dict(split_statements(REPORT_SQL.read_text(encoding="utf-8-sig")))[label]
+
+
+# name -> (SQL, required parameters). Report sections are taken verbatim so the
+# service returns exactly what customer_ltv_report.sql does.
+NAMED_QUERIES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "ltv_leaderboard": (report_section("Customer LTV leaderboard"), ()),
+    "customer_kpis": ("SELECT * FROM customer_kpis WHERE customer_id = :customer_id;", ("customer_id",)),
+    "inventory_health": (report_section("Inventory health summary"), ()),
+    # ?q= terms are prefix-matched, all required (search.py); needs a database loaded with --search.
+    # On a trigram index terms under 3 characters are rejected with 400 (check_terms).
+    "customer_search": (search_sql("customers", SEARCH_LIMIT), ("q",)),
+    "product_search": (search_sql("products", SEARCH_LIMIT), ("q",)),
+}
+# Named search query -> search.SEARCH_SQL kind, for check_terms.
+SEARCH_KINDS = {"customer_search": "customers", "product_search": "products"}
+
+
+class Histogram:
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (``max`` for the open bucket)."""
+        count = sum(self.counts)
+        if not count:
+            return None
+        rank, seen = q * count, 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank:
+                return self.bounds[index] if index < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict:
+        count = sum(self.counts)
+        return {
+            "count": count,
+            "mean": self.total / count if count else None,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                **{f"le_{bound:g}": bucket for bound, bucket in zip(self.bounds, self.counts)},
+                "le_inf": self.counts[-1],
+            },
+        }
+
+
+def connect_readonly(database: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True, check_same_thread=False)
+    try:
+        conn.execute("PRAGMA query_only = ON;")
+    except sqlite3.Error:
+        conn.close()
+        raise
+    return conn
+
+
+def ensure_wal(database: Path) -> str:
+    """WAL lets pooled readers run while the loader writes; the mode persists in the file."""
+    conn = sqlite3.connect(database)
+    try:
+        return conn.execute("PRAGMA journal_mode = WAL;").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class ConnectionPool:
+    def __init__(self, database: Path, size: int) -> None:
+        self.database = database
+        self.size = size
+        self.idle: asyncio.Queue = asyncio.Queue()
+        # Resolved file each connection reads; differs from the link's target after a publish.
+        self.opened: Dict[sqlite3.Connection, Path] = {}
+        self.reconnects = 0
+        for _ in range(size):
+            self.idle.put_nowait(self.open())
+        self.in_use = 0
+        self.waiting = 0
+        self.max_in_use = 0
+        self.max_waiting = 0
+        self.acquire_timeouts = 0
+        self.acquire_wait = Histogram()
+        self.saturated_seconds = 0.0
+        self.saturated_since: Optional[float] = None
+        self.started = time.monotonic()
+
+    @asynccontextmanager
+    async def connection(self, timeout: float) -> AsyncIterator[sqlite3.Connection]:
+        started = time.monotonic()
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        try:
+            conn = await asyncio.wait_for(self.idle.get(), timeout)
+        except asyncio.TimeoutError:
+            self.acquire_timeouts += 1
+            raise TimeoutError("timed out waiting for a pooled connection") from None
+        finally:
+            self.waiting -= 1
+        if self.opened[conn] != self.database.resolve():
+            conn = self.reopen(conn)
+        self.acquire_wait.record(time.monotonic() - started)
+        self.in_use += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+        if self.in_use == self.size:
+            self.saturated_since = time.monotonic()
+        try:
+            yield conn
+        finally:
+            if self.saturated_since is not None:
+                self.saturated_seconds += time.monotonic() - self.saturated_since
+                self.saturated_since = None
+            self.in_use -= 1
+            self.idle.put_nowait(conn)
+
+    def open(self) -> sqlite3.Connection:
+        target = self.database.resolve()
+        conn = connect_readonly(target)
+        self.opened[conn] = target
+        return conn
+
+    def reopen(self, stale: sqlite3.Connection) -> sqlite3.Connection:
+        """Connection to the current generation, or ``stale`` (still a consistent one) if it cannot be opened."""
+        try:
+            conn = self.open()
+        except sqlite3.Error as exc:
+            # E.g. the link is being replaced mid-publish/rollback; retried on the next acquire.
+            print(f"[WARN] Could not reopen {self.database} ({exc}); serving its previous generation")
+            return stale
+        del self.opened[stale]
+        stale.close()
+        self.reconnects += 1
+        return conn
+
+    def metrics(self) -> Dict:
+        saturated = self.saturated_seconds
+        if self.saturated_since is not None:
+            saturated += time.monotonic() - self.saturated_since
+        uptime = time.monotonic() - self.started
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "max_in_use": self.max_in_use,
+            "max_waiting": self.max_waiting,
+            "acquire_timeouts": self.acquire_timeouts,
+            "reconnects": self.reconnects,
+            "saturated_seconds": round(saturated, 3),
+            "saturated_fraction": round(saturated / uptime, 4) if uptime else 0.0,
+            "acquire_wait_seconds": self.acquire_wait.to_dict(),
+        }
+
+    def close(self) -> None:
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
+
+
+class QueryService:
+    def __init__(
+        self, database: Path, pool_size: int, default_timeout: float, max_timeout: float, fetch_rows: int = FETCH_ROWS
+    ) -> None:
+        self.pool = ConnectionPool(database, pool_size)
+        # As many threads as connections: a query holding a connection never waits for a thread,
+        # and the pool guarantees each connection is used by one thread at a time.
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="query")
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+        self.fetch_rows = fetch_rows
+        self.stats = {
+            name: {"requests": 0, "ok": 0, "errors": 0, "timeouts": 0, "cancelled": 0, "rows": 0, "latency": Histogram()}
+            for name in NAMED_QUERIES
+        }
+
+    async def call(self, conn: sqlite3.Connection, deadline: float, disconnected: asyncio.Future, func, *args):
+        """Run ``func`` on the executor; interrupt it on timeout or client disconnect."""
+        loop = asyncio.get_running_loop()
+        work = loop.run_in_executor(self.executor, func, *args)
+        done, _ = await asyncio.wait(
+            {work, disconnected}, timeout=max(deadline - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED
+        )
+        if work in done:
+            return work.result()
+        conn.interrupt()
+        try:
+            await work  # the connection goes back to the pool only once its thread is done
+        except sqlite3.OperationalError:
+            pass
+        if disconnected.done():
+            raise ConnectionAbortedError("client disconnected")
+        raise TimeoutError("query timed out")
+
+    async def run_query(
+        self, name: str, params: Dict[str, str], timeout: float, reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        sql, required = NAMED_QUERIES[name]
+        missing = [param for param in required if param not in params]
+        if missing:
+            await respond(writer, 400, {"error": f"missing parameters: {', '.join(missing)}"})
+            return
+        stats = self.stats[name]
+        stats["requests"] += 1
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + timeout
+        disconnected = asyncio.ensure_future(wait_for_eof(reader))
+        rows = 0
+        headers_sent = False
+        outcome = "ok"
+        try:
+            async with self.pool.connection(timeout) as conn:
+                cursor = None
+                try:
+                    if name in SEARCH_KINDS:
+                        await self.call(conn, deadline, disconnected, check_terms, conn, SEARCH_KINDS[name], params["q"])
+                    cursor = await self.call(
+                        conn, deadline, disconnected, conn.execute, sql, {param: params[param] for param in required}
+                    )
+                    columns = [column[0] for column in cursor.description]
+                    await send_headers(writer, 200, "application/x-ndjson", chunked=True)
+                    headers_sent = True
+                    await send_chunk(writer, json.dumps({"columns": columns}) + "\n")
+                    while True:
+                        batch = await self.call(conn, deadline, disconnected, cursor.fetchmany, self.fetch_rows)
+                        if not batch:
+                            break
+                        rows += len(batch)
+                        await send_chunk(writer, "".join(json.dumps(row) + "\n" for row in batch))
+                finally:
+                    if cursor is not None:
+                        await loop.run_in_executor(self.executor, cursor.close)
+            await send_chunk(writer, json.dumps({"rows": rows, "complete": True}) + "\n")
+            await send_chunk(writer, "")
+        except TimeoutError as exc:
+            outcome = "timeouts"
+            await self.fail(writer, headers_sent, 504, str(exc), rows)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            outcome = "cancelled"
+        except ValueError as exc:
+            outcome = "errors"
+            await self.fail(writer, headers_sent, 400, str(exc), rows)
+        except sqlite3.Error as exc:
+            outcome = "errors"
+            await self.fail(writer, headers_sent, 500, str(exc), rows)
+        finally:
+            disconnected.cancel()
+            stats[outcome] += 1
+            stats["rows"] += rows
+            stats["latency"].record(loop.time() - started)
+
+    @staticmethod
+    async def fail(writer: asyncio.StreamWriter, headers_sent: bool, status: int, message: str, rows: int) -> None:
+        try:
+            if headers_sent:
+                await send_chunk(writer, json.dumps({"rows": rows, "complete": False, "error": message}) + "\n")
+                await send_chunk(writer, "")
+            else:
+                await respond(writer, status, {"error": message})
+        except ConnectionError:
+            pass
+
+    def metrics(self) -> Dict:
+        return {
+            "pool": self.pool.metrics(),
+            "executor_threads": self.pool.size,
+            "queries": {
+                name: {**{key: value for key, value in stats.items() if key != "latency"},
+                       "latency_seconds": stats["latency"].to_dict()}
+                for name, stats in self.stats.items()
+            },
+        }
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 10)
+            if len(head) > MAX_REQUEST_BYTES:
+                raise ValueError("request too large")
+            method, target, _ = head.split(b"\r\n", 1)[0].decode("latin-1").split(" ", 2)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            writer.close()
+            return
+        try:
+            url = urlsplit(target)
+            params = dict(parse_qsl(url.query))
+            if method != "GET":
+                await respond(writer, 405, {"error": "only GET is supported"})
+            elif url.path == "/healthz":
+                await respond(writer, 200, {"status": "ok"})
+            elif url.path == "/metrics":
+                await respond(writer, 200, self.metrics())
+            elif url.path == "/queries":
+                await respond(writer, 200, {name: list(required) for name, (_, required) in NAMED_QUERIES.items()})
+            elif url.path.startswith("/query/") and url.path[len("/query/"):] in NAMED_QUERIES:
+                try:
+                    timeout = float(params.pop("timeout", self.default_timeout))
+                except ValueError:
+                    await respond(writer, 400, {"error": "timeout must be a number of seconds"})
+                else:
+                    timeout = min(max(timeout, 0.001), self.max_timeout)
+                    await self.run_query(url.path[len("/query/"):], params, timeout, reader, writer)
+            else:
+                await respond(writer, 404, {"error": f"unknown path {url.path}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+
+async def wait_for_eof(reader: asyncio.StreamReader) -> None:
+    """Completes when the client closes its end of the socket."""
+    while await reader.read(1024):
+        pass
+
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error",
+           504: "Gateway Timeout"}
+
+
+async def send_headers(writer: asyncio.StreamWriter, status: int, content_type: str, chunked: bool = False,
+                       length: Optional[int] = None) -> None:
+    lines = [f"HTTP/1.1 {status} {REASONS[status]}", f"Content-Type: {content_type}", "Connection: close"]
+    lines.append("Transfer-Encoding: chunked" if chunked else f"Content-Length: {length}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+
+
+async def send_chunk(writer: asyncio.StreamWriter, text: str) -> None:
+    """Write one chunk; drain applies backpressure so a slow client pauses the fetch loop."""
+    data = text.encode("utf-8")
+    writer.write(f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n")
+    await writer.drain()
+
+
+async def respond(writer: asyncio.StreamWriter, status: int, payload: Dict) -> None:
+    body = (json.dumps(payload, indent=2) + "\n").encode("utf-8")
+    await send_headers(writer, status, "application/json", length=len(body))
+    writer.write(body)
+    await writer.drain()
+
+
+async def serve(database: Path, host: str, port: int, pool_size: int, *options) -> None:
+    """Serve until cancelled; ``options`` are QueryService's timeouts and fetch size.
+
+    The service (and its pool's asyncio.Queue) is built inside the running loop:
+    before Python 3.10 asyncio primitives bind to the loop current at creation,
+    which is not the one asyncio.run starts.
+    """
+    service = QueryService(database, pool_size, *options)
+    try:
+        server = await asyncio.start_server(service.handle, host, port)
+        print(f"[INFO] Serving {', '.join(NAMED_QUERIES)} on http://{host}:{port} (pool={service.pool.size})")
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve named read-only queries over a pooled SQLite connection set")
+    parser.add_argument("--database", type=Path, default=Path("../ecommerce.db"), help="SQLite DB path")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (keep it local)")
+    parser.add_argument("--port", type=int, default=8765, help="Bind port")
+    parser.add_argument("--pool-size", type=int, default=4, help="Read-only connections (= concurrent queries)")
+    parser.add_argument("--default-timeout", type=float, default=30.0, help="Seconds per request unless ?timeout=")
+    parser.add_argument("--max-timeout", type=float, default=300.0, help="Upper bound for ?timeout=")
+    parser.add_argument("--fetch-rows", type=int, default=FETCH_ROWS, help="Rows per fetch/stream chunk")
+    args = parser.parse_args()
+    if not args.database.exists():
+        parser.error(f"{args.database} does not exist; run load_ecommerce_data.py first")
+    if args.pool_size < 1 or args.fetch_rows < 1:
+        parser.error("--pool-size and --fetch-rows must be at least 1")
+
+    if args.database.is_symlink():
+        print(f"[INFO] {args.database} is published by publish.py; generations are never written in place")
+    else:
+        mode = ensure_wal(args.database)
+        if mode != "wal":
+            print(f"[WARN] Could not switch {args.database} to WAL (journal_mode={mode}); readers may block the loader")
+    try:
+        asyncio.run(serve(
+            args.database, args.host, args.port, args.pool_size, args.default_timeout, args.max_timeout, args.fetch_rows
+        ))
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""On-disk result cache for report and KPI queries, keyed on the dataset version.
+
+A key is the SHA-256 of the normalized SQL (comments dropped, whitespace
+collapsed outside string literals), its parameters and the version string the
+loader writes to ``dataset_version`` in the same transaction as the data. A
+completed load therefore changes every key at once; entries for older versions
+are purged the first time a new version is seen. Results live in a small
+SQLite file, zlib-compressed JSON per entry, evicted least-recently-used once
+the total exceeds ``max_bytes``.
+
+``PRAGMA data_version`` is not used as the key: it is per connection and starts
+over in every process, so it cannot identify data across runs.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_MAX_BYTES = 64 << 20
+COUNTERS = ("hits", "misses", "bypasses", "evictions", "purged")
+
+# String literals are kept verbatim; comments and whitespace runs become one space.
+SQL_TOKENS = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")|--[^\n]*|/\*.*?\*/|\s+""", re.DOTALL)
+
+
+def normalize_sql(sql: str) -> str:
+    return SQL_TOKENS.sub(lambda match: match.group(1) or " ", sql).strip().rstrip(";").strip()
+
+
+def dataset_version(conn: sqlite3.Connection) -> Optional[str]:
+    """Version recorded by the last completed load, or None (no loader metadata, or mid-rebuild)."""
+    try:
+        row = conn.execute("SELECT version FROM dataset_version;").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+@contextmanager
+def snapshot(conn: sqlite3.Connection) -> Iterator[None]:
+    """Read the version and run the query in one read transaction, so a load committing in
+    between cannot store new results under the old version."""
+    if conn.in_transaction:
+        yield
+        return
+    conn.execute("BEGIN;")
+    try:
+        yield
+    finally:
+        conn.execute("COMMIT;")
+
+
+class ResultCache:
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.counters: Counter = Counter()
+        self.current_version: Optional[str] = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.execute("PRAGMA journal_mode = WAL;")
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                dataset_version TEXT NOT NULL,
+                sql TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used);
+            -- Lifetime totals across processes; self.counters holds this instance's share.
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+        self.evict()  # the bound may be smaller than when the file was last written
+
+    def close(self) -> None:
+        self.flush_counters()
+        self.db.close()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] += amount
+
+    def flush_counters(self) -> None:
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value;",
+                [(name, self.counters[name]) for name in COUNTERS if self.counters[name]],
+            )
+        self.counters.clear()
+
+    def key(self, sql: str, params: Sequence, version: str) -> str:
+        material = json.dumps([version, normalize_sql(sql), list(params)], default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def purge_stale(self, version: str) -> None:
+        if version == self.current_version:
+            return
+        with self.db:
+            purged = self.db.execute("DELETE FROM entries WHERE dataset_version <> ?;", (version,)).rowcount
+        self.count("purged", purged)
+        self.current_version = version
+
+    def execute(
+        self, conn: sqlite3.Connection, sql: str, params: Sequence = ()
+    ) -> Tuple[List[str], List[Tuple], str]:
+        """Run ``sql`` on ``conn`` through the cache; returns ``(columns, rows, "hit"|"miss"|"bypass")``."""
+        with snapshot(conn):
+            version = dataset_version(conn)
+            if version is None:
+                self.count("bypasses")
+                return self.run(conn, sql, params) + ("bypass",)
+            self.purge_stale(version)
+            key = self.key(sql, params, version)
+            row = self.db.execute("SELECT payload FROM entries WHERE key = ?;", (key,)).fetchone()
+            if row is None:
+                columns, rows = self.run(conn, sql, params)
+        if row is not None:
+            with self.db:
+                self.db.execute(
+                    "UPDATE entries SET last_used = ?, hits = hits + 1 WHERE key = ?;", (time.time(), key)
+                )
+            self.count("hits")
+            payload = json.loads(zlib.decompress(row[0]))
+            return payload["columns"], [tuple(values) for values in payload["rows"]], "hit"
+
+        self.count("misses")
+        try:
+            payload = zlib.compress(json.dumps({"columns": columns, "rows": rows}).encode("utf-8"))
+        except TypeError:  # BLOB values are not cached
+            return columns, rows, "miss"
+        if len(payload) <= self.max_bytes:
+            now = time.time()
+            with self.db:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, 0);",
+                    (key, version, normalize_sql(sql), payload, len(payload), now, now),
+                )
+            self.evict()
+        return columns, rows, "miss"
+
+    @staticmethod
+    def run(conn: sqlite3.Connection, sql: str, params: Sequence) -> Tuple[List[str], List[Tuple]]:
+        cursor = conn.execute(sql, params)
+        return [column[0] for column in cursor.description or ()], cursor.fetchall()
+
+    def evict(self) -> None:
+        """Drop least-recently-used entries until the cache fits in ``max_bytes``."""
+        total = self.db.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries;").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in self.db.execute("SELECT key, bytes FROM entries ORDER BY last_used;"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        with self.db:
+            self.db.executemany("DELETE FROM entries WHERE key = ?;", victims)
+        self.count("evictions", len(victims))
+
+    def stats(self) -> Dict[str, int]:
+        """This instance's counters plus lifetime totals and current size."""
+        entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries;").fetchone()
+        lifetime = dict(self.db.execute("SELECT name, value FROM counters;").fetchall())
+        stats = {name: self.counters[name] for name in COUNTERS}
+        stats.update({f"lifetime_{name}": lifetime.get(name, 0) + self.counters[name] for name in COUNTERS})
+        stats.update(entries=entries, bytes=size, max_bytes=self.max_bytes)
+        return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect or clear a report result cache")
+    parser.add_argument("--cache", type=Path, required=True, help="Cache file (as passed to run_report.py)")
+    parser.add_argument("--clear", action="store_true", help="Delete every entry and reset counters")
+    args = parser.parse_args()
+    if not args.cache.exists():
+        parser.error(f"{args.cache} does not exist")
+
+    cache = ResultCache(args.cache)
+    if args.clear:
+        with cache.db:
+            cache.db.execute("DELETE FROM entries;")
+            cache.db.execute("DELETE FROM counters;")
+        cache.db.execute("VACUUM;")
+        print(f"[DONE] Cleared {args.cache}")
+    for name, value in cache.stats().items():
+        print(f"[STATS] {name:18} {value}")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Run customer_ltv_report.sql statement by statement with timing and query-plan checks."""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from result_cache import DEFAULT_MAX_BYTES, ResultCache
+
+REPORT_SQL = Path(__file__).resolve().parent.parent / "sql" / "customer_ltv_report.sql"
+
+# Tables with at least this many rows are "large" for full-scan warnings.
+LARGE_TABLE_ROWS = 10_000
+
+SOURCE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)(?:\s+(?:AS\s+)?([A-Za-z_]\w*))?", re.IGNORECASE)
+NOT_ALIASES = {
+    "on", "using", "where", "group", "order", "limit", "join", "left", "inner", "cross",
+    "natural", "outer", "union", "having", "window",
+}
+
+
+def split_statements(sql: str) -> List[Tuple[str, str]]:
+    """Split a script into ``(label, statement)`` pairs labelled by the closest preceding comment."""
+    statements = []
+    buffer: List[str] = []
+    label = ""
+    for line in sql.splitlines(keepends=True):
+        stripped = line.strip()
+        if not buffer and stripped.startswith("--"):
+            label = stripped.lstrip("-").strip()
+            continue
+        if not buffer and not stripped:
+            continue
+        buffer.append(line)
+        text = "".join(buffer)
+        if sqlite3.complete_statement(text):
+            statements.append((label or f"statement {len(statements) + 1}", text.strip()))
+            buffer = []
+            label = ""
+    return statements
+
+
+def slugify(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+def table_row_counts(conn: sqlite3.Connection) -> Dict[str, int]:
+    tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return {table: conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0] for table in tables}
+
+
+def alias_map(statement: str, tables: Dict[str, int]) -> Dict[str, str]:
+    """Map every alias (and bare name) used in FROM/JOIN clauses to its base table."""
+    aliases = {}
+    for table, alias in SOURCE_PATTERN.findall(statement):
+        if table not in tables:
+            continue
+        aliases[table] = table
+        if alias and alias.lower() not in NOT_ALIASES:
+            aliases[alias] = table
+    return aliases
+
+
+def explain(conn: sqlite3.Connection, statement: str) -> List[str]:
+    """Return the EXPLAIN QUERY PLAN tree as indented detail lines."""
+    depth: Dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {statement}"):
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def plan_flags(plan: List[str], aliases: Dict[str, str], tables: Dict[str, int], large_rows: int) -> List[str]:
+    flags = []
+    for line in plan:
+        detail = line.strip()
+        if detail.startswith("SCAN "):
+            name = detail.split()[1]
+            table = aliases.get(name)
+            if table and tables[table] >= large_rows:
+                if "COVERING INDEX" in detail:
+                    how = "via covering index"
+                elif "USING INDEX" in detail:
+                    how = "via index"
+                else:
+                    how = "table scan"
+                flags.append(f"full scan of {table} ({tables[table]:,} rows, {how}): {detail}")
+        elif "USE TEMP B-TREE" in detail:
+            flags.append(f"temp b-tree sort: {detail}")
+    return flags
+
+
+class RowWriter:
+    """Write result rows as they are fetched, either CSV or a streamed JSON array."""
+
+    def __init__(self, path: Path, columns: List[str], fmt: str) -> None:
+        self.columns = columns
+        self.fmt = fmt
+        self.handle = path.open("w", newline="", encoding="utf-8")
+        self.rows = 0
+        if fmt == "csv":
+            self.writer = csv.writer(self.handle)
+            self.writer.writerow(columns)
+        else:
+            self.handle.write("[")
+
+    def write(self, row: Tuple) -> None:
+        if self.fmt == "csv":
+            self.writer.writerow(row)
+        else:
+            self.handle.write(("," if self.rows else "") + "\n  " + json.dumps(dict(zip(self.columns, row))))
+        self.rows += 1
+
+    def close(self) -> None:
+        if self.fmt == "json":
+            self.handle.write("\n]\n" if self.rows else "]\n")
+        self.handle.close()
+
+
+def iter_rows(cursor: sqlite3.Cursor, size: int = 1000) -> Iterator[Tuple]:
+    while True:
+        chunk = cursor.fetchmany(size)
+        if not chunk:
+            return
+        yield from chunk
+
+
+def run_report(
+    conn: sqlite3.Connection,
+    sql_path: Path,
+    output_dir: Optional[Path],
+    fmt: str = "csv",
+    large_rows: int = LARGE_TABLE_ROWS,
+    explain_only: bool = False,
+    cache: Optional[ResultCache] = None,
+) -> List[Dict]:
+    tables = table_row_counts(conn)
+    results = []
+    for index, (label, statement) in enumerate(split_statements(sql_path.read_text(encoding="utf-8-sig")), 1):
+        plan = explain(conn, statement)
+        flags = plan_flags(plan, alias_map(statement, tables), tables, large_rows)
+        entry: Dict = {"index": index, "label": label, "plan": plan, "flags": flags}
+        print(f"[INFO] [{index}] {label}")
+        for line in plan:
+            print(f"[PLAN]   {line}")
+        for flag in flags:
+            print(f"[WARN]   {flag}")
+        if not explain_only:
+            started = time.perf_counter()
+            if cache is not None:
+                # Cached or not, the rows are materialized so a miss can be stored.
+                columns, result, entry["cache"] = cache.execute(conn, statement)
+            else:
+                cursor = conn.execute(statement)
+                columns = [column[0] for column in cursor.description]
+                result = iter_rows(cursor)
+            writer = None
+            if output_dir is not None:
+                path = output_dir / f"{index:02d}_{slugify(label)}.{fmt}"
+                writer = RowWriter(path, columns, fmt)
+                entry["output"] = str(path)
+            rows = 0
+            first_row = None
+            try:
+                for row in result:
+                    if first_row is None:
+                        first_row = time.perf_counter() - started
+                    if writer:
+                        writer.write(row)
+                    rows += 1
+            finally:
+                if writer:
+                    writer.close()
+            entry.update(
+                seconds=round(time.perf_counter() - started, 6),
+                first_row_seconds=round(first_row, 6) if first_row is not None else None,
+                rows=rows,
+            )
+            cached = f" cache={entry['cache']}" if "cache" in entry else ""
+            print(f"[TIMING] {entry['seconds']:8.3f}s rows={rows}{cached}")
+        results.append(entry)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the LTV report with per-statement timing and plans")
+    parser.add_argument("--database", type=Path, default=Path("../ecommerce.db"), help="SQLite DB path")
+    parser.add_argument("--sql", type=Path, default=REPORT_SQL, help="Report script to run")
+    parser.add_argument("--output-dir", type=Path, default=None, help="Stream each statement's rows here")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv", help="Result file format")
+    parser.add_argument(
+        "--large-table-rows",
+        type=int,
+        default=LARGE_TABLE_ROWS,
+        help="Flag full scans of tables with at least this many rows",
+    )
+    parser.add_argument("--explain-only", action="store_true", help="Capture plans without executing")
+    parser.add_argument("--cache", type=Path, default=None, help="Reuse results from this on-disk cache file")
+    parser.add_argument(
+        "--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1 << 20), help="LRU size bound for --cache"
+    )
+    parser.add_argument(
+        "--fail-on-flags", action="store_true", help="Exit 1 when any plan is flagged (for CI)"
+    )
+    args = parser.parse_args()
+    if not args.database.exists():
+        parser.error(f"{args.database} does not exist; run load_ecommerce_data.py first")
+
+    if args.output_dir:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+    cache = ResultCache(args.cache, int(args.cache_max_mb * (1 << 20))) if args.cache else None
+    try:
+        results = run_report(
+            conn, args.sql, args.output_dir, args.format, args.large_table_rows, args.explain_only, cache
+        )
+        if cache is not None:
+            for name, value in cache.stats().items():
+                print(f"[STATS] cache {name:18} {value}")
+    finally:
+        conn.close()
+        if cache is not None:
+            cache.close()
+
+    if args.output_dir:
+        summary = args.output_dir / "report_summary.json"
+        summary.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+        print(f"[INFO] Timings and plans written to {summary}")
+    flagged = sum(1 for entry in results if entry["flags"])
+    print(f"[DONE] {len(results)} statements, {flagged} with flagged plans")
+    if args.fail_on_flags and flagged:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
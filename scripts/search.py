@@ -0,0 +1,197 @@
+"""FTS5 search over customers and products for support lookups.
+
+``customer_search`` indexes customers(first_name, last_name, email, phone) and
+``product_search`` products(name, brand, category). Both are external-content
+FTS5 tables: they hold only the index and read the text back from the base
+table by rowid, and triggers on the base tables keep them in step with every
+later insert, upsert and delete (incremental loads, --watch batches).
+
+Tokenizers: ``prefix`` (the default; unicode61 words with 2-6 character
+prefix indexes) matches the start of any word ("liam pat", "noah.davis",
+"547-72") and keeps selective lookups under a millisecond at 150k customers.
+``trigram`` also matches inside words ("mith", "avis82") but scans the long
+doclists of common trigrams, so long or common terms take milliseconds. It
+cannot match terms shorter than 3 characters, so ``check_terms`` rejects them
+("li" needs the prefix index).
+Each whitespace-separated term of a query must match; results are ranked by
+weighted bm25 unless the query is too broad (see RANK_CANDIDATES).
+
+The index is keyed on the base tables' implicit rowids, which upserts keep and
+VACUUM's table copy preserves; ``build_search_indexes`` re-indexes from scratch.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# FTS table -> (base table, indexed columns, bm25 weight per column).
+SEARCH_INDEXES: Dict[str, Tuple[str, Tuple[str, ...], Tuple[float, ...]]] = {
+    "customer_search": ("customers", ("first_name", "last_name", "email", "phone"), (2.0, 2.0, 1.0, 1.0)),
+    "product_search": ("products", ("name", "brand", "category"), (2.0, 1.5, 0.5)),
+}
+TOKENIZERS = {
+    "trigram": "tokenize='trigram'",
+    # Prefix indexes up to 6 characters: longer prefixes expand to few enough terms to merge cheaply.
+    "prefix": "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6'",
+}
+
+# bm25 needs each term's document count, i.e. a pass over all its matches, so
+# only queries with at most this many matches are ranked; broader ones return
+# their first matches (rowid order, rank NULL) at the cost of a bounded probe.
+RANK_CANDIDATES = 200
+# FTS5 trigram indexes only match terms of at least one full trigram.
+MIN_TRIGRAM_TERM = 3
+
+# Best ``{limit}`` rowids (and bm25 rank) of ``{fts}`` for the FTS5 query expression ``{match}``.
+MATCHES_SQL = """
+    WITH probe(matches) AS (
+        SELECT count(*) FROM (SELECT 1 FROM {fts} WHERE {fts} MATCH {match} LIMIT {candidates} + 1)
+    )
+    SELECT * FROM (
+        SELECT rowid, rank FROM (
+            SELECT rowid, rank FROM {fts}, probe WHERE matches <= {candidates} AND {fts} MATCH {match}
+        ) ORDER BY rank LIMIT {limit}
+    )
+    UNION ALL
+    SELECT * FROM (
+        SELECT rowid, NULL FROM {fts}, probe WHERE matches > {candidates} AND {fts} MATCH {match} LIMIT {limit}
+    )
+"""
+SEARCH_SQL = {
+    "customers": """
+        SELECT c.customer_id, c.first_name, c.last_name, c.email, c.phone, c.loyalty_tier,
+               k.total_orders, k.net_revenue, k.avg_order_value, k.last_order_date, k.dominant_channel,
+               round(s.rank, 4) AS rank
+        FROM ({matches}) s
+        JOIN customers c ON c.rowid = s.rowid
+        LEFT JOIN customer_kpis k ON k.customer_id = c.customer_id
+        ORDER BY s.rank;
+    """,
+    "products": """
+        SELECT p.product_id, p.name, p.brand, p.category, p.price, p.inventory_count, p.active_flag,
+               round(s.rank, 4) AS rank
+        FROM ({matches}) s
+        JOIN products p ON p.rowid = s.rowid
+        ORDER BY s.rank;
+    """,
+}
+SEARCH_TABLES = {"customers": "customer_search", "products": "product_search"}
+# FTS5 query from the text parameter :q: every space-separated term quoted (so
+# user input is never FTS syntax) as a prefix, all required.
+TERMS_MATCH_SQL = """'"' || replace(replace(trim(:q), '"', '""'), ' ', '"* "') || '"*'"""
+
+
+def search_tokenizer(conn: sqlite3.Connection, name: str = "customer_search") -> Optional[str]:
+    """Tokenizer the index was built with, or None if it does not exist."""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?;", (name,)).fetchone()
+    if row is None:
+        return None
+    return next((tokenizer for tokenizer, options in TOKENIZERS.items() if options in row[0]), "custom")
+
+
+def build_search_indexes(conn: sqlite3.Connection, tokenizer: str = "prefix") -> None:
+    """(Re)create the FTS tables and their sync triggers, then index every current row."""
+    for name, (table, columns, weights) in SEARCH_INDEXES.items():
+        if search_tokenizer(conn, name) not in (None, tokenizer):
+            conn.execute(f"DROP TABLE {name};")
+        cols = ", ".join(columns)
+        new = ", ".join(f"new.{column}" for column in columns)
+        old = ", ".join(f"old.{column}" for column in columns)
+        # Separate statements: executescript would commit the loader's open transaction.
+        conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+            f"{cols}, content='{table}', content_rowid='rowid', {TOKENIZERS[tokenizer]});"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {name}(rowid, {cols}) VALUES (new.rowid, {new}); END;"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.rowid, {old}); END;"
+        )
+        conn.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {cols} ON {table} BEGIN "
+            f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.rowid, {old}); "
+            f"INSERT INTO {name}(rowid, {cols}) VALUES (new.rowid, {new}); END;"
+        )
+        conn.execute(f"INSERT INTO {name}({name}, rank) VALUES ('rank', 'bm25({', '.join(map(str, weights))})');")
+        conn.execute(f"INSERT INTO {name}({name}) VALUES ('rebuild');")
+    print(f"[INFO] Search indexes built ({tokenizer}): {', '.join(SEARCH_INDEXES)}")
+
+
+def search_sql(kind: str, limit: object = ":limit") -> str:
+    """SEARCH_SQL[kind] taking the search text as :q."""
+    matches = MATCHES_SQL.format(
+        fts=SEARCH_TABLES[kind], match=TERMS_MATCH_SQL, limit=limit, candidates=RANK_CANDIDATES
+    )
+    return SEARCH_SQL[kind].format(matches=matches)
+
+
+def check_terms(conn: sqlite3.Connection, kind: str, text: str) -> None:
+    """Raise ValueError for terms the index can never match instead of returning no rows."""
+    if search_tokenizer(conn, SEARCH_TABLES[kind]) != "trigram":
+        return
+    short = [term for term in text.split() if len(term) < MIN_TRIGRAM_TERM]
+    if short:
+        raise ValueError(
+            f"terms shorter than {MIN_TRIGRAM_TERM} characters never match the trigram index: "
+            f"{', '.join(short)}; use longer terms or load with --search prefix"
+        )
+
+
+def search(conn: sqlite3.Connection, kind: str, text: str, limit: int = 10) -> Tuple[List[str], List[Tuple]]:
+    """``(columns, rows)`` of the best ``limit`` matches; ``kind`` is a SEARCH_SQL key."""
+    text = " ".join(text.split())
+    if not text:
+        raise ValueError("empty search")
+    check_terms(conn, kind, text)
+    cursor = conn.execute(search_sql(kind), {"q": text, "limit": limit})
+    return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+def search_customers(conn: sqlite3.Connection, text: str, limit: int = 10) -> List[Dict]:
+    """Customers matching ``text`` by name, email or phone, with their customer_kpis."""
+    columns, rows = search(conn, "customers", text, limit)
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def search_products(conn: sqlite3.Connection, text: str, limit: int = 10) -> List[Dict]:
+    columns, rows = search(conn, "products", text, limit)
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search customers or products through the FTS5 indexes")
+    parser.add_argument("kind", choices=sorted(SEARCH_SQL), help="What to search")
+    parser.add_argument(
+        "text",
+        help="Terms; every term must match (word prefix, or with trigram a substring of at least 3 characters)",
+    )
+    parser.add_argument("--database", type=Path, default=Path("../ecommerce.db"), help="SQLite DB path")
+    parser.add_argument("--limit", type=int, default=10, help="Matches to return")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True)
+    try:
+        if search_tokenizer(conn) is None:
+            raise SystemExit(f"error: {args.database} has no search indexes; load it with --search")
+        started = time.perf_counter()
+        try:
+            columns, rows = search(conn, args.kind, args.text, args.limit)
+        except ValueError as exc:
+            raise SystemExit(f"error: {exc}") from None
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+    for row in rows:
+        print(json.dumps(dict(zip(columns, row))))
+    print(f"[DONE] {len(rows)} matches in {elapsed * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""Customer-hash sharding: partitioned loads and fan-out report queries.
+
+``customers``, ``orders`` and ``order_items`` go to shard ``crc32(customer_id) % N``
+(order_items follow their order), so each customer's whole history, and
+therefore its ``order_fact``, ``customer_kpis`` and rollup rows, lives in one
+file. ``products`` and ``inventory_events`` (with the ledger) are replicated to
+every shard. Shards sit next to the database as ``<stem>.shard<i>of<N><suffix>``
+and are loaded by the normal loader, one process per shard.
+
+Report sections run on every shard in parallel and are merged by MERGE_PLAN:
+per-key sums for grouped sections (AVG as SUM/COUNT), top-K for the
+leaderboard (a customer never spans shards, so each shard's top K holds the
+global top K's members), and a single shard for sections over replicated data.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import load_ecommerce_data as loader
+from run_report import REPORT_SQL, RowWriter, slugify, split_statements
+
+# CSV column that decides the shard of each partitioned table.
+SHARD_KEYS = {"customers": "customer_id", "orders": "customer_id", "order_items": "order_id"}
+
+CATEGORY_PARTIAL_SQL = """
+SELECT
+    p.category,
+    COUNT(DISTINCT oi.order_id) AS orders,
+    SUM(oi.line_total) AS revenue,
+    SUM(oi.discount_amount) AS discount_sum,
+    COUNT(oi.discount_amount) AS discount_count
+FROM order_items oi
+JOIN products p ON p.product_id = oi.product_id
+GROUP BY p.category;
+"""
+
+# How each report section (by label) is merged. "group" sums every non-key column
+# per key (COUNT(DISTINCT order_id) is additive because an order lives on one shard);
+# "avg" columns are rebuilt from a (sum, count) pair emitted by the partial "sql".
+MERGE_PLAN = {
+    "Customer LTV leaderboard": {"merge": "top", "order_by": "net_revenue", "limit": 50},
+    "Order status summary": {"merge": "group", "keys": ("order_status",), "order_by": "orders"},
+    "Product category contribution summary": {
+        "merge": "group",
+        "keys": ("category",),
+        "sql": CATEGORY_PARTIAL_SQL,
+        "avg": {"avg_discount": ("discount_sum", "discount_count")},
+        "columns": ("category", "orders", "revenue", "avg_discount"),
+        "order_by": "revenue",
+    },
+    "Inventory health summary": {"merge": "replicated"},
+}
+
+
+def shard_of(customer_id: str, shards: int) -> int:
+    """Stable across processes and runs, unlike ``hash()``."""
+    return zlib.crc32(customer_id.encode("utf-8")) % shards
+
+
+def shard_paths(database: Path, shards: int) -> List[Path]:
+    return [database.with_name(f"{database.stem}.shard{index}of{shards}{database.suffix}") for index in range(shards)]
+
+
+class ExistingShards:
+    """Read-only lookups into already-loaded shards, so incremental deltas route like the data they update."""
+
+    def __init__(self, paths: List[Path]) -> None:
+        self.conns = [
+            sqlite3.connect(f"file:{path}?mode=ro", uri=True) if path.exists() else None for path in paths
+        ]
+
+    def find(self, table: str, column: str, value: str) -> Optional[int]:
+        for index, conn in enumerate(self.conns):
+            if conn is not None and conn.execute(f"SELECT 1 FROM {table} WHERE {column} = ?;", (value,)).fetchone():
+                return index
+        return None
+
+    def rows(self, shard: int, sql: str, params: Tuple) -> List[Tuple]:
+        return self.conns[shard].execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        for conn in self.conns:
+            if conn is not None:
+                conn.close()
+
+
+def partition_csvs(
+    data_dir: Path, paths: List[Path], work_dir: Path, incremental: bool = False
+) -> Tuple[List[Path], List[Dict[str, List[str]]]]:
+    """Split the partitioned CSVs into one directory per shard and copy the replicated ones.
+
+    Incremental deltas can re-point an order to a customer on another shard, or an
+    item to an order on another shard. Such rows are routed to their new shard
+    (a moved order brings its existing items along) and returned per old shard as
+    ``{"orders": [...], "order_items": [...]}`` ids to evict there.
+    """
+    shard_dirs = [work_dir / f"shard{index}" for index in range(len(paths))]
+    for shard_dir in shard_dirs:
+        shard_dir.mkdir(parents=True)
+    existing = ExistingShards(paths) if incremental else None
+    order_shards: Dict[str, int] = {}
+    moves: List[Dict[str, List[str]]] = [{"orders": [], "order_items": []} for _ in paths]
+    # order_item_id -> (new shard, stored row) for items of moved orders.
+    carried: Dict[str, Tuple[int, Tuple]] = {}
+
+    def locate_order(order_id: str) -> int:
+        shard = order_shards.get(order_id)
+        if shard is None and existing is not None:
+            shard = existing.find("orders", "order_id", order_id)
+        if shard is None:
+            raise ValueError(f"order_items references unknown order {order_id}")
+        return shard
+
+    try:
+        for filename, table, _, _ in loader.LOAD_PLAN:
+            source = data_dir / filename
+            if table not in SHARD_KEYS:
+                if source.exists():  # incremental deltas may omit tables
+                    for shard_dir in shard_dirs:
+                        shutil.copyfile(source, shard_dir / filename)
+                continue
+            if not source.exists() and not (table == "order_items" and carried):
+                continue
+            counts = [0] * len(paths)
+            with ExitStack() as stack:
+                if source.exists():
+                    reader = csv.reader(stack.enter_context(source.open(newline="", encoding="utf-8")))
+                    header = next(reader)
+                else:
+                    reader = iter(())
+                    header = [column[1] for column in loader.base_schema()[table][0]]
+                writers = [
+                    csv.writer(stack.enter_context((shard_dir / filename).open("w", newline="", encoding="utf-8")))
+                    for shard_dir in shard_dirs
+                ]
+                for writer in writers:
+                    writer.writerow(header)
+                key = header.index(SHARD_KEYS[table])
+                row_id = header.index(next(column[1] for column in loader.base_schema()[table][0] if column[5]))
+                for row in reader:
+                    if table == "order_items":
+                        shard = locate_order(row[key])
+                        carried.pop(row[row_id], None)  # the delta's version of the item wins
+                        old = existing.find("order_items", "order_item_id", row[row_id]) if existing else None
+                        if old is not None and old != shard:
+                            moves[old]["order_items"].append(row[row_id])
+                    else:
+                        shard = shard_of(row[key], len(paths))
+                    if table == "orders":
+                        order_shards[row[row_id]] = shard
+                        old = existing.find("orders", "order_id", row[row_id]) if existing else None
+                        if old is not None and old != shard:
+                            moves[old]["orders"].append(row[row_id])
+                            for item in existing.rows(old, "SELECT * FROM order_items WHERE order_id = ?;", (row[row_id],)):
+                                carried[item[0]] = (shard, item)
+                    writers[shard].writerow(row)
+                    counts[shard] += 1
+                if table == "order_items":
+                    for shard, item in carried.values():
+                        writers[shard].writerow(item)
+                        counts[shard] += 1
+            print(f"[INFO] Partitioned {filename}: {' / '.join(str(count) for count in counts)}")
+    finally:
+        if existing is not None:
+            existing.close()
+    return shard_dirs, moves
+
+
+def evict_moved_rows(database: Path, moves: Dict[str, List[str]]) -> None:
+    """Delete rows that moved to another shard and refresh the derived tables they fed."""
+    conn = sqlite3.connect(database)
+    loader.ensure_foreign_keys(conn)
+    owners = {
+        "orders": ("orders o", "o.order_id"),
+        "order_items": ("order_items oi JOIN orders o ON o.order_id = oi.order_id", "oi.order_item_id"),
+    }
+    with conn:
+        for table, ids in moves.items():
+            if not ids:
+                continue
+            source, key = owners[table]
+            params = [(value,) for value in ids]
+            conn.executemany(
+                f"INSERT OR IGNORE INTO kpi_refresh_queue (customer_id) SELECT o.customer_id FROM {source} WHERE {key} = ?;",
+                params,
+            )
+            conn.executemany(
+                f"INSERT OR IGNORE INTO rollup_refresh_queue (day) SELECT substr(o.order_date, 1, 10) FROM {source} WHERE {key} = ?;",
+                params,
+            )
+            conn.executemany(f"DELETE FROM {table} WHERE {key.split('.')[1]} = ?;", params)
+            # Recorded like a file so the dataset version changes with the data.
+            digest = hashlib.sha256("\n".join(sorted(ids)).encode("utf-8")).hexdigest()
+            loader.record_manifest(conn, table, Path("moved-to-other-shard"), digest, -len(ids), None)
+            print(f"[INFO] {database.name}: moved {len(ids)} {table} rows to other shards")
+        loader.refresh_order_fact(conn)
+        loader.refresh_sales_rollups(conn)
+        loader.refresh_customer_kpis(conn)
+        loader.record_dataset_version(conn)
+    conn.close()
+
+
+def load_shard(database: str, data_dir: str, options: Dict) -> None:
+    loader.load_database(Path(database), Path(data_dir), **options)
+
+
+def load_shards(database: Path, data_dir: Path, shards: int, processes: Optional[int] = None, **options) -> None:
+    """Partition ``data_dir`` and load every shard database in its own process.
+
+    ``validate`` runs once over the unpartitioned files, so PK duplicates and rejects
+    are reported against the original files; shards then load the accepted rows.
+    """
+    paths = shard_paths(database, shards)
+    processes = processes or min(shards, os.cpu_count() or 1)
+    with tempfile.TemporaryDirectory(prefix="shards-", dir=database.resolve().parent) as tmp:
+        if options.pop("validate", False):
+            from validate_data import validate_dataset
+
+            reject_dir = options.pop("reject_dir", None) or loader.default_reject_dir(database)
+            print(f"[INFO] Validating {data_dir}; rejects go to {reject_dir}")
+            incremental = options.get("incremental", False)
+            existing = ExistingShards(paths) if incremental else None
+            try:
+                validate_dataset(
+                    data_dir,
+                    clean_dir=Path(tmp) / "validated",
+                    reject_dir=reject_dir,
+                    lookup=(lambda table, column, value: existing.find(table, column, value) is not None)
+                    if existing is not None
+                    else None,
+                    incremental=incremental,
+                )
+            finally:
+                if existing is not None:
+                    existing.close()
+            data_dir, options["validated"] = Path(tmp) / "validated", True
+        options.pop("reject_dir", None)
+        started = time.perf_counter()
+        shard_dirs, moves = partition_csvs(data_dir, paths, Path(tmp), options.get("incremental", False))
+        for path, moved in zip(paths, moves):
+            if any(moved.values()):
+                evict_moved_rows(path, moved)
+        print(f"[TIMING] partition          {time.perf_counter() - started:8.3f}s")
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [
+                pool.submit(load_shard, str(path), str(shard_dir), options)
+                for path, shard_dir in zip(paths, shard_dirs)
+            ]
+            for future in futures:
+                future.result()
+    print(f"[DONE] Loaded {shards} shards: {', '.join(path.name for path in paths)}")
+
+
+# ---------------------------------------------------------------------------
+# Fan-out queries.
+
+
+def run_on_shard(database: str, statements: List[str]) -> List[Tuple[List[str], List[Tuple], float]]:
+    conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    results = []
+    try:
+        for statement in statements:
+            started = time.perf_counter()
+            cursor = conn.execute(statement)
+            rows = cursor.fetchall()
+            results.append(([column[0] for column in cursor.description], rows, time.perf_counter() - started))
+    finally:
+        conn.close()
+    return results
+
+
+def add(left, right):
+    """SQL SUM semantics: NULLs are skipped, all-NULL stays NULL."""
+    if left is None:
+        return right
+    return left if right is None else left + right
+
+
+def merge_group(plan: Dict, parts: List[Tuple[List[str], List[Tuple]]]) -> Tuple[List[str], List[Tuple]]:
+    columns = parts[0][0]
+    keys = [columns.index(name) for name in plan["keys"]]
+    totals: Dict[Tuple, List] = {}
+    for _, rows in parts:
+        for row in rows:
+            key = tuple(row[index] for index in keys)
+            current = totals.get(key)
+            totals[key] = list(row) if current is None else [
+                value if index in keys else add(value, row[index]) for index, value in enumerate(current)
+            ]
+    out_columns = list(plan.get("columns", columns))
+    merged = []
+    for values in totals.values():
+        by_name = dict(zip(columns, values))
+        for name, (total, count) in plan.get("avg", {}).items():
+            by_name[name] = by_name[total] / by_name[count] if by_name[count] else None
+        merged.append(tuple(by_name[name] for name in out_columns))
+    order = out_columns.index(plan["order_by"])
+    merged.sort(key=lambda row: (row[order] is not None, row[order]), reverse=True)
+    return out_columns, merged
+
+
+def merge_top(plan: Dict, parts: List[Tuple[List[str], List[Tuple]]]) -> Tuple[List[str], List[Tuple]]:
+    columns = parts[0][0]
+    order = columns.index(plan["order_by"])
+    rows = [row for _, shard_rows in parts for row in shard_rows]
+    rows.sort(key=lambda row: (row[order] is not None, row[order]), reverse=True)
+    return columns, rows[: plan["limit"]]
+
+
+def fan_out_report(
+    paths: List[Path], sql_path: Path = REPORT_SQL, processes: Optional[int] = None
+) -> List[Tuple[str, List[str], List[Tuple], float]]:
+    """Run every section of ``sql_path`` on all shards in parallel; returns merged ``(label, columns, rows, seconds)``."""
+    sections = split_statements(sql_path.read_text(encoding="utf-8-sig"))
+    unknown = [label for label, _ in sections if label not in MERGE_PLAN]
+    if unknown:
+        raise ValueError(f"No shard merge plan for report sections: {unknown}")
+    plans = [MERGE_PLAN[label] for label, _ in sections]
+    # Replicated sections only need to run once, on the first shard.
+    workload = [
+        [plan.get("sql", statement) for plan, (_, statement) in zip(plans, sections)
+         if index == 0 or plan["merge"] != "replicated"]
+        for index in range(len(paths))
+    ]
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes or min(len(paths), os.cpu_count() or 1)) as pool:
+        shard_results = list(pool.map(run_on_shard, [str(path) for path in paths], workload))
+    print(f"[TIMING] fan-out            {time.perf_counter() - started:8.3f}s over {len(paths)} shards")
+
+    merged = []
+    positions = [0] * len(paths)
+    for (label, _), plan in zip(sections, plans):
+        parts = []
+        for index, results in enumerate(shard_results):
+            if index == 0 or plan["merge"] != "replicated":
+                parts.append(results[positions[index]])
+                positions[index] += 1
+        # Wall time of the section is its slowest shard.
+        seconds = max(part[2] for part in parts)
+        parts = [(columns, rows) for columns, rows, _ in parts]
+        if plan["merge"] == "group":
+            columns, rows = merge_group(plan, parts)
+        elif plan["merge"] == "top":
+            columns, rows = merge_top(plan, parts)
+        else:
+            columns, rows = parts[0]
+        merged.append((label, columns, rows, seconds))
+    return merged
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the LTV report across shard databases and merge the results")
+    parser.add_argument("--database", type=Path, default=Path("../ecommerce.db"), help="Database the shards were named after")
+    parser.add_argument("--shards", type=int, required=True, help="Shard count used at load time")
+    parser.add_argument("--sql", type=Path, default=REPORT_SQL, help="Report script (every section needs a merge plan)")
+    parser.add_argument("--processes", type=int, default=None, help="Worker processes (default: one per shard, up to CPUs)")
+    parser.add_argument("--output-dir", type=Path, default=None, help="Write each section's merged rows here")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv", help="Result file format")
+    args = parser.parse_args()
+    paths = shard_paths(args.database, args.shards)
+    missing = [str(path) for path in paths if not path.exists()]
+    if missing:
+        parser.error(f"Missing shard databases: {', '.join(missing)}; load with --shards {args.shards}")
+
+    try:
+        merged = fan_out_report(paths, args.sql, args.processes)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.output_dir:
+        args.output_dir.mkdir(parents=True, exist_ok=True)
+    for index, (label, columns, rows, seconds) in enumerate(merged, 1):
+        print(f"[INFO] [{index}] {label}")
+        print(f"[TIMING] {seconds:8.3f}s rows={len(rows)} (slowest shard)")
+        if args.output_dir:
+            writer = RowWriter(args.output_dir / f"{index:02d}_{slugify(label)}.{args.format}", columns, args.format)
+            for row in rows:
+                writer.write(row)
+            writer.close()
+    print(f"[DONE] {len(merged)} sections merged from {args.shards} shards")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""Single-pass constraint and referential-integrity validation of the input CSVs.
+
+Files are read once, in LOAD_PLAN (FK) order, and every row is checked for:
+required columns, values the table's transform can parse, enum membership
+(the loader's TABLE_SCHEMAS domains), order-total reconciliation, primary-key uniqueness
+within the file, and FK membership in the hash set of keys accepted from the
+parent file so far. With a database (incremental loads) keys missing from the
+sets are looked up there (``lookup``). A row that fails any check is quarantined, so rows
+referencing it fail too, and what reaches the insert is consistent enough to
+load with FK enforcement off.
+
+Outputs: clean CSVs with the original headers (files without rejects are
+linked to the source, so their load_manifest hashes do not change),
+``<file>.rejects.csv`` with
+``_line``/``_errors`` columns for every rejected row, and
+``validation_report.json`` with per-file counts by check and the first
+examples of each.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import time
+from contextlib import ExitStack
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import load_ecommerce_data as loader
+
+REPORT_FILE = "validation_report.json"
+# (table, primary key column, value) -> whether the key is already loaded.
+Lookup = Callable[[str, str, str], bool]
+# Examples kept per (file, check) in the JSON report; the rejects CSV has every row.
+MAX_EXAMPLES = 20
+# Rows converted per row_converter call; a chunk that fails is redone row by row to find the culprits.
+CHUNK_ROWS = 2048
+
+
+@lru_cache(maxsize=None)
+def table_rules(table: str) -> Tuple[str, List[str], Dict[str, Tuple[str, ...]], Dict[str, str]]:
+    """``(primary key, required columns, enum columns, {fk column: parent table})`` from the schema."""
+    columns, foreign_keys = loader.base_schema()[table]
+    primary_key = next(name for _, name, _, _, _, pk in columns if pk)
+    required = [name for _, name, _, notnull, _, pk in columns if notnull or pk]
+    enums = {name: domain for name, _, _, _, domain in loader.TABLE_SCHEMAS[table] if domain}
+    parents = {fk[3]: fk[2] for fk in foreign_keys}
+    return primary_key, required, enums, parents
+
+
+def database_lookup(conn: sqlite3.Connection) -> Lookup:
+    def lookup(table: str, column: str, value: str) -> bool:
+        return conn.execute(f"SELECT 1 FROM {table} WHERE {column} = ?;", (value,)).fetchone() is not None
+
+    return lookup
+
+
+class KeyIndex:
+    """Accepted primary keys per table, falling back to ``lookup`` for keys loaded earlier."""
+
+    def __init__(self, lookup: Optional[Lookup] = None) -> None:
+        self.keys: Dict[str, Set[str]] = {}
+        self.lookup = lookup
+
+    def add(self, table: str, key: str) -> None:
+        self.keys.setdefault(table, set()).add(key)
+
+    def __contains__(self, item: Tuple[str, str]) -> bool:
+        table, key = item
+        if key in self.keys.get(table, ()):
+            return True
+        if self.lookup is None or not self.lookup(table, table_rules(table)[0], key):
+            return False
+        self.add(table, key)
+        return True
+
+
+def positional_rules(rules: Tuple, header: Tuple[str, ...]) -> Tuple:
+    """``table_rules`` with each column paired with its position in ``header`` (None if absent)."""
+    primary_key, required, enums, parents = rules
+    at = {name: index for index, name in enumerate(header)}
+    return (
+        (primary_key, at.get(primary_key)),
+        [(column, at.get(column)) for column in required],
+        [(column, at[column], allowed) for column, allowed in enums.items() if column in at],
+        [(column, at[column], parent) for column, parent in parents.items() if column in at],
+    )
+
+
+def numbered_rows(reader, width: int) -> Iterator[Tuple[int, List[Optional[str]]]]:
+    """``(line, fields)`` of each data row, fitted to the header like csv.DictReader; blank lines skipped."""
+    for fields in reader:
+        if fields:
+            yield reader.line_num, fields if len(fields) == width else loader.fit_row(fields, width)
+
+
+def conversion_error(convert: Callable, fields: List[Optional[str]]) -> Optional[Tuple[str, str]]:
+    try:
+        convert([fields])
+    except ValueError as exc:
+        return ("order_total" if "reconcile" in str(exc) else "type", str(exc))
+    except (KeyError, TypeError) as exc:
+        return ("type", f"unparseable row: {exc!r}")
+    return None
+
+
+def conversion_errors(convert: Callable, rows: List[List[Optional[str]]]) -> List[Optional[Tuple[str, str]]]:
+    """Per row, the ``(check, message)`` its conversion fails with; a chunk that converts is checked in one call."""
+    try:
+        convert(rows)
+    except (ValueError, KeyError, TypeError):
+        return [conversion_error(convert, fields) for fields in rows]
+    return [None] * len(rows)
+
+
+def check_row(
+    fields: List[Optional[str]],
+    rules: Tuple,
+    conversion: Optional[Tuple[str, str]],
+    seen: Dict[str, int],
+    index: KeyIndex,
+) -> List[Tuple[str, str]]:
+    """Every ``(check, message)`` the row violates; ``rules`` from ``positional_rules``."""
+    primary_key, required, enums, parents = rules
+    errors = []
+    for column, position in required:
+        if position is None or fields[position] in (None, ""):
+            errors.append(("not_null", f"{column} is empty"))
+    if conversion is not None:
+        errors.append(conversion)
+    for column, position, allowed in enums:
+        value = fields[position]
+        if value not in (None, "") and value not in allowed:
+            errors.append(("enum", f"{column}={value!r} not in {allowed}"))
+    key_column, key_at = primary_key
+    key = fields[key_at] if key_at is not None else None
+    if key:
+        if key in seen:
+            errors.append(("duplicate_pk", f"{key_column}={key} first seen on line {seen[key]}"))
+    for column, position, parent in parents:
+        value = fields[position]
+        if value and (parent, value) not in index:
+            errors.append(("foreign_key", f"{column}={value} not found in accepted {parent}"))
+    return errors
+
+
+def validate_file(
+    source: Path, table: str, index: KeyIndex, clean_path: Optional[Path], reject_path: Optional[Path]
+) -> Dict:
+    """Check ``source`` a chunk at a time: csv.reader rows through the table's compiled row_converter."""
+    rules = table_rules(table)
+    seen: Dict[str, int] = {}
+    report: Dict = {"rows": 0, "accepted": 0, "rejected": 0, "by_check": {}, "examples": {}}
+    with ExitStack() as stack:
+        reader = csv.reader(stack.enter_context(source.open(newline="", encoding="utf-8")))
+        header = tuple(next(reader, ()))
+        missing = [column for column in rules[1] if column not in header]
+        if missing:
+            report["file_errors"] = [f"missing columns: {', '.join(missing)}"]
+        try:
+            convert = loader.row_converter(table, header)
+        except KeyError as exc:  # a schema column the file lacks: no row converts
+
+            def convert(rows, exc=exc):
+                raise exc
+
+        positions = positional_rules(rules, header)
+        key_at = positions[0][1]
+        clean = None
+        if clean_path is not None:
+            clean = csv.writer(stack.enter_context(clean_path.open("w", newline="", encoding="utf-8")))
+            clean.writerow(header)
+        rejects = None
+        for chunk in loader.iter_batches(numbered_rows(reader, len(header)), CHUNK_ROWS):
+            conversions = conversion_errors(convert, [fields for _, fields in chunk])
+            for (line, fields), conversion in zip(chunk, conversions):
+                report["rows"] += 1
+                errors = check_row(fields, positions, conversion, seen, index)
+                key = fields[key_at] if key_at is not None else None
+                if not errors:
+                    seen[key] = line
+                    index.add(table, key)
+                    report["accepted"] += 1
+                    if clean is not None:
+                        clean.writerow(fields)
+                    continue
+                report["rejected"] += 1
+                for check, message in errors:
+                    report["by_check"][check] = report["by_check"].get(check, 0) + 1
+                    examples = report["examples"].setdefault(check, [])
+                    if len(examples) < MAX_EXAMPLES:
+                        examples.append({"line": line, "key": key, "error": message})
+                if reject_path is not None:
+                    if rejects is None:
+                        rejects = csv.writer(stack.enter_context(reject_path.open("w", newline="", encoding="utf-8")))
+                        rejects.writerow(header + ("_line", "_errors"))
+                    rejects.writerow([*fields, line, "; ".join(m for _, m in errors)])
+    return report
+
+
+def link_source(source: Path, target: Path) -> None:
+    """Replace a clean copy identical in content to ``source`` with a link to it."""
+    target.unlink()
+    try:
+        os.symlink(source.resolve(), target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def validate_dataset(
+    data_dir: Path,
+    clean_dir: Optional[Path] = None,
+    reject_dir: Optional[Path] = None,
+    lookup: Optional[Lookup] = None,
+    incremental: bool = False,
+) -> Dict[str, Dict]:
+    """Validate every LOAD_PLAN file in one pass each; returns the per-file report.
+
+    ``clean_dir`` receives the accepted rows, ``reject_dir`` the rejects and the
+    JSON report. ``lookup`` resolves FKs to rows already loaded (see
+    ``database_lookup``). Incremental runs tolerate missing files, like the loader.
+    """
+    for directory in (clean_dir, reject_dir):
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+    index = KeyIndex(lookup)
+    reports: Dict[str, Dict] = {}
+    for filename, table, _, _ in loader.LOAD_PLAN:
+        source = data_dir / filename
+        if not source.exists():
+            if incremental:
+                continue
+            raise FileNotFoundError(f"Missing required file: {source}")
+        started = time.perf_counter()
+        reject_path = reject_dir / f"{source.stem}.rejects.csv" if reject_dir is not None else None
+        if reject_path is not None and reject_path.exists():
+            reject_path.unlink()
+        reports[filename] = report = validate_file(
+            source, table, index, clean_dir / filename if clean_dir is not None else None, reject_path
+        )
+        report["seconds"] = round(time.perf_counter() - started, 6)
+        if report["rejected"] and reject_path is not None:
+            report["rejects_file"] = str(reject_path)
+        if clean_dir is not None and not report["rejected"]:
+            link_source(source, clean_dir / filename)
+        level = "WARN" if report["rejected"] or report.get("file_errors") else "INFO"
+        checks = ", ".join(f"{check}={count}" for check, count in sorted(report["by_check"].items()))
+        print(
+            f"[{level}] Validated {filename}: {report['accepted']}/{report['rows']} accepted"
+            + (f", rejected {report['rejected']} ({checks})" if report["rejected"] else "")
+        )
+        for message in report.get("file_errors", []):
+            print(f"[WARN]   {filename}: {message}")
+    if reject_dir is not None:
+        (reject_dir / REPORT_FILE).write_text(json.dumps(reports, indent=2) + "\n", encoding="utf-8")
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validate the e-commerce CSVs and quarantine bad rows")
+    parser.add_argument("--data-dir", type=Path, default=Path("../data"), help="Directory with CSV files")
+    parser.add_argument("--reject-dir", type=Path, default=Path("rejects"), help="Rejects CSVs + JSON report")
+    parser.add_argument("--clean-dir", type=Path, default=None, help="Also write the accepted rows here")
+    parser.add_argument(
+        "--database", type=Path, default=None, help="Resolve FKs against rows already loaded here (deltas)"
+    )
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(f"file:{args.database}?mode=ro", uri=True) if args.database else None
+    try:
+        reports = validate_dataset(
+            args.data_dir,
+            args.clean_dir,
+            args.reject_dir,
+            lookup=database_lookup(conn) if conn is not None else None,
+            incremental=conn is not None,
+        )
+    finally:
+        if conn is not None:
+            conn.close()
+    rejected = sum(report["rejected"] for report in reports.values())
+    print(f"[DONE] {rejected} rows rejected; report in {args.reject_dir / REPORT_FILE}")
+    if rejected:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Long-running micro-batch ingestion of CSV extracts dropped into a directory.
+
+The directory is polled (stdlib only, no inotify dependency). A file counts as
+arrived once its name maps to a table -- ``<table>.csv`` or
+``<table>[._-]<anything>.csv``, e.g. ``orders-2024-06-01T1200.csv`` -- and as
+complete once it has not been modified for ``settle`` seconds. Names ending in
+``.part``/``.tmp`` and dotfiles are ignored, so writers can also rename into place.
+
+Each micro-batch takes the oldest complete file of each table and runs the
+normal incremental load over them in LOAD_PLAN order, in one transaction: the
+upserts, the queued order_fact/rollup/KPI/ledger refreshes for the touched
+keys only, load_manifest and dataset_version. The database is switched to WAL
+so readers (run_report.py, query_service.py) see each batch as soon as it commits.
+
+Backpressure: a batch holds at most ``max_batch_files`` files; while a backlog
+remains, batches run back to back without sleeping, and once it reaches
+``high_water`` files a ``.loader-busy`` marker is written into the directory for
+producers to hold off on, removed when the backlog drains below half of that.
+A batch that fails (e.g. items whose order has not arrived yet, or a malformed
+extract) is rolled back and retried one file at a time; files that still fail
+wait for the next arrival. A batch that finds the database locked by another
+writer is not a failure: it is retried with exponential backoff (LOCK_BACKOFF).
+"""
+from __future__ import annotations
+
+import csv
+import re
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import instrumentation
+import load_ecommerce_data as loader
+
+BUSY_MARKER = ".loader-busy"
+IGNORED_SUFFIXES = (".part", ".tmp")
+TABLE_FILES = re.compile(
+    r"^(" + "|".join(sorted((table for _, table, _, _ in loader.LOAD_PLAN), key=len, reverse=True)) + r")([._-].*)?\.csv$"
+)
+CANONICAL_NAMES = {table: filename for filename, table, _, _ in loader.LOAD_PLAN}
+# (first, max) seconds to wait before retrying a batch that found the database locked.
+LOCK_BACKOFF = (0.5, 30.0)
+
+
+def table_for(path: Path) -> Optional[str]:
+    if path.name.startswith(".") or path.name.endswith(IGNORED_SUFFIXES):
+        return None
+    match = TABLE_FILES.match(path.name)
+    return match.group(1) if match else None
+
+
+class DirectoryWatcher:
+    """Tracks which files in ``data_dir`` are complete and not yet ingested."""
+
+    def __init__(self, data_dir: Path, settle: float) -> None:
+        self.data_dir = data_dir
+        self.settle = settle
+        # path -> (size, mtime_ns) at the last poll / when it was ingested or parked.
+        self.sizes: Dict[Path, Tuple[int, int]] = {}
+        self.done: Dict[Path, Tuple[int, int]] = {}
+        self.parked: Dict[Path, Tuple[int, int]] = {}
+
+    def mark_ingested(self, conn: sqlite3.Connection) -> int:
+        """Skip files already in load_manifest (hashed once, at startup)."""
+        count = 0
+        for path in sorted(self.data_dir.glob("*.csv")):
+            table = table_for(path)
+            if table and loader.already_ingested(conn, table, loader.file_sha256(path)):
+                self.done[path] = signature(path)
+                count += 1
+        return count
+
+    def poll(self) -> List[Tuple[float, str, Path]]:
+        """``(mtime, table, path)`` of complete, pending files, oldest first."""
+        ready = []
+        now = time.time()
+        current: Dict[Path, Tuple[int, int]] = {}
+        for path in self.data_dir.glob("*.csv"):
+            table = table_for(path)
+            if table is None:
+                continue
+            try:
+                current[path] = sig = signature(path)
+            except FileNotFoundError:  # renamed away between glob and stat
+                continue
+            if self.done.get(path) == sig or self.parked.get(path) == sig:
+                continue
+            if now - sig[1] / 1e9 >= self.settle:
+                ready.append((sig[1] / 1e9, table, path))
+        self.sizes = current
+        return sorted(ready)
+
+    def unpark(self) -> None:
+        self.parked.clear()
+
+
+def signature(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def next_batch(ready: List[Tuple[float, str, Path]], max_files: int) -> List[Tuple[float, str, Path]]:
+    """Oldest file per table, at most ``max_files`` of them."""
+    batch: Dict[str, Tuple[float, str, Path]] = {}
+    for item in ready:
+        if item[1] not in batch and len(batch) < max_files:
+            batch[item[1]] = item
+    return list(batch.values())
+
+
+def ingest_batch(
+    conn: sqlite3.Connection,
+    batch: List[Tuple[float, str, Path]],
+    validate: bool,
+    reject_dir: Optional[Path],
+    batch_size: Optional[int],
+) -> int:
+    """Load one micro-batch in a single transaction; returns rows ingested."""
+    with tempfile.TemporaryDirectory(prefix="batch-") as tmp:
+        batch_dir = Path(tmp) / "batch"
+        batch_dir.mkdir()
+        for _, table, path in batch:
+            (batch_dir / CANONICAL_NAMES[table]).symlink_to(path.resolve())
+        before = conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM load_manifest;").fetchone()[0]
+        validated = False
+        if validate:
+            from validate_data import database_lookup, validate_dataset
+
+            clean_dir = Path(tmp) / "clean"
+            validate_dataset(
+                batch_dir, clean_dir=clean_dir, reject_dir=reject_dir, lookup=database_lookup(conn), incremental=True
+            )
+            batch_dir, validated = clean_dir, True
+        loader.load_data(conn, batch_dir, batch_size=batch_size, incremental=True, validated=validated)
+        return conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM load_manifest;").fetchone()[0] - before
+
+
+def ingest_retrying(
+    conn: sqlite3.Connection,
+    batch: List[Tuple[float, str, Path]],
+    validate: bool,
+    reject_dir: Optional[Path],
+    batch_size: Optional[int],
+    backoff: Tuple[float, float] = LOCK_BACKOFF,
+) -> Optional[int]:
+    """``ingest_batch``, retried while another writer holds the lock; None if the batch was rolled back."""
+    names = ", ".join(path.name for _, _, path in batch)
+    delay = backoff[0]
+    while True:
+        try:
+            return ingest_batch(conn, batch, validate, reject_dir, batch_size)
+        except sqlite3.OperationalError as exc:
+            conn.rollback()
+            if "locked" not in str(exc):
+                print(f"[WARN] Batch of {names} rolled back: {exc}")
+                return None
+            print(f"[WARN] Database locked; retrying {names} in {delay:g}s")
+            time.sleep(delay)
+            delay = min(delay * 2, backoff[1])
+        except (sqlite3.IntegrityError, csv.Error, ValueError, KeyError) as exc:
+            conn.rollback()
+            print(f"[WARN] Batch of {names} rolled back: {exc}")
+            return None
+
+
+def watch(
+    database: Path,
+    data_dir: Path,
+    poll_interval: float = 2.0,
+    settle: Optional[float] = None,
+    max_batch_files: int = len(loader.LOAD_PLAN),
+    high_water: int = 20,
+    validate: bool = False,
+    reject_dir: Optional[Path] = None,
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None,
+) -> None:
+    """Ingest files arriving in ``data_dir`` until interrupted (or ``max_batches``).
+
+    ``settle`` (default: ``poll_interval``) is how long a file must be unmodified to count as complete.
+    """
+    conn = sqlite3.connect(database)
+    conn.execute("PRAGMA journal_mode = WAL;")
+    loader.ensure_foreign_keys(conn)
+    if loader.is_compact(conn):
+        conn.close()
+        raise SystemExit(f"error: {database} uses the compact layout, which does not support incremental loads")
+    loader.create_tables(conn)
+    reject_dir = reject_dir or loader.default_reject_dir(database)
+    watcher = DirectoryWatcher(data_dir, poll_interval if settle is None else settle)
+    skipped = watcher.mark_ingested(conn)
+    print(f"[INFO] Watching {data_dir} every {poll_interval:g}s ({skipped} files already ingested)")
+    marker = data_dir / BUSY_MARKER
+    batches = rows_total = 0
+    latencies: List[float] = []
+    try:
+        while max_batches is None or batches < max_batches:
+            ready = watcher.poll()
+            if len(ready) >= high_water and not marker.exists():
+                marker.touch()
+                print(f"[WARN] Backlog of {len(ready)} files; wrote {marker}")
+            elif len(ready) < high_water // 2 and marker.exists():
+                marker.unlink()
+                print(f"[INFO] Backlog drained; removed {marker}")
+            batch = next_batch(ready, max_batch_files)
+            if not batch:
+                time.sleep(poll_interval)
+                continue
+            watcher.unpark()  # something new arrived, parked files may load now
+            attempts = [batch] if len(batch) == 1 else [batch] + [[item] for item in batch]
+            pending = list(batch)
+            for attempt in attempts:
+                if not any(item in pending for item in attempt):
+                    continue
+                started = time.perf_counter()
+                rows = ingest_retrying(conn, attempt, validate, reject_dir, batch_size)
+                if rows is None:
+                    continue
+                finished = time.time()
+                for item in attempt:
+                    pending.remove(item)
+                    watcher.done[item[2]] = watcher.sizes.get(item[2]) or signature(item[2])
+                batches += 1
+                rows_total += rows
+                # Arrival-to-queryable latency, measured from the newest file's mtime.
+                latency = finished - max(mtime for mtime, _, _ in attempt)
+                latencies.append(latency)
+                instrumentation.event(
+                    "batch",
+                    files=[path.name for _, _, path in attempt],
+                    rows=rows,
+                    seconds=round(time.perf_counter() - started, 6),
+                    latency_seconds=round(latency, 6),
+                )
+                print(
+                    f"[BATCH] #{batches} files={','.join(path.name for _, _, path in attempt)} rows={rows} "
+                    f"ingest={time.perf_counter() - started:.3f}s latency={latency:.3f}s "
+                    f"backlog={len(ready) - len(batch) + len(pending)}"
+                )
+            for _, _, path in pending:
+                watcher.parked[path] = watcher.sizes[path]
+                print(f"[WARN] Parked {path.name} until another file arrives")
+            if pending and len(pending) == len(ready):
+                time.sleep(poll_interval)  # nothing else to do until the directory changes
+    except KeyboardInterrupt:
+        print("[INFO] Interrupted")
+    finally:
+        conn.close()
+        if marker.exists():
+            marker.unlink()
+    if latencies:
+        latencies.sort()
+        print(
+            f"[DONE] {batches} batches, {rows_total} rows; latency p50={latencies[len(latencies) // 2]:.3f}s "
+            f"max={latencies[-1]:.3f}s"
+        )
+    else:
+        print("[DONE] No batches ingested")
@@ -1,11 +1,14 @@
 ﻿-- customer_ltv_report.sql
 -- Generates customer lifetime value insights plus supporting summaries
+-- Order-level measures come from order_fact (one row per order, line items
+-- pre-aggregated by the loader), so sums are never multiplied by item count.
 
+-- Customer LTV leaderboard
 WITH last_order AS (
     SELECT customer_id, order_status, customer_sentiment
     FROM (
-        SELECT o.*, ROW_NUMBER() OVER (PARTITION BY customer_id ORDER BY order_date DESC, order_id DESC) AS rn
-        FROM orders o
+        SELECT f.*, ROW_NUMBER() OVER (PARTITION BY customer_id ORDER BY order_date DESC, order_id DESC) AS rn
+        FROM order_fact f
     ) ranked
     WHERE rn = 1
 ),
@@ -14,43 +17,42 @@ customer_activity AS (
     SELECT
         c.customer_id,
         c.first_name || ' ' || c.last_name AS full_name,
-        MIN(o.order_date) AS first_order_date,
-        MAX(o.order_date) AS last_order_date,
-        COUNT(DISTINCT o.order_id) AS total_orders,
-        SUM(oi.quantity) AS total_items,
-        SUM(o.subtotal) AS gross_revenue,
-        SUM(oi.discount_amount) AS discount_total,
-        SUM(o.subtotal) - SUM(oi.discount_amount) AS net_revenue,
-        AVG(o.subtotal) AS avg_order_value,
+        MIN(f.order_date) AS first_order_date,
+        MAX(f.order_date) AS last_order_date,
+        COUNT(*) AS total_orders,
+        SUM(f.total_quantity) AS total_items,
+        SUM(f.subtotal) AS gross_revenue,
+        SUM(f.discount_total) AS discount_total,
+        SUM(f.subtotal) - SUM(f.discount_total) AS net_revenue,
+        AVG(f.subtotal) AS avg_order_value,
         c.loyalty_tier,
         lo.order_status AS last_order_status,
         lo.customer_sentiment AS last_sentiment
     FROM customers c
-    JOIN orders o ON o.customer_id = c.customer_id
-    JOIN order_items oi ON oi.order_id = o.order_id
+    JOIN order_fact f ON f.customer_id = c.customer_id AND f.item_count > 0
     LEFT JOIN last_order lo ON lo.customer_id = c.customer_id
     GROUP BY c.customer_id
 ),
 channel_mix AS (
     -- Calculate percent of orders by acquisition channel
     SELECT
-        o.customer_id,
-        o.acquisition_channel,
+        f.customer_id,
+        f.acquisition_channel,
         COUNT(*) AS channel_orders,
-        COUNT(*) * 1.0 / SUM(COUNT(*)) OVER (PARTITION BY o.customer_id) AS channel_share
-    FROM orders o
-    GROUP BY o.customer_id, o.acquisition_channel
+        COUNT(*) * 1.0 / SUM(COUNT(*)) OVER (PARTITION BY f.customer_id) AS channel_share
+    FROM order_fact f
+    GROUP BY f.customer_id, f.acquisition_channel
 ),
 inventory_health AS (
-    -- Gauge inventory pressure for products a customer purchased
+    -- Gauge inventory pressure for products a customer purchased (needs product-level line items)
     SELECT
-        o.customer_id,
+        f.customer_id,
         AVG(CASE WHEN ie.event_type = 'sale' THEN -ie.quantity_change END) AS avg_sale_qty,
         AVG(CASE WHEN ie.event_type = 'restock' THEN ie.quantity_change END) AS avg_restock_qty
-    FROM orders o
-    JOIN order_items oi ON oi.order_id = o.order_id
+    FROM order_fact f
+    JOIN order_items oi ON oi.order_id = f.order_id
     JOIN inventory_events ie ON ie.product_id = oi.product_id
-    GROUP BY o.customer_id
+    GROUP BY f.customer_id
 )
 SELECT
     ca.customer_id,
@@ -79,24 +81,24 @@ LIMIT 50;
 
 -- Order status summary
 SELECT
-    o.order_status,
+    f.order_status,
     COUNT(*) AS orders,
-    SUM(o.subtotal) AS gross_revenue,
-    SUM(o.subtotal) - SUM(oi.discount_amount) AS net_revenue
-FROM orders o
-JOIN order_items oi ON oi.order_id = o.order_id
-GROUP BY o.order_status
+    SUM(f.subtotal) AS gross_revenue,
+    SUM(f.subtotal) - SUM(f.discount_total) AS net_revenue
+FROM order_fact f
+WHERE f.item_count > 0
+GROUP BY f.order_status
 ORDER BY orders DESC;
 
+-- Category is a line-item attribute, so this section still reads order_items
 -- Product category contribution summary
 SELECT
     p.category,
-    COUNT(DISTINCT o.order_id) AS orders,
+    COUNT(DISTINCT oi.order_id) AS orders,
     SUM(oi.line_total) AS revenue,
     AVG(oi.discount_amount) AS avg_discount
 FROM order_items oi
 JOIN products p ON p.product_id = oi.product_id
-JOIN orders o ON o.order_id = oi.order_id
 GROUP BY p.category
 ORDER BY revenue DESC;
 
@@ -105,11 +107,15 @@ SELECT
     p.product_id,
     p.name,
     p.category,
-    SUM(CASE WHEN ie.event_type = 'restock' THEN ie.quantity_change ELSE 0 END) +
-    SUM(CASE WHEN ie.event_type = 'sale' THEN ie.quantity_change ELSE 0 END) AS net_delta,
-    MAX(CASE WHEN ie.event_type = 'restock' THEN ie.event_timestamp END) AS last_restock
+    COALESCE(d.restocked_total + d.sold_total, 0) AS net_delta,
+    d.last_restock_at AS last_restock
 FROM products p
-LEFT JOIN inventory_events ie ON ie.product_id = p.product_id
-GROUP BY p.product_id
+-- Latest daily snapshot carries the product's running totals (one seek per product)
+LEFT JOIN inventory_daily d ON (d.product_id, d.snapshot_date) = (
+    SELECT product_id, snapshot_date FROM inventory_daily
+    WHERE product_id = p.product_id
+    ORDER BY snapshot_date DESC
+    LIMIT 1
+)
 ORDER BY net_delta ASC
 LIMIT 25;
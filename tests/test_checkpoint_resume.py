@@ -0,0 +1,115 @@
+"""Checkpointed loads: resuming after a crash, and after fixing a row that failed its chunk."""
+import shutil
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+
+import load_ecommerce_data as loader  # noqa: E402
+
+DATA = SCRIPTS.parent / "data"
+CHUNK_ROWS = 500
+TABLES = [
+    *(table for _, table, _, _ in loader.LOAD_PLAN),
+    "order_fact",
+    "customer_kpis",
+    "inventory_ledger",
+    "inventory_daily",
+    *(table for table, _, _, _ in loader.SALES_ROLLUPS),
+]
+
+
+def snapshot(database):
+    conn = sqlite3.connect(database)
+    try:
+        return {table: sorted(conn.execute(f"SELECT * FROM {table};")) for table in TABLES}
+    finally:
+        conn.close()
+
+
+@pytest.fixture(scope="module")
+def full_load(tmp_path_factory):
+    database = tmp_path_factory.mktemp("full") / "full.db"
+    loader.load_database(database, DATA)
+    return snapshot(database)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    return Path(shutil.copytree(DATA, tmp_path / "data"))
+
+
+def replace_line(path, number, edit):
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    fields = lines[number].split(",")
+    edit(fields)
+    lines[number] = ",".join(fields)
+    path.write_text("".join(lines), encoding="utf-8")
+
+
+def orphan(fields):
+    fields[1] = "00000000-0000-0000-0000-000000000000"  # order_id of no order
+
+
+def fail_at_orphan(database, data_dir):
+    """Checkpointed --fast-load that stops on an orphan order item in order_items chunk 4."""
+    replace_line(data_dir / "order_items.csv", 4 * CHUNK_ROWS + 1, orphan)
+    with pytest.raises(sqlite3.IntegrityError):
+        loader.load_database(database, data_dir, fast_load=True, checkpoint_rows=CHUNK_ROWS)
+    conn = sqlite3.connect(database)
+    try:
+        committed = conn.execute(
+            "SELECT COUNT(*) FROM load_checkpoints WHERE table_name = 'order_items';"
+        ).fetchone()[0]
+        assert committed == 4
+        # Nothing after the committed chunks, and so not the orphan, reached the table.
+        assert conn.execute("SELECT COUNT(*) FROM order_items;").fetchone()[0] == 4 * CHUNK_ROWS
+    finally:
+        conn.close()
+
+
+def test_resume_after_crash_matches_full_load(tmp_path, data_dir, full_load, monkeypatch):
+    database = tmp_path / "resumed.db"
+    chunks = loader.iter_csv_chunks
+
+    def crash_after_two_item_chunks(path, start, rows):
+        for index, chunk in enumerate(chunks(path, start, rows)):
+            if path.name == "order_items.csv" and index == 2:
+                raise KeyboardInterrupt
+            yield chunk
+
+    monkeypatch.setattr(loader, "iter_csv_chunks", crash_after_two_item_chunks)
+    with pytest.raises(KeyboardInterrupt):
+        loader.load_database(database, data_dir, checkpoint_rows=CHUNK_ROWS)
+    monkeypatch.undo()
+
+    with pytest.raises(SystemExit, match="--resume"):
+        loader.load_database(database, data_dir, checkpoint_rows=CHUNK_ROWS)
+    loader.load_database(database, data_dir, checkpoint_rows=CHUNK_ROWS, resume=True)
+    assert snapshot(database) == full_load
+    conn = sqlite3.connect(database)
+    try:
+        assert loader.pending_checkpoints(conn) == 0
+    finally:
+        conn.close()
+
+
+def test_resume_accepts_fix_after_committed_chunks(tmp_path, data_dir, full_load):
+    database = tmp_path / "fixed.db"
+    fail_at_orphan(database, data_dir)
+    shutil.copy(DATA / "order_items.csv", data_dir / "order_items.csv")
+    loader.load_database(database, data_dir, fast_load=True, checkpoint_rows=CHUNK_ROWS, resume=True)
+    assert snapshot(database) == full_load
+
+
+def test_resume_refuses_edit_inside_committed_chunk(tmp_path, data_dir):
+    database = tmp_path / "edited.db"
+    fail_at_orphan(database, data_dir)
+    shutil.copy(DATA / "order_items.csv", data_dir / "order_items.csv")
+    replace_line(data_dir / "order_items.csv", 10, lambda fields: fields.__setitem__(3, "7"))
+    with pytest.raises(ValueError, match="changed or went missing"):
+        loader.load_database(database, data_dir, fast_load=True, checkpoint_rows=CHUNK_ROWS, resume=True)
@@ -0,0 +1,31 @@
+"""Search terms a trigram index cannot match are rejected instead of silently returning nothing."""
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+
+import load_ecommerce_data as loader  # noqa: E402
+import search  # noqa: E402
+
+
+@pytest.fixture(scope="module", params=["prefix", "trigram"])
+def conn(request, tmp_path_factory):
+    database = tmp_path_factory.mktemp(request.param) / "search.db"
+    loader.load_database(database, SCRIPTS.parent / "data", search_index=request.param)
+    conn = sqlite3.connect(database)
+    yield request.param, conn
+    conn.close()
+
+
+def test_short_terms(conn):
+    tokenizer, conn = conn
+    if tokenizer == "trigram":
+        with pytest.raises(ValueError, match="shorter than 3 characters"):
+            search.search_customers(conn, "li smith")
+    else:
+        assert search.search_customers(conn, "li")
+    assert search.search_customers(conn, "liam")
@@ -0,0 +1,55 @@
+"""validate_data reports every check, with line numbers, and writes only accepted rows to the clean copy."""
+import csv
+import shutil
+import sys
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+
+import validate_data  # noqa: E402
+
+DATA = SCRIPTS.parent / "data"
+
+
+def edit_line(path, number, edit):
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    fields = lines[number].rstrip("\n").split(",")
+    lines[number] = ",".join(edit(fields)) + "\n"
+    path.write_text("".join(lines), encoding="utf-8")
+
+
+def test_each_check_is_reported_on_its_line(tmp_path):
+    data_dir = Path(shutil.copytree(DATA, tmp_path / "data"))
+    customers = data_dir / "customers.csv"
+    edit_line(customers, 5, lambda f: f[:7] + ["diamond"] + f[8:])
+    edit_line(customers, 6, lambda f: [f[0], ""] + f[2:])
+    lines = customers.read_text(encoding="utf-8").splitlines(keepends=True)
+    customers.write_text("".join(lines[:9] + [lines[8], "\n"] + lines[9:]), encoding="utf-8")
+    edit_line(data_dir / "products.csv", 3, lambda f: f[:4] + ["abc"] + f[5:])
+    edit_line(data_dir / "orders.csv", 4, lambda f: f[:12] + ["9999.99"] + f[13:])
+    edit_line(data_dir / "orders.csv", 8, lambda f: [f[0], "no-such-customer"] + f[2:])
+    edit_line(data_dir / "order_items.csv", 20, lambda f: f + ["extra"])
+
+    reports = validate_data.validate_dataset(data_dir, clean_dir=tmp_path / "clean", reject_dir=tmp_path / "rejects")
+    lines_by_check = {
+        (filename, check): [example["line"] for example in report["examples"][check]]
+        for filename, report in reports.items()
+        for check in report["examples"]
+    }
+    assert lines_by_check[("customers.csv", "enum")] == [6]
+    assert lines_by_check[("customers.csv", "not_null")] == [7]
+    assert lines_by_check[("customers.csv", "duplicate_pk")] == [10]
+    assert lines_by_check[("products.csv", "type")] == [4]
+    assert lines_by_check[("orders.csv", "order_total")] == [5]
+    assert lines_by_check[("orders.csv", "foreign_key")][0] == 9
+    # The blank line is skipped and the extra cell dropped, as the loader does.
+    assert reports["customers.csv"]["rows"] == 751
+    assert "type" not in reports["order_items.csv"]["by_check"]
+
+    with (tmp_path / "rejects" / "customers.rejects.csv").open(newline="", encoding="utf-8") as fh:
+        rejected = list(csv.DictReader(fh))
+    assert [row["_line"] for row in rejected] == ["6", "7", "10"]
+    with (tmp_path / "clean" / "customers.csv").open(newline="", encoding="utf-8") as fh:
+        clean = list(csv.DictReader(fh))
+    assert len(clean) == reports["customers.csv"]["accepted"] == 748
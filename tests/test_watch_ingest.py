@@ -0,0 +1,64 @@
+"""watch_ingest batches against a database another writer has locked, and malformed extracts."""
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+SCRIPTS = Path(__file__).resolve().parents[1] / "scripts"
+sys.path.insert(0, str(SCRIPTS))
+
+import load_ecommerce_data as loader  # noqa: E402
+import watch_ingest  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = tmp_path / "ecommerce.db"
+    loader.load_database(database, SCRIPTS.parent / "data")
+    return database
+
+
+def customers_extract(tmp_path, lines):
+    incoming = tmp_path / "incoming"
+    incoming.mkdir()
+    path = incoming / "customers-update.csv"
+    path.write_text("".join(lines))
+    return [(path.stat().st_mtime, "customers", path)]
+
+
+def test_locked_batch_is_retried_until_the_writer_commits(tmp_path, database, capsys):
+    header, first = (SCRIPTS.parent / "data" / "customers.csv").read_text().splitlines(keepends=True)[:2]
+    fields = first.split(",")
+    fields[1] = "Lockwood"
+    batch = customers_extract(tmp_path, [header, ",".join(fields)])
+
+    blocker = sqlite3.connect(database, check_same_thread=False)
+    blocker.execute("BEGIN IMMEDIATE;")
+    release = threading.Timer(0.5, blocker.commit)
+    release.start()
+    conn = sqlite3.connect(database, timeout=0.05)
+    try:
+        rows = watch_ingest.ingest_retrying(conn, batch, False, None, None, backoff=(0.05, 0.2))
+        name = conn.execute("SELECT first_name FROM customers WHERE customer_id = ?;", (fields[0],)).fetchone()
+    finally:
+        release.join()
+        conn.close()
+        blocker.close()
+    assert rows == 1
+    assert name == ("Lockwood",)
+    assert "Database locked; retrying" in capsys.readouterr().out
+
+
+def test_malformed_extract_is_rolled_back_not_raised(tmp_path, database, capsys):
+    header = (SCRIPTS.parent / "data" / "customers.csv").read_text().splitlines(keepends=True)[0]
+    # A field past csv.field_size_limit() makes the reader raise csv.Error.
+    batch = customers_extract(tmp_path, [header, "x," + "a" * 200_000 + "\n"])
+    conn = sqlite3.connect(database)
+    try:
+        assert watch_ingest.ingest_retrying(conn, batch, False, None, None) is None
+        assert not conn.in_transaction
+    finally:
+        conn.close()
+    assert "field larger than field limit" in capsys.readouterr().out